@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Gestionnaire de sauvegardes
+Copies à chaud des bases SQLite via l'API de sauvegarde, avec rotation et vérification
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from database_manager import BASE_DIR, get_connection, get_manager, load_database_settings
+
+
+class BackupManager:
+    """
+    Sauvegarde offres.db et candidatures.db sans bloquer l'application.
+
+    La copie se fait par paquets de pages (sqlite3.Connection.backup) : les
+    écritures concurrentes peuvent continuer entre deux paquets. Chaque copie
+    est contrôlée (PRAGMA integrity_check), accompagnée d'un fichier .sha256,
+    et seules les `backup_keep` plus récentes sont conservées par base.
+    """
+
+    def __init__(self, settings: Optional[Dict] = None):
+        self.settings = settings if settings is not None else load_database_settings()
+        self.enabled = bool(self.settings.get("backup_enabled", True))
+        self.interval_days = float(self.settings.get("backup_interval_days", 7))
+        self.keep = int(self.settings.get("backup_keep", 5))
+        self.pages_per_step = int(self.settings.get("backup_pages_per_step", 256))
+        self.backup_dir = self._resolve(self.settings.get("backup_dir", "data/backups"))
+        self.databases = {
+            "offres": self._resolve(self.settings.get("offres_db", "data/offres.db")),
+            "candidatures": self._resolve(self.settings.get("candidatures_db", "data/candidatures.db"))
+        }
+
+    def _resolve(self, path: str) -> str:
+        return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+    def backup_database(self, db_path: str, dest_path: str, progress=None) -> bool:
+        """
+        Copier db_path vers dest_path page par page puis vérifier la copie.
+        progress(restant, total) est appelé après chaque paquet de pages.
+        """
+        tmp_path = dest_path + ".tmp"
+        try:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            src = get_connection(db_path)
+            dest = sqlite3.connect(tmp_path)
+            try:
+                src.backup(
+                    dest,
+                    pages=self.pages_per_step,
+                    progress=(lambda status, remaining, total: progress(remaining, total)) if progress else None,
+                    sleep=0.005
+                )
+                # La copie hérite du mode WAL de la source : la repasser en fichier autonome
+                dest.execute("PRAGMA journal_mode = DELETE;")
+                result = dest.execute("PRAGMA integrity_check;").fetchone()[0]
+            finally:
+                dest.close()
+
+            if result != "ok":
+                print(f"Sauvegarde corrompue de {db_path}: {result}")
+                os.remove(tmp_path)
+                return False
+
+            os.replace(tmp_path, dest_path)
+            with open(dest_path + ".sha256", "w", encoding="utf-8") as f:
+                f.write(f"{self.file_checksum(dest_path)}  {os.path.basename(dest_path)}\n")
+            return True
+        except (sqlite3.Error, OSError) as e:
+            print(f"Erreur sauvegarde de {db_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    @staticmethod
+    def file_checksum(path: str) -> str:
+        """Calculer le SHA-256 d'un fichier par blocs (mémoire constante)"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def verify_backup(self, path: str) -> bool:
+        """Vérifier une sauvegarde : somme SHA-256 enregistrée puis PRAGMA quick_check"""
+        checksum_path = path + ".sha256"
+        if not os.path.exists(path) or not os.path.exists(checksum_path):
+            return False
+        try:
+            with open(checksum_path, "r", encoding="utf-8") as f:
+                expected = f.read().split()[0]
+            if self.file_checksum(path) != expected:
+                return False
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                return conn.execute("PRAGMA quick_check;").fetchone()[0] == "ok"
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError, IndexError) as e:
+            print(f"Erreur vérification de {path}: {e}")
+            return False
+
+    def list_backups(self, name: str) -> List[str]:
+        """Lister les sauvegardes d'une base, de la plus récente à la plus ancienne"""
+        if not os.path.isdir(self.backup_dir):
+            return []
+        files = [
+            os.path.join(self.backup_dir, f) for f in os.listdir(self.backup_dir)
+            if f.startswith(f"{name}_") and f.endswith(".db")
+        ]
+        return sorted(files, reverse=True)
+
+    def rotate(self, name: str) -> int:
+        """Supprimer les sauvegardes au-delà des `keep` plus récentes ; retourne le nombre supprimé"""
+        removed = 0
+        for path in self.list_backups(name)[self.keep:]:
+            for file_path in (path, path + ".sha256"):
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            removed += 1
+        return removed
+
+    def is_due(self, name: str) -> bool:
+        """Une sauvegarde est due si la plus récente a plus de backup_interval_days jours"""
+        backups = self.list_backups(name)
+        if not backups:
+            return True
+        age_days = (time.time() - os.path.getmtime(backups[0])) / 86400
+        return age_days >= self.interval_days
+
+    def backup_all(self, force: bool = False) -> List[str]:
+        """Sauvegarder chaque base existante (seulement celles dont la sauvegarde est due, sauf force)"""
+        os.makedirs(self.backup_dir, exist_ok=True)
+        created = []
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        for name, db_path in self.databases.items():
+            if not os.path.exists(db_path) or not (force or self.is_due(name)):
+                continue
+            dest_path = os.path.join(self.backup_dir, f"{name}_{timestamp}.db")
+            if self.backup_database(db_path, dest_path):
+                created.append(dest_path)
+                self.rotate(name)
+                print(f"Sauvegarde créée : {dest_path}")
+        return created
+
+    def run_if_due(self) -> List[str]:
+        """Point d'entrée du thread de sauvegarde au démarrage de l'application"""
+        if not self.enabled:
+            return []
+        try:
+            return self.backup_all()
+        finally:
+            get_manager().close_thread_connections()
+
+
+if __name__ == "__main__":
+    manager = BackupManager()
+    for path in manager.backup_all(force=True):
+        print(f"{path} : {'vérifiée' if manager.verify_backup(path) else 'ÉCHEC de vérification'}")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Mesure de l'analyse des pages de liste HelloWork
+Compare l'ancienne analyse (BeautifulSoup sur la page entière) aux moteurs de
+html_parser.py sur des pages archivées, des fichiers HTML ou une page générée
+"""
+
+import os
+import sys
+import time
+from typing import List
+
+from html_parser import available_backends, get_parser, soup_listing_fields
+
+ANNONCE = """
+<li data-id-storage-target="item" class="tw-flex tw-flex-col">
+  <div class="tw-card">
+    <a href="/fr-fr/emplois/{n}.html" class="tw-link">
+      <h3 class="tw-flex">
+        <p class="tw-typo-l sm:tw-typo-xl tw-font-bold">Stage Assistant marketing H/F {n}</p>
+        <p class="tw-typo-s tw-inline">Entreprise {n}</p>
+      </h3>
+    </a>
+    <div class="tw-tags">
+      <div data-cy="localisationCard" class="tw-tag">Lyon - 69</div>
+      <div data-cy="contractCard" class="tw-tag">Stage</div>
+      <div class="tw-readonly tw-tag-attractive-s tw-w-fit tw-border-0">1 200 € / mois</div>
+      <div data-cy="contractTag" class="tw-tag">6 mois</div>
+    </div>
+    <div class="tw-typo-s tw-text-grey">il y a {n} jours</div>
+    <button class="tw-btn" data-action="click->favorite#toggle"><svg><path d="M0 0h24v24H0z"/></svg></button>
+  </div>
+</li>
+"""
+
+# En-tête, menus, filtres et pied de page : l'essentiel d'une vraie page de résultats
+DECOR = """<div class="tw-nav"><ul>{liens}</ul></div><script>window.__state = {{"items": [{etat}]}};</script>"""
+
+
+def sample_page(annonces: int = 30) -> str:
+    """Page de résultats synthétique (structure des pages HelloWork)"""
+    liens = "".join(f'<li><a href="/fr-fr/metier_{i}.html">Métier {i}</a></li>' for i in range(400))
+    etat = ",".join(f'{{"id": {i}, "titre": "Offre {i}"}}' for i in range(annonces))
+    corps = "".join(ANNONCE.format(n=n) for n in range(1, annonces + 1))
+    return (f"<!DOCTYPE html><html><head><title>Offres</title></head><body>"
+            f"{DECOR.format(liens=liens, etat=etat)}<ul class='crushed'>{corps}</ul>"
+            f"{DECOR.format(liens=liens, etat=etat)}</body></html>")
+
+
+def archived_pages(limit: int = 50) -> List[str]:
+    """Dernières pages de liste de l'archive HTML (vide si l'archive n'existe pas)"""
+    from html_archive import ARCHIVE_DIR, HtmlArchive, read_blob
+
+    if not os.path.exists(os.path.join(ARCHIVE_DIR, "index.db")):
+        return []
+    pages = []
+    for _, _, path, codec in HtmlArchive().pages(kind="liste")[-limit:]:
+        try:
+            pages.append(read_blob(path, codec))
+        except (FileNotFoundError, ImportError):
+            continue
+    return pages
+
+
+def _ancienne_analyse(html: str):
+    """Analyse d'origine : page entière par html.parser, puis recherche des annonces"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    return [soup_listing_fields(li) for li in soup.find_all("li", attrs={"data-id-storage-target": "item"})]
+
+
+def bench(pages: List[str], repeat: int = 5):
+    """Temps moyen par page de chaque moteur ; les champs doivent être identiques à la référence"""
+    moteurs = [("bs4 page entière", _ancienne_analyse)]
+    moteurs += [(name, get_parser(name).listings) for name in available_backends()]
+    reference = [_ancienne_analyse(html) for html in pages]
+    annonces = sum(len(r) for r in reference)
+    print(f"{len(pages)} pages, {annonces} annonces, {repeat} passages")
+
+    base = None
+    for nom, analyse in moteurs:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            resultats = [analyse(html) for html in pages]
+        ms = (time.perf_counter() - start) * 1000 / (repeat * len(pages))
+        base = base or ms
+        identique = "identique" if resultats == reference else "DIFFÉRENT"
+        print(f"{nom:<18} {ms:8.2f} ms/page  x{base / ms:5.1f}  ({identique})")
+
+
+if __name__ == "__main__":
+    fichiers = sys.argv[1:]
+    if fichiers:
+        pages = []
+        for fichier in fichiers:
+            with open(fichier, encoding="utf-8") as f:
+                pages.append(f.read())
+    else:
+        pages = archived_pages() or [sample_page()]
+    bench(pages)
@@ -9,9 +9,35 @@ import os
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 
+from database_manager import get_connection, get_manager
+from records import Record, candidature_factory
+from change_log import changes_since, current_seq
+from update_database import migrate_candidatures_db
+
+# Alias sous lequel offres.db est attachée à la connexion des candidatures
+OFFRES_DB_ALIAS = "offres_db"
+
+# Vue temporaire (propre à chaque connexion) : candidature + offre liée + sources
+CANDIDATURES_DETAIL_VIEW = f"""
+CREATE TEMP VIEW IF NOT EXISTS candidatures_detail AS
+SELECT c.*,
+       o.titre AS offre_titre,
+       o.ville AS offre_ville,
+       o.domaine AS offre_domaine,
+       o.type_contrat AS offre_type_contrat,
+       o.remuneration AS offre_remuneration,
+       o.date_ajout AS offre_date_ajout,
+       COALESCE(o.url, c.url) AS offre_url,
+       (SELECT group_concat(s.source, ', ') FROM {OFFRES_DB_ALIAS}.sources_offres s
+        WHERE s.offre_id = c.offre_id) AS sources
+FROM main.candidatures c
+LEFT JOIN {OFFRES_DB_ALIAS}.offres o ON o.id = c.offre_id;
+"""
+
 class CandidatureTracker:
-    def __init__(self, db_path: str = "data/candidatures.db"):
+    def __init__(self, db_path: str = "data/candidatures.db", offres_db_path: str = "data/offres.db"):
         self.db_path = db_path
+        self.offres_db_path = offres_db_path
         self.ensure_data_dir()
         self.init_database()
     
@@ -20,56 +46,13 @@ class CandidatureTracker:
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
     
     def init_database(self):
-        """Initialiser la base de données des candidatures"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS candidatures (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    offre_id INTEGER,
-                    entreprise TEXT NOT NULL,
-                    poste TEXT NOT NULL,
-                    url TEXT,
-                    email_contact TEXT,
-                    date_candidature DATE NOT NULL,
-                    statut TEXT DEFAULT 'Envoyée',
-                    type_candidature TEXT DEFAULT 'Spontanée',
-                    mode_envoi TEXT,
-                    date_relance DATE,
-                    notes TEXT,
-                    date_creation TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    date_modification TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS relances (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    candidature_id INTEGER NOT NULL,
-                    date_relance DATE NOT NULL,
-                    type_relance TEXT,
-                    reponse TEXT,
-                    FOREIGN KEY (candidature_id) REFERENCES candidatures (id)
-                )
-            """)
-            
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS entretiens (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    candidature_id INTEGER NOT NULL,
-                    date_entretien DATETIME,
-                    type_entretien TEXT,
-                    resultat TEXT,
-                    notes TEXT,
-                    FOREIGN KEY (candidature_id) REFERENCES candidatures (id)
-                )
-            """)
-            
-            conn.commit()
+        """Initialiser la base de données des candidatures (migrations versionnées)"""
+        migrate_candidatures_db(get_connection(self.db_path))
     
     def add_candidature(self, candidature_data: Dict) -> int:
         """Ajouter une nouvelle candidature"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     INSERT INTO candidatures 
@@ -98,7 +81,7 @@ class CandidatureTracker:
     def update_candidature(self, candidature_id: int, updates: Dict) -> bool:
         """Mettre à jour une candidature"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 
                 # Construire la requête dynamiquement
@@ -124,63 +107,127 @@ class CandidatureTracker:
             print(f"Erreur mise à jour candidature: {e}")
             return False
     
-    def get_candidature(self, candidature_id: int) -> Optional[Dict]:
+    def get_candidature(self, candidature_id: int) -> Optional[Record]:
         """Récupérer une candidature par ID"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = candidature_factory
                 cursor.execute("SELECT * FROM candidatures WHERE id = ?", (candidature_id,))
-                row = cursor.fetchone()
-                return dict(row) if row else None
+                return cursor.fetchone()
         except Exception as e:
             print(f"Erreur récupération candidature: {e}")
             return None
     
-    def get_all_candidatures(self, limit: int = 100) -> List[Dict]:
+    def get_all_candidatures(self, limit: int = 100) -> List[Record]:
         """Récupérer toutes les candidatures"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = candidature_factory
                 cursor.execute("""
                     SELECT * FROM candidatures 
                     ORDER BY date_candidature DESC 
                     LIMIT ?
                 """, (limit,))
-                return [dict(row) for row in cursor.fetchall()]
+                return cursor.fetchall()
         except Exception as e:
             print(f"Erreur récupération candidatures: {e}")
             return []
     
-    def get_candidatures_by_statut(self, statut: str) -> List[Dict]:
+    def _detail_connection(self) -> Optional[sqlite3.Connection]:
+        """
+        Connexion aux candidatures avec offres.db attachée et la vue candidatures_detail.
+        Retourne None si la base des offres n'existe pas encore.
+        """
+        if not os.path.exists(self.offres_db_path):
+            return None
+        conn = get_manager().attach(get_connection(self.db_path), self.offres_db_path, OFFRES_DB_ALIAS)
+        conn.execute(CANDIDATURES_DETAIL_VIEW)
+        return conn
+    
+    def get_candidatures_detaillees(self, limit: int = 100, statut: Optional[str] = None) -> List[Record]:
+        """
+        Récupérer les candidatures avec les données à jour de leur offre et ses sources
+        (une seule requête jointe, sans recherche offre par offre).
+        """
+        try:
+            conn = self._detail_connection()
+            if conn is None:
+                return self.get_all_candidatures(limit)
+            cursor = conn.cursor()
+            cursor.row_factory = candidature_factory
+            sql = "SELECT * FROM candidatures_detail"
+            params = []
+            if statut:
+                sql += " WHERE statut = ?"
+                params.append(statut)
+            sql += " ORDER BY date_candidature DESC LIMIT ?"
+            params.append(limit)
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        except Exception as e:
+            print(f"Erreur récupération candidatures détaillées: {e}")
+            return []
+    
+    def get_candidature_detaillee(self, candidature_id: int) -> Optional[Record]:
+        """Récupérer une candidature et son offre liée"""
+        try:
+            conn = self._detail_connection()
+            if conn is None:
+                return self.get_candidature(candidature_id)
+            cursor = conn.cursor()
+            cursor.row_factory = candidature_factory
+            cursor.execute("SELECT * FROM candidatures_detail WHERE id = ?", (candidature_id,))
+            return cursor.fetchone()
+        except Exception as e:
+            print(f"Erreur récupération candidature détaillée: {e}")
+            return None
+    
+    def current_change_seq(self) -> int:
+        """Position actuelle du journal des candidatures"""
+        try:
+            return current_seq(get_connection(self.db_path))
+        except Exception as e:
+            print(f"Erreur lecture du journal des candidatures: {e}")
+            return 0
+    
+    def changes_since(self, seq: int) -> Tuple[List[Record], int]:
+        """Candidatures modifiées depuis `seq` (journal changes), voir change_log.changes_since"""
+        try:
+            return changes_since(get_connection(self.db_path), seq, table="candidatures")
+        except Exception as e:
+            print(f"Erreur lecture du journal des candidatures: {e}")
+            return [], seq
+    
+    def get_candidatures_by_statut(self, statut: str) -> List[Record]:
         """Récupérer les candidatures par statut"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = candidature_factory
                 cursor.execute("""
                     SELECT * FROM candidatures 
                     WHERE statut = ? 
                     ORDER BY date_candidature DESC
                 """, (statut,))
-                return [dict(row) for row in cursor.fetchall()]
+                return cursor.fetchall()
         except Exception as e:
             print(f"Erreur récupération par statut: {e}")
             return []
     
-    def search_candidatures(self, keyword: str) -> List[Dict]:
+    def search_candidatures(self, keyword: str) -> List[Record]:
         """Rechercher des candidatures"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = candidature_factory
                 cursor.execute("""
                     SELECT * FROM candidatures 
                     WHERE entreprise LIKE ? OR poste LIKE ? OR notes LIKE ?
                     ORDER BY date_candidature DESC
                 """, (f'%{keyword}%', f'%{keyword}%', f'%{keyword}%'))
-                return [dict(row) for row in cursor.fetchall()]
+                return cursor.fetchall()
         except Exception as e:
             print(f"Erreur recherche candidatures: {e}")
             return []
@@ -188,7 +235,7 @@ class CandidatureTracker:
     def add_relance(self, candidature_id: int, relance_data: Dict) -> int:
         """Ajouter une relance"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     INSERT INTO relances (candidature_id, date_relance, type_relance, reponse)
@@ -217,7 +264,7 @@ class CandidatureTracker:
     def add_entretien(self, candidature_id: int, entretien_data: Dict) -> int:
         """Ajouter un entretien"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     INSERT INTO entretiens (candidature_id, date_entretien, type_entretien, resultat, notes)
@@ -239,7 +286,7 @@ class CandidatureTracker:
     def get_statistics(self) -> Dict:
         """Obtenir les statistiques des candidatures"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 
                 # Total candidatures
@@ -265,22 +312,34 @@ class CandidatureTracker:
                 avec_reponse = cursor.fetchone()[0]
                 taux_reponse = (avec_reponse / total * 100) if total > 0 else 0
                 
+                # Par domaine de l'offre (jointure avec offres.db)
+                par_domaine = {}
+                detail_conn = self._detail_connection()
+                if detail_conn is not None:
+                    par_domaine = dict(detail_conn.execute(f"""
+                        SELECT o.domaine, COUNT(*) FROM main.candidatures c
+                        JOIN {OFFRES_DB_ALIAS}.offres o ON o.id = c.offre_id
+                        WHERE o.domaine IS NOT NULL
+                        GROUP BY o.domaine ORDER BY COUNT(*) DESC
+                    """).fetchall())
+                
                 return {
                     'total': total,
                     'statuts': statuts,
                     'par_mois': par_mois,
+                    'par_domaine': par_domaine,
                     'taux_reponse': round(taux_reponse, 1)
                 }
         except Exception as e:
             print(f"Erreur statistiques: {e}")
-            return {'total': 0, 'statuts': {}, 'par_mois': {}, 'taux_reponse': 0}
+            return {'total': 0, 'statuts': {}, 'par_mois': {}, 'par_domaine': {}, 'taux_reponse': 0}
     
-    def get_candidatures_a_relancer(self, jours: int = 7) -> List[Dict]:
+    def get_candidatures_a_relancer(self, jours: int = 7) -> List[Record]:
         """Récupérer les candidatures à relancer"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = candidature_factory
                 cursor.execute("""
                     SELECT * FROM candidatures 
                     WHERE statut = 'Envoyée' 
@@ -288,7 +347,7 @@ class CandidatureTracker:
                     AND date_candidature < date('now', '-{} days')
                     ORDER BY date_candidature ASC
                 """.format(jours, jours))
-                return [dict(row) for row in cursor.fetchall()]
+                return cursor.fetchall()
         except Exception as e:
             print(f"Erreur candidatures à relancer: {e}")
             return []
@@ -296,7 +355,7 @@ class CandidatureTracker:
     def delete_candidature(self, candidature_id: int) -> bool:
         """Supprimer une candidature"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 
                 # Supprimer les entretiens associés
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Journal des modifications (change data capture)
+Lecture incrémentale de la table changes alimentée par triggers
+"""
+
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+from records import record_factory
+
+change_factory = record_factory("Change")
+
+
+def current_seq(conn: sqlite3.Connection) -> int:
+    """Dernier numéro de séquence du journal (0 si vide) : point de départ d'un consommateur"""
+    row = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes;").fetchone()
+    return row[0]
+
+
+def changes_since(conn: sqlite3.Connection, seq: int, table: Optional[str] = None,
+                  limit: int = 10000) -> Tuple[List, int]:
+    """
+    Lire les modifications postérieures à `seq` (au plus `limit`, dans l'ordre).
+
+    Retourne (changes, last_seq) ; chaque change a les champs seq, table_name,
+    row_id, op ('I', 'U' ou 'D') et ts. last_seq est à repasser à l'appel suivant ;
+    s'il reste des modifications, len(changes) == limit.
+    """
+    # Borne lue d'abord : une modification écrite pendant la lecture sera vue au prochain appel
+    high = current_seq(conn)
+    sql = "SELECT seq, table_name, row_id, op, ts FROM changes WHERE seq > ? AND seq <= ?"
+    params = [seq, high]
+    if table:
+        sql += " AND table_name = ?"
+        params.append(table)
+    sql += " ORDER BY seq LIMIT ?;"
+    params.append(limit)
+
+    cur = conn.cursor()
+    cur.row_factory = change_factory
+    rows = cur.execute(sql, params).fetchall()
+    if len(rows) == limit:
+        return rows, rows[-1].seq
+    return rows, max(seq, high)
+
+
+def latest_ops(changes) -> Dict[Tuple[str, int], str]:
+    """
+    Réduire une suite de changes à la dernière opération par (table, ligne) :
+    un consommateur relit chaque ligne modifiée une seule fois.
+    """
+    ops = {}
+    for change in changes:
+        key = (change.table_name, change.row_id)
+        # Une ligne insérée puis modifiée reste une insertion pour le consommateur
+        ops[key] = "I" if change.op == "U" and ops.get(key) == "I" else change.op
+    return ops
+
+
+def prune_changes(conn: sqlite3.Connection, keep_days: float = 7) -> int:
+    """Supprimer les entrées du journal plus anciennes que keep_days jours ; retourne le nombre supprimé"""
+    limite = int(time.time() - keep_days * 86400)
+    cur = conn.execute("DELETE FROM changes WHERE ts < ?;", (limite,))
+    conn.commit()
+    return cur.rowcount
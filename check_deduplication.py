@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Vérification de la déduplication des lots d'offres
+Une chaîne de doublons dans un même lot (A ~ B par URL canonique, B ~ C par
+empreinte) ne doit écarter que B, comme si les offres arrivaient une par une
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+from database import create_connection, create_tables, insert_offres_bulk
+from database_manager import get_manager
+
+
+def offre(url: str, titre: str):
+    return ("Acme", titre, url, None, "Paris", "75", None, "Stage", None, None, None, None)
+
+
+# B doublon de A (même URL canonique), C partage l'empreinte de B seulement
+LOT = [
+    offre("https://www.example.com/o/1?utm_source=a", "Dev Python"),
+    offre("https://www.example.com/o/1?utm_source=b", "Développeur Python"),
+    offre("https://www.example.com/o/2", "Développeur Python"),
+]
+
+
+def verifier() -> bool:
+    dossier = tempfile.mkdtemp(prefix="job_finder_check_")
+    try:
+        resultats = []
+        # Un lot de trois offres, puis les mêmes offres en lots séparés
+        for lots in ([LOT], [[o] for o in LOT]):
+            conn = create_connection(os.path.join(dossier, f"offres_{len(lots)}.db"))
+            create_tables(conn)
+            stats = {'nouvelles': 0, 'doublons': 0, 'sources': 0}
+            for lot in lots:
+                for cle, n in insert_offres_bulk(conn, lot, source="Test").items():
+                    if cle in stats:
+                        stats[cle] += n
+            urls = {url for (url,) in conn.execute("SELECT url FROM offres;")}
+            sans_source = conn.execute("""
+                SELECT COUNT(*) FROM offres o
+                WHERE NOT EXISTS (SELECT 1 FROM sources_offres so WHERE so.offre_id = o.id);
+            """).fetchone()[0]
+            ok = (urls == {LOT[0][2], LOT[2][2]} and stats['nouvelles'] == 2 and stats['doublons'] == 1
+                  and stats['sources'] == len(LOT) and sans_source == 0)
+            print(f"[{'OK' if ok else 'ÉCHEC'}] {len(lots)} lot(s) : {stats['nouvelles']} nouvelles, "
+                  f"{stats['doublons']} doublon(s), {stats['sources']} sources (attendu 2, 1, {len(LOT)})")
+            resultats.append(ok)
+        return all(resultats)
+    finally:
+        get_manager().close_all()
+        shutil.rmtree(dossier, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verifier() else 1)
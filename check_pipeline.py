@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Vérification du pipeline de scraping contre un serveur HTTP local
+Pages de résultats servies par http.server : concurrence bornée des
+téléchargements et arrêt à la première page sans nouvelle offre
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from bench_parser import ANNONCE
+from database import create_connection, create_tables
+from database_manager import get_manager
+from scraper_manager import ScrapePipeline
+
+PAGES = 6
+ANNONCES_PAR_PAGE = 20
+
+
+def page_html(page_num: int) -> str:
+    """Page de résultats page_num ; au-delà de PAGES, une page sans offre"""
+    annonces = ""
+    if page_num <= PAGES:
+        annonces = "".join(ANNONCE.format(n=page_num * 1000 + i) for i in range(ANNONCES_PAR_PAGE))
+    return f"<!DOCTYPE html><html><body><ul>{annonces}</ul></body></html>"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        serveur = self.server
+        with serveur.lock:
+            serveur.requetes += 1
+            serveur.en_cours += 1
+            serveur.max_en_cours = max(serveur.max_en_cours, serveur.en_cours)
+        try:
+            time.sleep(serveur.latence)
+            page_num = int(parse_qs(urlsplit(self.path).query).get("p", ["1"])[0])
+            corps = page_html(page_num).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+        finally:
+            with serveur.lock:
+                serveur.en_cours -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Serveur local des pages de résultats, qui compte les requêtes simultanées"""
+
+    daemon_threads = True
+
+    def __init__(self, latence: float = 0.05):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latence = latence
+        self.lock = threading.Lock()
+        self.requetes = 0
+        self.en_cours = 0
+        self.max_en_cours = 0
+
+    @property
+    def url_base(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/fr-fr/emploi/recherche.html?k=stage&st=date"
+
+    def reset(self):
+        with self.lock:
+            self.requetes = self.max_en_cours = 0
+
+
+def verifier(fetchers: int = 3) -> bool:
+    dossier = tempfile.mkdtemp(prefix="job_finder_check_")
+    db_path = os.path.join(dossier, "offres.db")
+    create_tables(create_connection(db_path))
+    serveur = StandInServer()
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+
+    def pipeline():
+        return ScrapePipeline(serveur.url_base, PAGES + 5, fetchers=fetchers, parse_workers=2, queue_size=4,
+                              db_path=db_path, delay_min=0, delay_max=0)
+
+    try:
+        # 1. Concurrence bornée ; toutes les offres sont écrites, arrêt à la première page vide
+        premier = pipeline().run()
+        attendues = PAGES * ANNONCES_PAR_PAGE
+        concurrence = 1 < serveur.max_en_cours <= fetchers
+        print(f"[{'OK' if concurrence else 'ÉCHEC'}] requêtes simultanées : {serveur.max_en_cours} "
+              f"(limite {fetchers}, {serveur.requetes} requêtes)")
+        ecriture = premier['pages'] == PAGES and premier['nouvelles'] == attendues
+        print(f"[{'OK' if ecriture else 'ÉCHEC'}] premier passage : {premier['pages']} pages, "
+              f"{premier['nouvelles']} nouvelles offres (attendu {PAGES} pages, {attendues} offres)")
+
+        # 2. Offres toutes connues : arrêt dès la page 1, rien n'est écrit
+        serveur.reset()
+        second = pipeline().run()
+        arret = second['pages'] == 1 and second['nouvelles'] == 0
+        print(f"[{'OK' if arret else 'ÉCHEC'}] second passage : {second['pages']} page(s), "
+              f"{second['nouvelles']} nouvelles offres, {serveur.requetes} requêtes")
+        return concurrence and ecriture and arret
+    finally:
+        serveur.shutdown()
+        serveur.server_close()
+        get_manager().close_all()
+        shutil.rmtree(dossier, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verifier() else 1)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Gestionnaire de configuration
+config_default.json, config.json et la table configuration réunis dans un
+instantané immuable en mémoire, relu seulement quand une source change
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONFIG_FILE = "config_default.json"
+USER_CONFIG_FILE = "config.json"
+
+# Section où sont rangés les paramètres de la table sans section ("smtp_gmail")
+DB_SECTION = "parametres"
+
+_MISSING = object()
+
+
+def _freeze(value):
+    """Copie en lecture seule : dictionnaires -> MappingProxyType, listes -> tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    """Copie modifiable d'un instantané (pour json.dump ou une modification locale)"""
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _deep_update(target: Dict, source: Mapping) -> Dict:
+    for key, value in source.items():
+        if isinstance(value, Mapping) and isinstance(target.get(key), dict):
+            _deep_update(target[key], value)
+        else:
+            target[key] = _thaw(value)
+    return target
+
+
+def _parse_db_value(valeur: str):
+    """Les valeurs de la table sont du texte : nombres, booléens et JSON sont décodés"""
+    try:
+        return json.loads(valeur)
+    except (TypeError, ValueError):
+        return valeur
+
+
+class ConfigManager:
+    """
+    Configuration de l'application par couches (la dernière l'emporte) :
+    config_default.json, config.json puis la table configuration de offres.db.
+    Dans la table, un paramètre "section.cle" (ex: "scraping.max_pages") remplace
+    la valeur du fichier ; les autres sont rangés dans la section "parametres".
+
+    Les lectures se font sur un instantané immuable (MappingProxyType). Au plus une
+    fois par `check_interval` secondes, les mtimes des fichiers et la version de la
+    table (PRAGMA data_version, puis configuration_version) sont comparés ; la
+    configuration n'est reconstruite que si l'un d'eux a changé.
+    """
+
+    def __init__(self, base_dir: str = BASE_DIR, db_path: Optional[str] = None, check_interval: float = 1.0):
+        self.base_dir = base_dir
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._db_conn = None
+        self._db_state = None
+        self._file_state = None
+        self._checked_at = 0.0
+        self._snapshot: Mapping = MappingProxyType({})
+        self._defaults: Mapping = MappingProxyType({})
+        self.reloads = 0
+
+    # Sources
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.base_dir, filename)
+
+    def _file_stamp(self) -> Tuple:
+        stamps = []
+        for filename in (DEFAULT_CONFIG_FILE, USER_CONFIG_FILE):
+            try:
+                st = os.stat(self._path(filename))
+                stamps.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def _read_file(self, filename: str) -> Dict:
+        path = self._path(filename)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Erreur lecture configuration {filename}: {e}")
+            return {}
+
+    def _resolve_db_path(self, files_config: Mapping) -> str:
+        path = files_config.get("database", {}).get("offres_db", os.path.join("data", "offres.db"))
+        return path if os.path.isabs(path) else self._path(path)
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        """Connexion en lecture seule, propre au cache : data_version y signale les écritures des autres connexions"""
+        if self._db_conn is None:
+            if not self.db_path or not os.path.exists(self.db_path):
+                return None
+            try:
+                self._db_conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            except sqlite3.Error as e:
+                print(f"Erreur ouverture configuration {self.db_path}: {e}")
+                return None
+        return self._db_conn
+
+    def _db_stamp(self) -> Optional[Tuple]:
+        conn = self._db()
+        if conn is None:
+            return None
+        try:
+            data_version = conn.execute("PRAGMA data_version;").fetchone()[0]
+            if self._db_state is not None and self._db_state[0] == data_version:
+                return self._db_state
+            try:
+                version = conn.execute("SELECT version FROM configuration_version WHERE id = 1;").fetchone()
+            except sqlite3.OperationalError:
+                # Base antérieure à la migration v10 : toute écriture invalide le cache
+                version = (data_version,)
+            return (data_version, version[0] if version else None)
+        except sqlite3.Error:
+            return None
+
+    def _read_db(self) -> Dict:
+        conn = self._db_conn
+        if conn is None:
+            return {}
+        try:
+            rows = conn.execute("SELECT parametre, valeur FROM configuration;").fetchall()
+        except sqlite3.Error:
+            return {}
+        config: Dict[str, Any] = {}
+        for parametre, valeur in rows:
+            section, _, cle = parametre.partition(".")
+            if cle:
+                config.setdefault(section, {})[cle] = _parse_db_value(valeur)
+            else:
+                config.setdefault(DB_SECTION, {})[parametre] = _parse_db_value(valeur)
+        return config
+
+    # Instantané
+
+    def snapshot(self) -> Mapping:
+        """Instantané courant de la configuration (rechargé si une source a changé)"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._snapshot
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return self._snapshot
+            # Versions relevées avant lecture : une écriture concurrente sera vue au contrôle suivant
+            file_state = self._file_stamp()
+            db_state = self._db_stamp()
+            if (self._file_state is None or file_state != self._file_state
+                    or (db_state or (None, None))[1] != (self._db_state or (None, None))[1]):
+                defaults = self._read_file(DEFAULT_CONFIG_FILE)
+                config = _deep_update(_deep_update({}, defaults), self._read_file(USER_CONFIG_FILE))
+                if self.db_path is None:
+                    self.db_path = self._resolve_db_path(config)
+                    db_state = self._db_stamp()
+                _deep_update(config, self._read_db())
+                self._defaults = _freeze(defaults)
+                self._snapshot = _freeze(config)
+                self._file_state = file_state
+                self.reloads += 1
+            self._db_state = db_state
+            self._checked_at = time.monotonic()
+        return self._snapshot
+
+    def invalidate(self):
+        """Forcer la vérification des sources à la prochaine lecture"""
+        self._checked_at = 0.0
+        self._file_state = None
+
+    # Accès typés
+
+    def get(self, path: str, default: Any = None) -> Any:
+        """Valeur à un chemin pointé ("scraping.max_pages") ; une section est un mapping en lecture seule"""
+        value = self.snapshot()
+        for key in path.split("."):
+            if not isinstance(value, Mapping):
+                return default
+            value = value.get(key, _MISSING)
+            if value is _MISSING:
+                return default
+        return value
+
+    def __getitem__(self, path: str) -> Any:
+        value = self.get(path, _MISSING)
+        if value is _MISSING:
+            raise KeyError(path)
+        return value
+
+    def section(self, name: str) -> Mapping:
+        value = self.get(name)
+        return value if isinstance(value, Mapping) else MappingProxyType({})
+
+    def get_int(self, path: str, default: int = 0) -> int:
+        try:
+            return int(self.get(path, default))
+        except (TypeError, ValueError):
+            return default
+
+    def get_float(self, path: str, default: float = 0.0) -> float:
+        try:
+            return float(self.get(path, default))
+        except (TypeError, ValueError):
+            return default
+
+    def get_bool(self, path: str, default: bool = False) -> bool:
+        value = self.get(path, default)
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "oui", "on")
+        return bool(value)
+
+    def get_str(self, path: str, default: str = "") -> str:
+        value = self.get(path, default)
+        return default if value is None else str(value)
+
+    def defaults(self) -> Mapping:
+        """Valeurs de config_default.json seules (réinitialisation)"""
+        self.snapshot()
+        return self._defaults
+
+    def as_dict(self) -> Dict:
+        """Copie modifiable de la configuration complète"""
+        return _thaw(self.snapshot())
+
+    # Écriture
+
+    def save_user_config(self, updates: Mapping, replace_sections: Tuple[str, ...] = ()):
+        """
+        Fusionner `updates` dans config.json (les sections de `replace_sections`
+        sont d'abord retirées) et invalider l'instantané.
+        """
+        with self._lock:
+            user_config = self._read_file(USER_CONFIG_FILE)
+            for name in replace_sections:
+                user_config.pop(name, None)
+            _deep_update(user_config, updates)
+            path = self._path(USER_CONFIG_FILE)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(user_config, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        self.invalidate()
+
+    def close(self):
+        with self._lock:
+            if self._db_conn is not None:
+                self._db_conn.close()
+                self._db_conn = None
+                self._db_state = None
+
+
+_config: Optional[ConfigManager] = None
+_config_lock = threading.Lock()
+
+
+def get_config() -> ConfigManager:
+    """Obtenir la configuration partagée du processus"""
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = ConfigManager()
+    return _config
+
+
+def invalidate_config():
+    """Signaler une écriture de configuration faite dans ce processus"""
+    if _config is not None:
+        _config.invalidate()
+
+
+if __name__ == "__main__":
+    print(json.dumps(get_config().as_dict(), indent=2, ensure_ascii=False))
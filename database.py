@@ -1,105 +1,311 @@
 import sqlite3
+import re
 from sqlite3 import Error
 import os
 
+from database_manager import get_connection, get_manager
+from config_manager import invalidate_config
+from update_database import migrate_offres_db, FACET_COLUMNS, FACET_TOTAL
+from retention_manager import RetentionManager
+from normalisation import parse_duree, parse_remuneration, to_epoch
+from deduplication import CONTENT_HASH_COLUMNS, canonical_url, content_hash, offre_fingerprint
+from records import OFFRE_COLUMNS, OFFRE_FIELDS, NouvelleOffre, offre_factory, candidature_factory
+
 # Chemin de la base de données (dans le dossier data/)
 DB_PATH = os.path.join(os.path.dirname(__file__), "data", "offres.db")
 
 def create_connection(db_file):
-    """Créer une connexion à la base de données SQLite spécifiée par db_file."""
+    """
+    Obtenir la connexion à la base SQLite db_file pour le thread courant.
+    La connexion est partagée (voir database_manager) : ne pas la fermer après usage.
+    """
     conn = None
     try:
-        conn = sqlite3.connect(db_file)
-        print(f"Connexion réussie à la base de données {db_file}")
+        conn = get_connection(db_file)
     except Error as e:
         print(e)
     return conn
 
 def create_tables(conn):
-    """Créer toutes les tables nécessaires dans la base de données."""
+    """
+    Créer toutes les tables nécessaires dans la base de données.
+    Le schéma est versionné : les migrations manquantes (tables, colonnes, index)
+    sont appliquées par update_database.
+    """
     try:
-        cursor = conn.cursor()
-        
-        # Table principale des offres de stage
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS offres (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            entreprise TEXT NOT NULL,
-            titre TEXT NOT NULL,
-            url TEXT NOT NULL UNIQUE,
-            email TEXT,
-            ville TEXT,
-            departement TEXT,
-            domaine TEXT,
-            type_contrat TEXT,
-            remuneration TEXT,
-            date_publication DATE,
-            duree INTEGER,
-            mots_cles TEXT,
-            date_ajout TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """)
-        
-        # Table pour stocker les sources multiples d'une même offre (par exemple, plusieurs plateformes)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS sources_offres (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            offre_id INTEGER NOT NULL,
-            source TEXT NOT NULL,
-            url TEXT NOT NULL,
-            FOREIGN KEY (offre_id) REFERENCES offres (id)
-        );
-        """)
-        
-        # Table pour stocker l'historique des candidatures envoyées
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS candidatures (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            offre_id INTEGER NOT NULL,
-            email_envoye TEXT NOT NULL,
-            statut TEXT,
-            date_envoi TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            remarques TEXT,
-            FOREIGN KEY (offre_id) REFERENCES offres (id)
-        );
-        """)
-        
-        # Table de configuration (pour stocker des paramètres globaux, ex. les comptes SMTP, etc.)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS configuration (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            parametre TEXT UNIQUE NOT NULL,
-            valeur TEXT NOT NULL
-        );
-        """)
-        
-        conn.commit()
-        print("Tables créées avec succès.")
+        version = migrate_offres_db(conn)
+        print(f"Tables créées avec succès (schéma v{version}).")
     except Error as e:
         print("Erreur lors de la création des tables:", e)
 
 def insert_offre(conn, offre):
     """
-    Insérer une nouvelle offre dans la table offres.
+    Insérer une nouvelle offre dans la table offres (avec ses colonnes normalisées).
     """
-    sql = """
-    INSERT OR IGNORE INTO offres(
-        entreprise, titre, url, email, ville, departement, domaine, type_contrat, remuneration, date_publication, duree, mots_cles
-    )
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+    ligne = _preparer_offre(offre)
+    if ligne is None:
+        print("Offre invalide ignorée:", offre[:2] if isinstance(offre, (tuple, list)) else offre)
+        return None
+    colonnes = ", ".join(OFFRE_COLUMNS + NORMALISED_COLUMNS)
+    sql = f"""
+    INSERT OR IGNORE INTO offres({colonnes})
+    VALUES ({', '.join('?' * len(ligne))});
     """
     
     try:
         cur = conn.cursor()
-        print(f"Insertion en base : {offre}")  # Debug pour voir les valeurs envoyées
-        cur.execute(sql, offre)
+        cur.execute(sql, ligne)
         conn.commit()
-        print(f"Offre insérée avec succès: {offre[1]}")
         return cur.lastrowid
     except Error as e:
         print("Erreur lors de l'insertion de l'offre:", e)
         return None
 
+# Colonnes calculées à l'insertion à partir des champs texte (voir normalisation.py
+# et deduplication.py)
+NORMALISED_COLUMNS = ("remun_min", "remun_max", "duree_mois", "date_publication_ts",
+                      "url_canonique", "fingerprint", "content_hash")
+
+# Colonnes fournies par les scrapers, réécrites quand une offre connue change
+COLONNES_ANALYSEES = CONTENT_HASH_COLUMNS + NORMALISED_COLUMNS
+
+def _preparer_offre(offre):
+    """
+    Valider un tuple d'offre (taille, champs obligatoires, types SQLite) et lui
+    ajouter ses colonnes normalisées. Retourne None si l'offre est rejetée.
+    """
+    if not isinstance(offre, (tuple, list)) or len(offre) != len(OFFRE_COLUMNS):
+        return None
+    offre = NouvelleOffre._make(offre)
+    # La durée arrive parfois en tuple (valeur, unité) : stockée en texte "6 mois"
+    duree, duree_mois = parse_duree(offre.duree)
+    offre = offre._replace(duree=duree)
+    if not offre.entreprise or not offre.titre or not isinstance(offre.url, str) or not offre.url.startswith("http"):
+        return None
+    if not all(v is None or isinstance(v, (str, int, float, bytes)) for v in offre):
+        return None
+    remun_min, remun_max = parse_remuneration(offre.remuneration)
+    return tuple(offre) + (
+        remun_min, remun_max, duree_mois, to_epoch(offre.date_publication),
+        canonical_url(offre.url), offre_fingerprint(offre.entreprise, offre.titre, offre.ville),
+        content_hash(getattr(offre, col) for col in CONTENT_HASH_COLUMNS)
+    )
+
+def _preparer_lot(offres, stats):
+    """Préparer un lot d'offres ; les offres invalides sont comptées dans stats['rejetees']"""
+    valides = []
+    for offre in offres:
+        ligne = _preparer_offre(offre)
+        if ligne is not None:
+            valides.append(ligne)
+        else:
+            stats['rejetees'] += 1
+    return valides
+
+def _charger_staging(cur, valides):
+    """Charger le lot préparé dans la table temporaire staging_offres"""
+    colonnes = ", ".join(OFFRE_COLUMNS + NORMALISED_COLUMNS)
+    cur.execute("DROP TABLE IF EXISTS temp.staging_offres;")
+    cur.execute(f"CREATE TEMP TABLE staging_offres ({colonnes});")
+    cur.executemany(
+        f"INSERT INTO temp.staging_offres ({colonnes}) VALUES ({', '.join('?' * len(valides[0]))});",
+        valides
+    )
+
+def _maj_staging(cur):
+    """
+    Réécrire les offres connues (même URL) dont l'empreinte de contenu diffère.
+    Retourne (offres connues, offres réécrites).
+    """
+    derniere = "SELECT * FROM temp.staging_offres WHERE rowid IN (SELECT MAX(rowid) FROM temp.staging_offres GROUP BY url)"
+    connues = cur.execute(f"SELECT COUNT(*) FROM ({derniere}) s JOIN offres o ON o.url = s.url;").fetchone()[0]
+    cur.execute(f"""
+    UPDATE offres SET {', '.join(f'{col} = s.{col}' for col in COLONNES_ANALYSEES)}
+    FROM ({derniere}) s
+    WHERE offres.url = s.url AND offres.content_hash IS NOT s.content_hash;
+    """)
+    return connues, cur.rowcount
+
+def _lignes_retenues(cur):
+    """
+    rowid des lignes du lot à insérer, comme si le lot était inséré ligne par
+    ligne : une ligne est un doublon si son URL, son URL canonique ou son
+    empreinte est déjà en base ou portée par une ligne retenue avant elle
+    (et non par une ligne elle-même écartée).
+    """
+    urls, canoniques, empreintes = (
+        {valeur for (valeur,) in cur.execute(
+            f"SELECT o.{col} FROM offres o JOIN temp.staging_offres s ON o.{col} = s.{col};")}
+        for col in ("url", "url_canonique", "fingerprint")
+    )
+    retenues = []
+    lignes = cur.execute(
+        "SELECT rowid, url, url_canonique, fingerprint FROM temp.staging_offres ORDER BY rowid;").fetchall()
+    for rowid, url, url_canonique, empreinte in lignes:
+        if url in urls or url_canonique in canoniques or empreinte in empreintes:
+            continue
+        retenues.append((rowid,))
+        urls.add(url)
+        if url_canonique is not None:
+            canoniques.add(url_canonique)
+        if empreinte is not None:
+            empreintes.add(empreinte)
+    return retenues
+
+def _inserer_staging(cur):
+    """Copier dans offres les lignes du lot absentes de la base (URL, URL canonique, empreinte)"""
+    colonnes = ", ".join(OFFRE_COLUMNS + NORMALISED_COLUMNS)
+    cur.execute("DROP TABLE IF EXISTS temp.staging_retenues;")
+    cur.execute("CREATE TEMP TABLE staging_retenues (ligne INTEGER PRIMARY KEY);")
+    cur.executemany("INSERT INTO temp.staging_retenues (ligne) VALUES (?);", _lignes_retenues(cur))
+    cur.execute(f"""
+    INSERT INTO offres ({colonnes}, date_ajout_ts)
+    SELECT {colonnes}, CAST(strftime('%s', 'now') AS INTEGER) FROM temp.staging_offres s
+    WHERE s.rowid IN (SELECT ligne FROM temp.staging_retenues)
+    ORDER BY s.rowid;
+    """)
+    nouvelles = cur.rowcount
+    cur.execute("DROP TABLE temp.staging_retenues;")
+    return nouvelles
+
+def _rattacher_sources(cur, source):
+    """Nouvelles offres et doublons : rattachement à l'offre retenue"""
+    cur.execute("""
+    INSERT OR IGNORE INTO sources_offres(offre_id, source, url)
+    SELECT COALESCE(
+               (SELECT o.id FROM offres o WHERE o.url = s.url),
+               (SELECT MIN(o.id) FROM offres o WHERE o.url_canonique = s.url_canonique),
+               (SELECT MIN(o.id) FROM offres o WHERE o.fingerprint = s.fingerprint)
+           ), ?, s.url
+    FROM temp.staging_offres s;
+    """, (source,))
+    return cur.rowcount
+
+def insert_offres_bulk(conn, offres, source=None):
+    """
+    Insérer un lot d'offres en une seule transaction.
+
+    Les offres sont chargées dans une table temporaire via `executemany`, puis
+    copiées dans `offres` en une requête ; les doublons sont écartés (à l'intérieur
+    du lot comme par rapport à la base) : même `url`, même URL canonique (sans
+    paramètres de suivi) ou même empreinte (entreprise, titre, ville) normalisée.
+    Dans le lot, une offre n'est comparée qu'aux offres retenues avant elle : le
+    résultat ne dépend pas du découpage en lots.
+
+    Paramètres :
+      - conn : connexion à la base de données SQLite.
+      - offres : itérable de tuples dans l'ordre de OFFRE_COLUMNS ; rémunération,
+        durée et date de publication sont converties en colonnes numériques.
+      - source : nom de la plateforme (ex: "HelloWork") ; si fourni, chaque offre
+        du lot, nouvelle ou doublon, est rattachée à son offre en base par une
+        ligne `sources_offres` (une seule fois par URL).
+
+    Retourne un dictionnaire {'nouvelles': n, 'doublons': n, 'rejetees': n, 'sources': n}.
+    """
+    stats = {'nouvelles': 0, 'doublons': 0, 'rejetees': 0, 'sources': 0}
+    valides = _preparer_lot(offres, stats)
+    if not valides:
+        return stats
+
+    try:
+        cur = conn.cursor()
+        _charger_staging(cur, valides)
+        stats['nouvelles'] = _inserer_staging(cur)
+        stats['doublons'] = len(valides) - stats['nouvelles']
+        if source:
+            stats['sources'] = _rattacher_sources(cur, source)
+        cur.execute("DELETE FROM temp.staging_offres;")
+        conn.commit()
+        print(f"Lot inséré : {stats['nouvelles']} nouvelles, {stats['doublons']} doublons, {stats['rejetees']} rejetées")
+    except Error as e:
+        conn.rollback()
+        print("Erreur lors de l'insertion du lot d'offres:", e)
+        stats['rejetees'] += len(valides)
+        stats['nouvelles'] = stats['doublons'] = 0
+    return stats
+
+def update_offres_bulk(conn, offres):
+    """
+    Réécrire les champs fournis par les scrapers (COLONNES_ANALYSEES) des offres
+    déjà en base, retrouvées par URL, en une seule transaction (UPDATE ... FROM une
+    table temporaire). Seules les lignes dont l'empreinte de contenu change sont
+    écrites ; email, domaine, description et dates d'ajout sont conservés.
+
+    Retourne un dictionnaire {'modifiees': n, 'rejetees': n}.
+    """
+    stats = {'modifiees': 0, 'rejetees': 0}
+    valides = _preparer_lot(offres, stats)
+    if not valides:
+        return stats
+
+    try:
+        cur = conn.cursor()
+        _charger_staging(cur, valides)
+        stats['modifiees'] = _maj_staging(cur)[1]
+        cur.execute("DELETE FROM temp.staging_offres;")
+        conn.commit()
+    except Error as e:
+        conn.rollback()
+        print("Erreur lors de la mise à jour du lot d'offres:", e)
+        stats['rejetees'] += len(valides)
+        stats['modifiees'] = 0
+    return stats
+
+def upsert_offres_bulk(conn, offres, source=None):
+    """
+    Insérer les nouvelles offres et mettre à jour les offres connues en une transaction.
+
+    Une offre dont l'URL est déjà en base n'est réécrite que si son empreinte de
+    contenu (content_hash, calculée sur CONTENT_HASH_COLUMNS) a changé : la
+    comparaison se fait en SQL, les lignes inchangées ne sont pas touchées. Les
+    autres offres suivent insert_offres_bulk (doublons par URL canonique ou empreinte).
+
+    Retourne un dictionnaire {'nouvelles', 'modifiees', 'inchangees', 'doublons',
+    'rejetees', 'sources'}.
+    """
+    stats = {'nouvelles': 0, 'modifiees': 0, 'inchangees': 0, 'doublons': 0, 'rejetees': 0, 'sources': 0}
+    valides = _preparer_lot(offres, stats)
+    if not valides:
+        return stats
+
+    try:
+        cur = conn.cursor()
+        _charger_staging(cur, valides)
+        connues, stats['modifiees'] = _maj_staging(cur)
+        stats['inchangees'] = connues - stats['modifiees']
+        stats['nouvelles'] = _inserer_staging(cur)
+        stats['doublons'] = len(valides) - connues - stats['nouvelles']
+        if source:
+            stats['sources'] = _rattacher_sources(cur, source)
+        cur.execute("DELETE FROM temp.staging_offres;")
+        conn.commit()
+        print(f"Lot enregistré : {stats['nouvelles']} nouvelles, {stats['modifiees']} modifiées, "
+              f"{stats['inchangees']} inchangées, {stats['doublons']} doublons, {stats['rejetees']} rejetées")
+    except Error as e:
+        conn.rollback()
+        print("Erreur lors de l'enregistrement du lot d'offres:", e)
+        stats['rejetees'] += len(valides)
+        stats['nouvelles'] = stats['modifiees'] = stats['inchangees'] = stats['doublons'] = 0
+    return stats
+
+def record_scrape_run(conn, source, debut, stats):
+    """
+    Enregistrer le bilan d'un scraping dans scrape_runs.
+    `debut` : date de début ("YYYY-MM-DD HH:MM:SS") ; `stats` : retour de upsert_offres_bulk.
+    """
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+        INSERT INTO scrape_runs(source, debut, nouvelles, modifiees, inchangees, doublons, rejetees)
+        VALUES (?, ?, ?, ?, ?, ?, ?);
+        """, (source, debut, stats.get('nouvelles', 0), stats.get('modifiees', 0), stats.get('inchangees', 0),
+              stats.get('doublons', 0), stats.get('rejetees', 0)))
+        conn.commit()
+        return cur.lastrowid
+    except Error as e:
+        print("Erreur lors de l'enregistrement du bilan de scraping:", e)
+        return None
+
 def update_email_offre(conn, offre_id, email):
     """Mettre à jour l'email d'une offre donnée par son id."""
     sql = "UPDATE offres SET email = ? WHERE id = ?;"
@@ -111,33 +317,52 @@ def update_email_offre(conn, offre_id, email):
     except Error as e:
         print("Erreur lors de la mise à jour de l'email:", e)
 
+# Colonnes d'une offre complète (enregistrement Offre, voir records.py)
+COLONNES_OFFRE = ", ".join(f"o.{col}" for col in OFFRE_FIELDS)
+
 def fetch_all_offres(conn):
-    """Récupérer toutes les offres de la base de données."""
-    sql = "SELECT id, entreprise, titre, url, email, ville, departement, domaine, type_contrat, remuneration, date_publication, duree, mots_cles, date_ajout FROM offres;"
+    """Récupérer toutes les offres de la base de données (enregistrements Offre)."""
+    sql = f"SELECT {COLONNES_OFFRE} FROM offres o;"
     cur = conn.cursor()
+    cur.row_factory = offre_factory
     cur.execute(sql)
     return cur.fetchall()
 
+def fetch_offre_by_id(conn, offre_id):
+    """
+    Récupère une offre à partir de son id.
+    Retourne l'enregistrement Offre (offre.url, offre['url'], ...) ou None.
+    """
+    sql = f"SELECT {COLONNES_OFFRE} FROM offres o WHERE o.id = ?;"
+    cur = conn.cursor()
+    cur.row_factory = offre_factory
+    cur.execute(sql, (offre_id,))
+    return cur.fetchone()
+
 def fetch_offre_by_url(conn, url):
     """
     Récupère une offre depuis la base de données à partir de son URL.
-    Retourne le tuple correspondant si l'offre existe, sinon None.
+    Retourne l'enregistrement Offre correspondant si l'offre existe, sinon None.
     """
-    sql = "SELECT * FROM offres WHERE url = ?;"
+    sql = f"SELECT {COLONNES_OFFRE} FROM offres o WHERE o.url = ?;"
     cur = conn.cursor()
+    cur.row_factory = offre_factory
     cur.execute(sql, (url,))
     return cur.fetchone()
 
 def delete_old_offres(conn, months=3):
-    """Supprimer les offres dont la date_publication est antérieure à 'months' mois."""
-    sql = "DELETE FROM offres WHERE date_publication < DATE('now', ?);"
+    """
+    Archiver les offres dont la date_publication est antérieure à 'months' mois.
+    Les offres sont déplacées vers offres_archive par lots (voir retention_manager)
+    pour ne jamais bloquer la base longtemps. Retourne le rapport de l'archivage.
+    """
     try:
-        cur = conn.cursor()
-        cur.execute(sql, (f'-{months} months',))
-        conn.commit()
-        print("Anciennes offres supprimées.")
+        report = RetentionManager(conn).archive_expired("date_publication", f"-{months} months")
+        print("Anciennes offres archivées.")
+        return report
     except Error as e:
         print("Erreur lors de la suppression des anciennes offres:", e)
+        return None
 
 def insert_source(conn, offre_id, source, url):
     """Insérer une nouvelle source pour une offre donnée."""
@@ -180,30 +405,216 @@ def fetch_candidatures(conn):
     """Récupérer toutes les candidatures enregistrées."""
     sql = "SELECT * FROM candidatures;"
     cur = conn.cursor()
+    cur.row_factory = candidature_factory
     cur.execute(sql)
     return cur.fetchall()
 
-def search_offres_by_keywords(conn, keywords):
+# Poids bm25 des colonnes de offres_fts : titre, entreprise, ville, mots_cles, description
+FTS_WEIGHTS = (10.0, 5.0, 3.0, 1.0, 1.0)
+
+def fts_disponible(conn, schema="main"):
+    """Indique si l'index plein texte offres_fts existe dans `schema` (SQLite compilé avec FTS5)."""
+    row = conn.execute(
+        f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = 'offres_fts';"
+    ).fetchone()
+    return row is not None
+
+def build_fts_query(texte):
     """
-    Rechercher des offres dont le champ 'mots_cles' contient la chaîne de caractères `keywords`.
+    Transformer une saisie libre en requête FTS5 : chaque mot devient un préfixe
+    ("dev pyth" -> "dev"* "pyth"*) et tous les mots doivent être présents.
+    Retourne None si la saisie ne contient aucun mot.
+    """
+    mots = re.findall(r"\w+", texte or "", re.UNICODE)
+    if not mots:
+        return None
+    return " ".join(f'"{mot}"*' for mot in mots)
+
+def search_offres_fts(conn, texte, domaine=None, colonnes=COLONNES_OFFRE, limit=100):
+    """
+    Rechercher des offres par pertinence (bm25) dans titre, entreprise, ville,
+    mots_cles et description. Les accents sont ignorés et chaque mot est
+    traité comme un préfixe.
+
+    Paramètres :
+      - conn : connexion à la base de données SQLite.
+      - texte : saisie libre, par exemple "dev python lyon".
+      - domaine : filtre optionnel sur le domaine exact.
+      - colonnes : colonnes SELECT (préfixées par "o."), par défaut toute l'offre.
+      - limit : nombre maximum de résultats.
+
+    Retourne une liste d'enregistrements Offre du plus pertinent au moins pertinent.
+    Sans FTS5, retombe sur une recherche LIKE triée par date d'ajout.
+    """
+    requete = build_fts_query(texte)
+    if requete is None:
+        return []
+
+    params = []
+    if fts_disponible(conn):
+        poids = ", ".join(str(p) for p in FTS_WEIGHTS)
+        sql = f"""
+        SELECT {colonnes} FROM offres_fts
+        JOIN offres o ON o.id = offres_fts.rowid
+        WHERE offres_fts MATCH ?
+        """
+        params.append(requete)
+        ordre = f" ORDER BY bm25(offres_fts, {poids})"
+    else:
+        sql = f"""
+        SELECT {colonnes} FROM offres o
+        WHERE (o.titre LIKE ? OR o.entreprise LIKE ? OR o.ville LIKE ? OR o.mots_cles LIKE ?)
+        """
+        params.extend([f"%{texte.strip()}%"] * 4)
+        ordre = " ORDER BY o.date_ajout DESC"
+
+    if domaine:
+        sql += " AND o.domaine = ?"
+        params.append(domaine)
+    sql += ordre + " LIMIT ?;"
+    params.append(limit)
+
+    try:
+        cur = conn.cursor()
+        cur.row_factory = offre_factory
+        cur.execute(sql, params)
+        return cur.fetchall()
+    except Error as e:
+        print("Erreur lors de la recherche plein texte:", e)
+        return []
+
+# Colonnes affichées dans les listes d'offres des interfaces
+COLONNES_LISTE = "o.id, o.entreprise, o.titre, o.ville, o.domaine, o.type_contrat, o.date_ajout"
+
+def fetch_offres_page(conn, filters=None, after=None, size=100, colonnes=COLONNES_LISTE, schema="main"):
+    """
+    Récupérer une page d'offres triées de la plus récente à la plus ancienne.
+
+    La pagination se fait par curseur sur (date_ajout, id) : chaque page reprend
+    juste après la dernière ligne de la précédente grâce à l'index
+    idx_offres_date_ajout, sans OFFSET ni chargement de toute la table.
+
+    Paramètres :
+      - conn : connexion à la base de données SQLite.
+      - filters : dictionnaire optionnel {'keyword', 'domaine', 'ville', 'type_contrat',
+        'remuneration_min', 'remuneration_max', 'date_debut', 'date_fin', 'ids'} ;
+        'keyword' passe par l'index plein texte quand il est disponible, les montants
+        sont mensuels (remuneration_min porte sur le bas de la fourchette,
+        remuneration_max sur le haut) et les dates au format YYYY-MM-DD.
+      - after : curseur (date_ajout, id) renvoyé par l'appel précédent, None pour la première page.
+      - size : nombre d'offres par page.
+      - colonnes : colonnes SELECT (préfixées par "o."), doivent inclure o.id et o.date_ajout.
+      - schema : base de la connexion à interroger ("main", ou une base attachée
+        de même schéma comme la réplique en mémoire de hot_tier).
+
+    Retourne (rows, next_cursor) ; next_cursor vaut None quand il n'y a plus de page.
+    """
+    filters = filters or {}
+    sql = f"SELECT {colonnes} FROM {schema}.offres o WHERE 1=1"
+    params = []
+
+    keyword = (filters.get('keyword') or '').strip()
+    if keyword:
+        requete = build_fts_query(keyword)
+        if requete and fts_disponible(conn, schema):
+            sql += f" AND o.id IN (SELECT rowid FROM {schema}.offres_fts WHERE offres_fts MATCH ?)"
+            params.append(requete)
+        else:
+            sql += " AND (o.titre LIKE ? OR o.entreprise LIKE ? OR o.ville LIKE ? OR o.mots_cles LIKE ?)"
+            params.extend([f"%{keyword}%"] * 4)
+
+    # Sous-ensemble d'offres (rafraîchissement incrémental depuis le journal changes)
+    if filters.get('ids') is not None:
+        ids = [int(i) for i in filters['ids']]
+        sql += f" AND o.id IN ({', '.join('?' * len(ids)) or 'NULL'})"
+        params.extend(ids)
+
+    for champ in ('domaine', 'ville', 'type_contrat'):
+        valeur = filters.get(champ)
+        if valeur and valeur not in ('Tous', 'Toutes'):
+            sql += f" AND o.{champ} = ?"
+            params.append(valeur)
+
+    # Rémunération mensuelle et dates : parcours d'index sur les colonnes normalisées
+    if filters.get('remuneration_min') not in (None, ''):
+        sql += " AND o.remun_min >= ?"
+        params.append(float(filters['remuneration_min']))
+    if filters.get('remuneration_max') not in (None, ''):
+        # Haut de la fourchette (le minimum quand l'offre n'affiche qu'un montant)
+        sql += " AND COALESCE(o.remun_max, o.remun_min) <= ?"
+        params.append(float(filters['remuneration_max']))
+    if filters.get('date_debut'):
+        sql += " AND o.date_ajout_ts >= ?"
+        params.append(to_epoch(filters['date_debut']))
+    if filters.get('date_fin'):
+        sql += " AND o.date_ajout_ts < ?"
+        params.append(to_epoch(filters['date_fin']) + 86400)
+
+    if after is not None:
+        sql += " AND (o.date_ajout, o.id) < (?, ?)"
+        params.extend([after[0], after[1]])
+
+    sql += " ORDER BY o.date_ajout DESC, o.id DESC LIMIT ?;"
+    params.append(size)
+
+    cur = conn.cursor()
+    cur.row_factory = offre_factory
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+
+    next_cursor = None
+    if len(rows) == size:
+        dernier = rows[-1]
+        if 'date_ajout' not in dernier.keys() or 'id' not in dernier.keys():
+            raise ValueError("fetch_offres_page: les colonnes doivent inclure id et date_ajout")
+        next_cursor = (dernier.date_ajout, dernier.id)
+    return rows, next_cursor
+
+def fetch_facets(conn, facet, limit=None):
+    """
+    Lire les effectifs d'une facette ('domaine', 'ville' ou 'type_contrat').
+    Les compteurs sont tenus à jour par triggers dans facet_counts : la lecture
+    ne dépend que du nombre de valeurs distinctes, pas du nombre d'offres.
+    
+    Retourne une liste de tuples (valeur, nombre), la plus fréquente en premier.
+    """
+    if facet not in FACET_COLUMNS:
+        raise ValueError(f"Facette inconnue: {facet}")
+    sql = "SELECT valeur, n FROM facet_counts WHERE facet = ? ORDER BY n DESC, valeur"
+    params = [facet]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    try:
+        return conn.execute(sql + ";", params).fetchall()
+    except Error as e:
+        print("Erreur lors de la lecture des facettes:", e)
+        return []
+
+def count_offres(conn):
+    """Nombre total d'offres, lu dans facet_counts."""
+    try:
+        row = conn.execute("SELECT n FROM facet_counts WHERE facet = ? AND valeur = '';", (FACET_TOTAL,)).fetchone()
+        return row[0] if row else 0
+    except Error as e:
+        print("Erreur lors du comptage des offres:", e)
+        return 0
+
+def search_offres_by_keywords(conn, keywords, limit=1000):
+    """
+    Rechercher des offres correspondant aux mots-clés `keywords` (index plein texte).
     
     Paramètres :
       - conn : connexion à la base de données SQLite.
       - keywords : chaîne de caractères à rechercher, par exemple "Informatique" ou "Paris".
+      - limit : nombre maximum d'offres retournées.
     
     Retourne :
-      - Une liste de tuples représentant les offres correspondant à la recherche.
+      - Une liste d'enregistrements Offre correspondant à la recherche,
+        les plus pertinentes en premier.
       - En cas d'erreur, une liste vide est retournée.
     """
-    try:
-        sql = "SELECT * FROM offres WHERE mots_cles LIKE ?;"
-        cur = conn.cursor()
-        cur.execute(sql, (f"%{keywords}%",))
-        rows = cur.fetchall()
-        return rows
-    except Exception as e:
-        print("Erreur lors de la recherche des offres par mots-clés:", e)
-        return []
+    return search_offres_fts(conn, keywords, limit=limit)
 
 def insert_configuration(conn, parametre, valeur):
     """Insérer ou mettre à jour une configuration."""
@@ -216,12 +627,16 @@ def insert_configuration(conn, parametre, valeur):
         cur = conn.cursor()
         cur.execute(sql, (parametre, valeur))
         conn.commit()
+        invalidate_config()
         print(f"Configuration mise à jour: {parametre} = {valeur}")
     except Error as e:
         print("Erreur lors de l'insertion de la configuration:", e)
 
 def fetch_configuration(conn, parametre):
-    """Récupérer la valeur d'une configuration donnée."""
+    """
+    Récupérer la valeur d'une configuration donnée directement en base.
+    Pour les lectures fréquentes, préférer get_config() (config_manager.py), mis en cache.
+    """
     sql = "SELECT valeur FROM configuration WHERE parametre = ?;"
     cur = conn.cursor()
     cur.execute(sql, (parametre,))
@@ -239,12 +654,19 @@ def clear_database(conn):
         print("Erreur lors de la suppression des données:", e)
 
 def export_database(conn, export_path):
-    """Exporter la base de données (copie du fichier) vers export_path."""
+    """
+    Exporter la base de données vers export_path.
+    La copie passe par l'API de sauvegarde SQLite, page par page : elle reste
+    cohérente même si une écriture a lieu pendant l'export et n'est jamais
+    chargée entièrement en mémoire.
+    """
     try:
-        with open(DB_PATH, 'rb') as src_file:
-            data = src_file.read()
-        with open(export_path, 'wb') as dest_file:
-            dest_file.write(data)
+        dest = sqlite3.connect(export_path)
+        try:
+            conn.backup(dest, pages=256, sleep=0.005)
+            dest.execute("PRAGMA journal_mode = DELETE;")
+        finally:
+            dest.close()
         print(f"Base exportée avec succès vers {export_path}")
     except Exception as e:
         print("Erreur lors de l'exportation de la base:", e)
@@ -301,6 +723,6 @@ if __name__ == "__main__":
         for candidature in candidatures[:4]:
             print(candidature)
         
-        conn.close()
+        get_manager().close_all()
     else:
         print("Erreur! Impossible de créer la connexion à la base de données.")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Gestionnaire de connexions SQLite
+Connexions partagées par thread, mode WAL et PRAGMAs configurables
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from config_manager import get_config
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Valeurs utilisées si la section "database" de la configuration ne les précise pas
+DEFAULT_DB_SETTINGS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout_ms": 5000,
+    "cache_size_kb": 20000,
+    "mmap_size_mb": 256
+}
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def load_database_settings() -> Dict:
+    """Lire la section "database" de la configuration (voir config_manager.py)"""
+    settings = dict(DEFAULT_DB_SETTINGS)
+    settings.update(get_config().section("database"))
+    return settings
+
+
+class DatabaseManager:
+    """
+    Fournit une connexion par thread et par fichier de base.
+
+    Chaque connexion est ouverte une seule fois par thread, en mode WAL avec
+    un busy_timeout : l'interface peut donc lire pendant qu'un scraping écrit,
+    sans erreur "database is locked".
+    """
+
+    def __init__(self, settings: Optional[Dict] = None):
+        self.settings = dict(DEFAULT_DB_SETTINGS)
+        self.settings.update(settings if settings is not None else load_database_settings())
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+
+    def get_connection(self, db_path: str) -> sqlite3.Connection:
+        """Obtenir la connexion du thread courant vers db_path (ouverte à la première demande)"""
+        key = db_path if db_path == ":memory:" else os.path.abspath(db_path)
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+
+        conn = connections.get(key)
+        if conn is not None:
+            try:
+                conn.total_changes  # Lève ProgrammingError si la connexion a été fermée
+                return conn
+            except sqlite3.ProgrammingError:
+                pass
+
+        conn = self._open(key)
+        connections[key] = conn
+        return conn
+
+    def attach(self, conn: sqlite3.Connection, db_path: str, alias: str) -> sqlite3.Connection:
+        """
+        Attacher db_path sous le nom `alias` à la connexion (une seule fois par connexion).
+        Les requêtes peuvent alors joindre main.<table> et <alias>.<table>.
+        """
+        if not alias.isidentifier():
+            raise ValueError(f"Alias de base invalide: {alias}")
+        attached = {row[1] for row in conn.execute("PRAGMA database_list;")}
+        if alias not in attached:
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute(f"ATTACH DATABASE ? AS {alias};", (os.path.abspath(db_path),))
+        return conn
+
+    def _open(self, db_path: str) -> sqlite3.Connection:
+        """Ouvrir une connexion et appliquer les PRAGMAs configurés"""
+        busy_timeout_ms = int(self.settings["busy_timeout_ms"])
+        conn = sqlite3.connect(db_path, timeout=busy_timeout_ms / 1000, check_same_thread=False)
+        self.apply_pragmas(conn, in_memory=db_path == ":memory:")
+        with self._lock:
+            self._connections.append(conn)
+        print(f"Connexion réussie à la base de données {db_path}")
+        return conn
+
+    def apply_pragmas(self, conn: sqlite3.Connection, in_memory: bool = False):
+        """Appliquer journal_mode, synchronous, busy_timeout, cache_size et mmap_size"""
+        journal_mode = str(self.settings["journal_mode"]).upper()
+        synchronous = str(self.settings["synchronous"]).upper()
+        if journal_mode not in JOURNAL_MODES:
+            print(f"journal_mode inconnu: {journal_mode}, utilisation de WAL")
+            journal_mode = "WAL"
+        if synchronous not in SYNCHRONOUS_MODES:
+            print(f"synchronous inconnu: {synchronous}, utilisation de NORMAL")
+            synchronous = "NORMAL"
+
+        if not in_memory:
+            conn.execute(f"PRAGMA journal_mode = {journal_mode};")
+        conn.execute(f"PRAGMA synchronous = {synchronous};")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.settings['busy_timeout_ms'])};")
+        # Une valeur négative de cache_size s'exprime en KiB
+        conn.execute(f"PRAGMA cache_size = -{int(self.settings['cache_size_kb'])};")
+        conn.execute(f"PRAGMA mmap_size = {int(self.settings['mmap_size_mb']) * 1024 * 1024};")
+
+    def close_thread_connections(self):
+        """Fermer les connexions ouvertes par le thread courant (fin d'un thread de scraping)"""
+        connections = getattr(self._local, "connections", {})
+        for conn in connections.values():
+            self._close(conn)
+        connections.clear()
+
+    def close_all(self):
+        """Fermer toutes les connexions ouvertes (arrêt de l'application)"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def _close(self, conn: sqlite3.Connection):
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+_manager: Optional[DatabaseManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_manager() -> DatabaseManager:
+    """Obtenir le gestionnaire de connexions du processus"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = DatabaseManager()
+    return _manager
+
+
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """Raccourci vers DatabaseManager.get_connection sur le gestionnaire du processus"""
+    return get_manager().get_connection(db_path)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Déduplication des offres entre sources
+URL canonique, empreinte (entreprise, titre, ville) et fusion des doublons existants
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from database_manager import get_manager
+
+# Paramètres de suivi retirés des URL (campagnes, affiliation, position dans la liste)
+TRACKING_PARAMS = {
+    "gclid", "fbclid", "msclkid", "xtor", "from", "src", "ref", "referrer", "origin",
+    "tk", "vjk", "advn", "adid", "sjdu", "acatk", "pub", "trk", "trackingid", "position"
+}
+TRACKING_PREFIXES = ("utm_", "at_", "mc_")
+
+# Mentions sans valeur pour comparer deux intitulés ("Stage - Assistant H/F")
+_MENTIONS = re.compile(r"\b(h\s*/\s*f|f\s*/\s*h|m\s*/\s*f|f\s*/\s*m|h\s*-\s*f)\b")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def canonical_url(url: Optional[str]) -> Optional[str]:
+    """
+    URL canonique d'une offre : schéma et hôte en minuscules, sans "www.",
+    sans fragment ni paramètres de suivi, paramètres restants triés.
+    """
+    if not url or not isinstance(url, str):
+        return None
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    params = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=False)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme,
+                       host, path, urlencode(sorted(params)), ""))
+
+
+def url_key(url: Optional[str]) -> Optional[int]:
+    """Empreinte 64 bits de l'URL canonique (ensemble compact des URL connues)"""
+    url = canonical_url(url)
+    if url is None:
+        return None
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def _normaliser_texte(texte: Optional[str]) -> str:
+    """Minuscules, sans accents, sans mentions H/F ni ponctuation"""
+    if not texte:
+        return ""
+    texte = unicodedata.normalize("NFKD", str(texte).lower())
+    texte = "".join(c for c in texte if not unicodedata.combining(c))
+    texte = _MENTIONS.sub(" ", texte)
+    return _NON_ALNUM.sub(" ", texte).strip()
+
+
+def offre_fingerprint(entreprise: Optional[str], titre: Optional[str], ville: Optional[str]) -> int:
+    """
+    Empreinte 64 bits (entier SQLite) de l'offre normalisée : la même offre
+    publiée sur plusieurs sites a la même empreinte.
+    """
+    cle = "|".join(_normaliser_texte(v) for v in (entreprise, titre, ville))
+    return int.from_bytes(hashlib.blake2b(cle.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+# Champs fournis par les scrapers, couverts par l'empreinte de contenu (ordre fixe)
+CONTENT_HASH_COLUMNS = (
+    "entreprise", "titre", "ville", "departement", "type_contrat", "remuneration",
+    "date_publication", "duree", "mots_cles"
+)
+
+
+def content_hash(values) -> int:
+    """
+    Empreinte 64 bits du contenu d'une offre (valeurs dans l'ordre de CONTENT_HASH_COLUMNS) :
+    un nouveau scraping ne réécrit la ligne que si elle change. La date de publication
+    est comparée au jour près, car les scrapers la déduisent de "il y a 3 jours".
+    """
+    valeurs = ["" if v is None else str(v) for v in values]
+    date_index = CONTENT_HASH_COLUMNS.index("date_publication")
+    valeurs[date_index] = valeurs[date_index][:10]
+    cle = "\x1f".join(valeurs)
+    return int.from_bytes(hashlib.blake2b(cle.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def source_from_url(url: Optional[str]) -> str:
+    """Nom de source déduit de l'hôte ("hellowork.com") quand il n'est pas connu"""
+    host = urlsplit(url or "").netloc.lower()
+    return host[4:] if host.startswith("www.") else (host or "Inconnue")
+
+
+def collapse_duplicates(conn: sqlite3.Connection, batch_size: int = 500,
+                        candidatures_db: Optional[str] = None) -> Dict:
+    """
+    Fusionner les offres déjà en base qui ont la même empreinte.
+
+    Pour chaque groupe, l'offre la plus ancienne est conservée : elle reçoit les
+    sources (et l'URL) des doublons, leurs email/description manquants et leurs
+    candidatures, puis les doublons sont supprimés. Une transaction par lot de
+    `batch_size` groupes. Retourne {'groupes', 'supprimees', 'duree_s'}.
+    """
+    start = time.perf_counter()
+    if conn.in_transaction:
+        conn.commit()
+    suivi = candidatures_db and os.path.exists(candidatures_db)
+    if suivi:
+        get_manager().attach(conn, candidatures_db, "candidatures_db")
+
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS doublons (id INTEGER PRIMARY KEY, garde INTEGER NOT NULL);")
+    groups = 0
+    removed = 0
+    last_fingerprint = None
+    while True:
+        # Groupes parcourus dans l'ordre de l'index idx_offres_fingerprint
+        rows = conn.execute("""
+            SELECT fingerprint, MIN(id) FROM offres
+            WHERE fingerprint IS NOT NULL AND (? IS NULL OR fingerprint > ?)
+            GROUP BY fingerprint HAVING COUNT(*) > 1
+            ORDER BY fingerprint LIMIT ?;
+        """, (last_fingerprint, last_fingerprint, batch_size)).fetchall()
+        if not rows:
+            break
+        try:
+            conn.execute("BEGIN IMMEDIATE;")
+            conn.execute("DELETE FROM temp.doublons;")
+            conn.executemany("""
+                INSERT INTO temp.doublons(id, garde)
+                SELECT id, ? FROM offres WHERE fingerprint = ? AND id <> ?;
+            """, [(garde, fingerprint, garde) for fingerprint, garde in rows])
+
+            # Sources : celles des doublons, puis leur propre URL
+            conn.execute("""
+                UPDATE OR IGNORE sources_offres
+                SET offre_id = (SELECT garde FROM temp.doublons d WHERE d.id = sources_offres.offre_id)
+                WHERE offre_id IN (SELECT id FROM temp.doublons);
+            """)
+            conn.execute("DELETE FROM sources_offres WHERE offre_id IN (SELECT id FROM temp.doublons);")
+            for offre_id, url in conn.execute("""
+                SELECT d.garde, o.url FROM temp.doublons d JOIN offres o ON o.id = d.id;
+            """).fetchall():
+                conn.execute("INSERT OR IGNORE INTO sources_offres(offre_id, source, url) VALUES (?, ?, ?);",
+                             (offre_id, source_from_url(url), url))
+
+            # Champs complétés depuis les doublons quand l'offre gardée ne les a pas
+            conn.execute("""
+                UPDATE offres SET
+                    email = COALESCE(email, (SELECT o.email FROM temp.doublons d JOIN offres o ON o.id = d.id
+                                             WHERE d.garde = offres.id AND o.email IS NOT NULL LIMIT 1)),
+                    description = COALESCE(description, (SELECT o.description FROM temp.doublons d JOIN offres o ON o.id = d.id
+                                                         WHERE d.garde = offres.id AND o.description IS NOT NULL LIMIT 1))
+                WHERE id IN (SELECT garde FROM temp.doublons);
+            """)
+
+            # Candidatures rattachées à l'offre gardée
+            conn.execute("""
+                UPDATE main.candidatures SET offre_id = (SELECT garde FROM temp.doublons d WHERE d.id = offre_id)
+                WHERE offre_id IN (SELECT id FROM temp.doublons);
+            """)
+            if suivi:
+                conn.execute("""
+                    UPDATE candidatures_db.candidatures SET offre_id = (SELECT garde FROM temp.doublons d WHERE d.id = offre_id)
+                    WHERE offre_id IN (SELECT id FROM temp.doublons);
+                """)
+
+            cur = conn.execute("DELETE FROM offres WHERE id IN (SELECT id FROM temp.doublons);")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+        groups += len(rows)
+        removed += cur.rowcount
+        last_fingerprint = rows[-1][0]
+        if len(rows) < batch_size:
+            break
+
+    report = {'groupes': groups, 'supprimees': removed, 'duree_s': round(time.perf_counter() - start, 3)}
+    print(f"Déduplication : {removed} doublons fusionnés dans {groups} offres")
+    return report
+
+
+if __name__ == "__main__":
+    from database import DB_PATH, create_connection, create_tables
+
+    conn = create_connection(DB_PATH)
+    create_tables(conn)
+    collapse_duplicates(conn, candidatures_db=os.path.join(os.path.dirname(DB_PATH), "candidatures.db"))
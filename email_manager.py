@@ -6,20 +6,43 @@ Recherche et validation d'adresses email
 
 import re
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import time
 from typing import List, Dict, Optional, Set
 
+from html_parser import get_parser
+from http_cache import HttpCache
+
+# Une page d'entreprise revue depuis moins d'une journée est servie sans requête
+PAGE_MAX_AGE_S = 24 * 3600
+
+# Patterns pour détecter les emails, et adresses génériques écartées
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+GENERIC_EMAIL_PATTERNS = (
+    'noreply', 'no-reply', 'donotreply', 'admin@', 'webmaster@',
+    'info@', 'contact@', 'support@', 'help@', 'test@', 'example@'
+)
+
+
+def is_generic_email(email: str) -> bool:
+    """Vérifier si un email est générique"""
+    return any(pattern in email.lower() for pattern in GENERIC_EMAIL_PATTERNS)
+
+
 class EmailManager:
-    def __init__(self):
+    def __init__(self, cache: Optional[HttpCache] = None):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # Pages téléchargées via le cache HTTP ; résultats d'analyse gardés par contenu (SHA-256)
+        self.cache = cache or HttpCache()
+        self.parser = get_parser()
+        self._emails_par_page: Dict[str, Set[str]] = {}
+        self._contacts_par_page: Dict[tuple, List[str]] = {}
         
         # Patterns pour détecter les emails
-        self.email_pattern = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+        self.email_pattern = EMAIL_PATTERN
         
         # Mots-clés pour identifier les pages de contact
         self.contact_keywords = [
@@ -39,34 +62,30 @@ class EmailManager:
     
     def _is_generic_email(self, email: str) -> bool:
         """Vérifier si un email est générique"""
-        generic_patterns = [
-            'noreply', 'no-reply', 'donotreply', 'admin@', 'webmaster@',
-            'info@', 'contact@', 'support@', 'help@', 'test@', 'example@'
-        ]
-        return any(pattern in email.lower() for pattern in generic_patterns)
+        return is_generic_email(email)
     
     def search_emails_on_page(self, url: str) -> Set[str]:
         """Rechercher des emails sur une page web"""
         emails = set()
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
+            response = self._get(url)
+            if response is None:
+                return emails
+            if response.sha256 in self._emails_par_page:
+                # Page déjà analysée : pas de nouvelle analyse
+                return set(self._emails_par_page[response.sha256])
             
             # Extraire les emails du contenu HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
-            text_content = soup.get_text()
+            text_content, links = self.parser.page(response.text)
             emails.update(self.extract_emails_from_text(text_content))
             
             # Extraire les emails des attributs href
-            links = soup.find_all('a', href=True)
-            for link in links:
-                href = link['href']
+            for href, _ in links:
                 if href.startswith('mailto:'):
                     email = href[7:]  # Enlever 'mailto:'
                     if not self._is_generic_email(email):
                         emails.add(email.lower())
-            
-            time.sleep(1)  # Délai entre les requêtes
+            self._emails_par_page[response.sha256] = set(emails)
             
         except Exception as e:
             print(f"Erreur recherche emails sur {url}: {e}")
@@ -77,28 +96,42 @@ class EmailManager:
         """Trouver les pages de contact d'un site"""
         contact_pages = []
         try:
-            response = self.session.get(base_url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            links = soup.find_all('a', href=True)
+            response = self._get(base_url)
+            if response is None:
+                return contact_pages
+            if (base_url, response.sha256) in self._contacts_par_page:
+                return list(self._contacts_par_page[(base_url, response.sha256)])
             
-            for link in links:
-                href = link['href']
-                text = link.get_text().lower()
+            _, links = self.parser.page(response.text)
+            for href, text in links:
+                text = text.lower()
                 
                 # Vérifier si le lien ou le texte contient des mots-clés de contact
                 if any(keyword in href.lower() or keyword in text for keyword in self.contact_keywords):
                     full_url = urljoin(base_url, href)
                     if self._is_same_domain(base_url, full_url):
                         contact_pages.append(full_url)
-            
-            time.sleep(1)
+            contact_pages = list(set(contact_pages))  # Supprimer les doublons
+            self._contacts_par_page[(base_url, response.sha256)] = contact_pages
             
         except Exception as e:
             print(f"Erreur recherche pages contact sur {base_url}: {e}")
         
-        return list(set(contact_pages))  # Supprimer les doublons
+        return list(contact_pages)
+    
+    def _get(self, url: str):
+        """
+        Télécharger une page via le cache HTTP (requête conditionnelle, ou aucune
+        requête si la page a été vue depuis moins de PAGE_MAX_AGE_S).
+        Retourne None si la page n'est pas disponible (code différent de 200).
+        """
+        response = self.cache.get(self.session, url, timeout=10, max_age=PAGE_MAX_AGE_S)
+        if response.requete:
+            time.sleep(1)  # Délai entre les requêtes effectivement envoyées
+        if response.status_code != 200:
+            print(f"Page {url} indisponible (code {response.status_code})")
+            return None
+        return response
     
     def _is_same_domain(self, base_url: str, url: str) -> bool:
         """Vérifier si deux URLs sont du même domaine"""
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Enrichissement des offres par leur page de détail
+Description, email de contact, dates de contrat et domaine, téléchargés en
+parallèle (concurrence bornée par hôte) et enregistrés par lots, avec reprise
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from config_manager import get_config
+from database_manager import get_manager
+from email_manager import EMAIL_PATTERN, is_generic_email
+from html_parser import get_parser
+from normalisation import add_months, parse_date, parse_date_debut
+
+# Domaines proposés par les filtres, reconnus par mots-clés (titre compté trois fois)
+DOMAINES = {
+    "Informatique": ("informatique", "développeur", "developpeur", "développement", "logiciel", "software",
+                     "data", "devops", "cybersécurité", "réseau", "système", "python", "java", "web"),
+    "Marketing": ("marketing", "communication", "seo", "réseaux sociaux", "social media", "community manager",
+                  "brand", "contenu", "événementiel"),
+    "Commerce": ("commercial", "commerciale", "vente", "business developer", "account manager", "achats",
+                 "retail", "relation client", "e-commerce"),
+    "Finance": ("finance", "financier", "comptab", "audit", "contrôle de gestion", "trésorerie", "banque",
+                "fiscal", "assurance"),
+}
+DOMAINE_DEFAUT = "Autre"
+
+# Réponses définitives : la page n'existe plus, l'offre ne sera pas retentée
+CODES_DEFINITIFS = (404, 410)
+
+_JSON_LD = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.IGNORECASE | re.DOTALL)
+_ESPACES = re.compile(r"\s+")
+
+
+def _job_posting(html: str) -> Optional[Dict]:
+    """Objet schema.org JobPosting embarqué dans la page (JSON-LD), s'il existe"""
+    for bloc in _JSON_LD.findall(html):
+        try:
+            data = json.loads(bloc)
+        except ValueError:
+            continue
+        candidats = data if isinstance(data, list) else data.get("@graph", [data]) if isinstance(data, dict) else []
+        for item in candidats:
+            if isinstance(item, dict) and item.get("@type") == "JobPosting":
+                return item
+    return None
+
+
+def classer_domaine(titre: Optional[str], description: Optional[str] = None, secteur: Optional[str] = None) -> str:
+    """Domaine de l'offre (clé de DOMAINES) d'après son intitulé, son secteur et sa description"""
+    titre = (titre or "").lower()
+    reste = f"{secteur or ''} {description or ''}".lower()
+    scores = {domaine: sum(3 * titre.count(mot) + reste.count(mot) for mot in mots)
+              for domaine, mots in DOMAINES.items()}
+    domaine, score = max(scores.items(), key=lambda item: item[1])
+    return domaine if score else DOMAINE_DEFAUT
+
+
+def extract_detail(html: str, titre: Optional[str] = None, parser=None) -> Dict:
+    """
+    Champs d'une page de détail : {'description', 'email', 'date_debut', 'domaine'}.
+    La description et la date de début viennent du JSON-LD JobPosting quand la page
+    en contient un ; l'email est le premier email non générique du texte ou des liens.
+    """
+    parser = parser or get_parser()
+    texte, liens = parser.page(html)
+    offre = _job_posting(html) or {}
+
+    description = offre.get("description")
+    if description:
+        description = _ESPACES.sub(" ", parser.page(description)[0]).strip() or None
+    secteur = offre.get("industry") or offre.get("occupationalCategory")
+    if isinstance(secteur, list):
+        secteur = " ".join(str(s) for s in secteur)
+
+    email = None
+    candidats = EMAIL_PATTERN.findall(description or "") + EMAIL_PATTERN.findall(texte)
+    candidats += [href[7:].split("?")[0] for href, _ in liens if href.startswith("mailto:")]
+    for candidat in candidats:
+        if not is_generic_email(candidat):
+            email = candidat.lower()
+            break
+
+    date_debut = None
+    if isinstance(offre.get("jobStartDate"), str):
+        debut = parse_date(offre["jobStartDate"][:10])
+        date_debut = debut.strftime("%Y-%m-%d") if debut else None
+    date_debut = date_debut or parse_date_debut(description or texte)
+
+    return {'description': description, 'email': email, 'date_debut': date_debut,
+            'domaine': classer_domaine(titre, description, secteur)}
+
+
+class HostLimiter:
+    """
+    Au plus `per_host` requêtes en cours par hôte ; chaque emplacement est rendu
+    après un délai aléatoire entre delay_min et delay_max (politesse par site).
+    """
+
+    def __init__(self, per_host: int = 2, delay_min: float = 1.0, delay_max: float = 3.0):
+        self.per_host = max(1, per_host)
+        self.delay_min = delay_min
+        self.delay_max = delay_max
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+
+    @contextmanager
+    def slot(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            sem = self._slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        sem.acquire()
+        try:
+            yield
+        finally:
+            timer = threading.Timer(random.uniform(self.delay_min, self.delay_max), sem.release)
+            timer.daemon = True
+            timer.start()
+
+
+def _enrichir(offre, session, limiter: HostLimiter, timeout: float, cache=None, archive=None, parser=None):
+    """
+    Télécharger et analyser la page de détail d'une offre (exécuté dans un thread du pool).
+    Retourne (id, statut, champs) ; statut vaut None sur erreur réseau.
+    """
+    offre_id, url, titre, duree_mois, date_debut = offre
+    try:
+        with limiter.slot(url):
+            if cache is not None:
+                resp = cache.get(session, url, timeout=timeout)
+            else:
+                resp = session.get(url, timeout=timeout)
+    except requests.RequestException as e:
+        print(f"Erreur réseau sur {url}: {e}")
+        return offre_id, None, None
+    if resp.status_code != 200:
+        return offre_id, resp.status_code, None
+    if archive is not None and not getattr(resp, "unchanged", False):
+        archive.put(url, resp.text, kind="detail")
+    try:
+        champs = extract_detail(resp.text, titre, parser)
+    except Exception as e:
+        print(f"Erreur analyse de la page {url}: {e}")
+        return offre_id, None, None
+    # Date de fin calculée depuis la date de début conservée en base, s'il y en a une
+    champs['date_fin'] = add_months(date_debut or champs['date_debut'], duree_mois)
+    return offre_id, 200, champs
+
+
+def _fermer_connexions(executor: ThreadPoolExecutor, workers: int):
+    """
+    Fermer les connexions SQLite (index du cache HTTP, archive) ouvertes par les
+    threads du pool : une tâche par thread, la barrière empêchant un même thread
+    d'en exécuter deux.
+    """
+    barriere = threading.Barrier(workers)
+
+    def fermer():
+        try:
+            barriere.wait(timeout=10)
+        except threading.BrokenBarrierError:
+            pass
+        get_manager().close_thread_connections()
+
+    for future in [executor.submit(fermer) for _ in range(workers)]:
+        future.result()
+
+
+def _enregistrer_lot(conn, resultats) -> Dict:
+    """Écrire les résultats d'un lot en une transaction ; les champs déjà renseignés sont conservés"""
+    enrichies = [(c['description'], c['email'], c['domaine'], c['date_debut'], c['date_fin'], offre_id)
+                 for offre_id, statut, c in resultats if statut == 200]
+    abandonnees = [(offre_id,) for offre_id, statut, _ in resultats if statut in CODES_DEFINITIFS]
+    echecs = [(offre_id,) for offre_id, statut, _ in resultats
+              if statut != 200 and statut not in CODES_DEFINITIFS]
+    try:
+        conn.executemany("""
+            UPDATE offres SET
+                description = COALESCE(description, ?),
+                email = COALESCE(email, ?),
+                domaine = CASE WHEN domaine IS NULL OR domaine = 'Inconnu' THEN ? ELSE domaine END,
+                date_debut = COALESCE(date_debut, ?),
+                date_fin = COALESCE(date_fin, ?),
+                date_enrichissement = CURRENT_TIMESTAMP
+            WHERE id = ?;
+        """, enrichies)
+        conn.executemany("UPDATE offres SET date_enrichissement = CURRENT_TIMESTAMP WHERE id = ?;", abandonnees)
+        conn.executemany("UPDATE offres SET enrichissement_essais = enrichissement_essais + 1 WHERE id = ?;", echecs)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {'enrichies': len(enrichies), 'introuvables': len(abandonnees), 'echecs': len(echecs)}
+
+
+def enrich_offres(conn, limit: Optional[int] = None, batch_size: Optional[int] = None,
+                  workers: Optional[int] = None, per_host: Optional[int] = None, max_essais: Optional[int] = None,
+                  session: Optional[requests.Session] = None, cache=None, archive=None, parser=None) -> Dict:
+    """
+    Enrichir les offres jamais enrichies (date_enrichissement vide), par ordre d'id.
+
+    Les pages de détail sont téléchargées par `workers` threads, au plus `per_host`
+    à la fois par site ; chaque lot de `batch_size` offres est enregistré en une
+    transaction. Une interruption ne perd que le lot en cours : l'appel suivant
+    reprend aux offres restantes. Une offre en erreur est retentée aux appels
+    suivants, jusqu'à `max_essais` fois ; une page 404/410 n'est pas retentée.
+
+    Les paramètres absents viennent de la section enrichment de la configuration.
+    Retourne {'offres', 'enrichies', 'introuvables', 'echecs', 'duree_s', 'offres_par_s'}.
+    """
+    from scraper_manager import create_session
+
+    config = get_config()
+    batch_size = batch_size or config.get_int("enrichment.batch_size", 200)
+    workers = workers or config.get_int("enrichment.workers", 8)
+    per_host = per_host or config.get_int("enrichment.per_host", 2)
+    max_essais = max_essais or config.get_int("enrichment.max_essais", 3)
+    timeout = config.get_float("scraping.timeout_s", 15)
+    limiter = HostLimiter(per_host, config.get_float("scraping.delay_min", 1), config.get_float("scraping.delay_max", 3))
+    parser = parser or get_parser()
+    own_session = session is None
+    if own_session:
+        session = create_session(workers, config.get_str("scraping.user_agent", "Mozilla/5.0"))
+
+    report = {'offres': 0, 'enrichies': 0, 'introuvables': 0, 'echecs': 0}
+    start = time.perf_counter()
+    last_id = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="enrichissement") as executor:
+            try:
+                while limit is None or report['offres'] < limit:
+                    taille = batch_size if limit is None else min(batch_size, limit - report['offres'])
+                    offres = conn.execute("""
+                        SELECT id, url, titre, duree_mois, date_debut FROM offres
+                        WHERE date_enrichissement IS NULL AND enrichissement_essais < ? AND id > ?
+                        ORDER BY id LIMIT ?;
+                    """, (max_essais, last_id, taille)).fetchall()
+                    if not offres:
+                        break
+                    resultats = list(executor.map(
+                        partial(_enrichir, session=session, limiter=limiter, timeout=timeout,
+                                cache=cache, archive=archive, parser=parser), offres))
+                    for cle, n in _enregistrer_lot(conn, resultats).items():
+                        report[cle] += n
+                    report['offres'] += len(offres)
+                    last_id = offres[-1][0]
+                    print(f"Enrichissement : {report['offres']} offres traitées ({report['enrichies']} enrichies)")
+            finally:
+                _fermer_connexions(executor, workers)
+    finally:
+        if own_session:
+            session.close()
+
+    duree = time.perf_counter() - start
+    report['duree_s'] = round(duree, 3)
+    report['offres_par_s'] = round(report['offres'] / duree, 1) if duree > 0 else 0.0
+    print(f"Enrichissement terminé : {report['enrichies']} enrichies, {report['introuvables']} introuvables, "
+          f"{report['echecs']} en erreur ({report['duree_s']}s)")
+    return report
+
+
+def pending_count(conn, max_essais: Optional[int] = None) -> int:
+    """Nombre d'offres restant à enrichir"""
+    max_essais = max_essais or get_config().get_int("enrichment.max_essais", 3)
+    return conn.execute("""
+        SELECT COUNT(*) FROM offres WHERE date_enrichissement IS NULL AND enrichissement_essais < ?;
+    """, (max_essais,)).fetchone()[0]
+
+
+if __name__ == "__main__":
+    import sys
+
+    from database import DB_PATH, create_connection, create_tables
+    from html_archive import HtmlArchive
+    from http_cache import HttpCache
+
+    conn = create_connection(DB_PATH)
+    create_tables(conn)
+    print(f"{pending_count(conn)} offres à enrichir")
+    enrich_offres(conn, limit=int(sys.argv[1]) if len(sys.argv) > 1 else None,
+                  cache=HttpCache(), archive=HtmlArchive())
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Export des bases
+Offres et candidatures en flux vers CSV, JSON Lines, XLSX, Parquet ou Arrow IPC,
+sans charger les tables en mémoire
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Formats gérés par ce module (export.default_format) et extension des fichiers
+COLUMNAR_FORMATS = {"parquet": ".parquet", "arrow": ".arrows"}
+ROW_FORMATS = {"csv": ".csv", "jsonl": ".jsonl", "json": ".json", "xlsx": ".xlsx"}
+EXPORT_FORMATS = {**ROW_FORMATS, **COLUMNAR_FORMATS}
+
+# Nombre maximal de lignes d'une feuille Excel (en-tête compris)
+XLSX_MAX_ROWS = 1048576
+
+# Colonnes exportées : (nom, expression SQL, type) ; types "dict" = chaînes répétitives
+# encodées en dictionnaire, "timestamp" = secondes Unix, "date" = jours depuis 1970-01-01
+EXPORT_SPECS: Dict[str, Tuple[str, List[Tuple[str, str, str]]]] = {
+    "offres": ("offres", [
+        ("id", "id", "int"),
+        ("entreprise", "entreprise", "string"),
+        ("titre", "titre", "string"),
+        ("url", "url", "string"),
+        ("email", "email", "string"),
+        ("ville", "ville", "dict"),
+        ("departement", "departement", "dict"),
+        ("domaine", "domaine", "dict"),
+        ("type_contrat", "type_contrat", "dict"),
+        ("remuneration", "remuneration", "string"),
+        ("remun_min", "remun_min", "float"),
+        ("remun_max", "remun_max", "float"),
+        ("date_publication", "date_publication_ts", "timestamp"),
+        ("duree", "CAST(duree AS TEXT)", "string"),
+        ("duree_mois", "duree_mois", "float"),
+        ("mots_cles", "mots_cles", "string"),
+        ("description", "description", "string"),
+        ("date_ajout", "COALESCE(date_ajout_ts, CAST(strftime('%s', date_ajout) AS INTEGER))", "timestamp"),
+    ]),
+    "candidatures": ("candidatures", [
+        ("id", "id", "int"),
+        ("offre_id", "offre_id", "int"),
+        ("entreprise", "entreprise", "string"),
+        ("poste", "poste", "string"),
+        ("url", "url", "string"),
+        ("email_contact", "email_contact", "string"),
+        ("date_candidature", "CAST(julianday(date_candidature) - 2440587.5 AS INTEGER)", "date"),
+        ("statut", "statut", "dict"),
+        ("type_candidature", "type_candidature", "dict"),
+        ("mode_envoi", "mode_envoi", "dict"),
+        ("date_relance", "CAST(julianday(date_relance) - 2440587.5 AS INTEGER)", "date"),
+        ("notes", "notes", "string"),
+        ("date_creation", "CAST(strftime('%s', date_creation) AS INTEGER)", "timestamp"),
+        ("date_modification", "CAST(strftime('%s', date_modification) AS INTEGER)", "timestamp"),
+    ]),
+}
+
+
+def _import_pyarrow():
+    """Importer pyarrow seulement à l'export (dépendance optionnelle)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("pyarrow non installé. Installez avec: pip install pyarrow")
+    return pa, pq
+
+
+def _import_openpyxl():
+    """Importer openpyxl seulement pour l'export XLSX (dépendance optionnelle)"""
+    try:
+        from openpyxl import Workbook
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    except ImportError:
+        raise ImportError("openpyxl non installé. Installez avec: pip install openpyxl")
+    return Workbook, ILLEGAL_CHARACTERS_RE
+
+
+def _values(row, columns: Sequence[str]):
+    """Valeurs d'une ligne dans l'ordre des colonnes (tuple, enregistrement ou dictionnaire)"""
+    if isinstance(row, dict):
+        return [row.get(col) for col in columns]
+    return row
+
+
+class _CsvWriter:
+    def __init__(self, f, columns):
+        self.writer = csv.writer(f)
+        self.writer.writerow(columns)
+
+    def write(self, values):
+        self.writer.writerow(values)
+
+
+class _JsonLinesWriter:
+    def __init__(self, f, columns):
+        self.f = f
+        self.columns = columns
+
+    def write(self, values):
+        self.f.write(json.dumps(dict(zip(self.columns, values)), ensure_ascii=False, default=str))
+        self.f.write("\n")
+
+
+class _JsonArrayWriter(_JsonLinesWriter):
+    """Tableau JSON écrit élément par élément (format 'json' historique des filtres)"""
+
+    def __init__(self, f, columns):
+        super().__init__(f, columns)
+        self.first = True
+        f.write("[\n")
+
+    def write(self, values):
+        if not self.first:
+            self.f.write(",\n")
+        self.first = False
+        self.f.write(json.dumps(dict(zip(self.columns, values)), ensure_ascii=False, default=str))
+
+    def close(self):
+        self.f.write("\n]\n")
+
+
+class _XlsxWriter:
+    """Classeur openpyxl en mode write-only : les lignes partent dans un fichier temporaire"""
+
+    def __init__(self, path, columns, sheet):
+        Workbook, self.illegal = _import_openpyxl()
+        self.path = path
+        self.columns = list(columns)
+        self.sheet = sheet
+        self.workbook = Workbook(write_only=True)
+        self.sheets = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        self.sheets += 1
+        title = self.sheet if self.sheets == 1 else f"{self.sheet} ({self.sheets})"
+        self.worksheet = self.workbook.create_sheet(title[:31])
+        self.worksheet.append(self.columns)
+        self.rows = 1
+
+    def write(self, values):
+        if self.rows >= XLSX_MAX_ROWS:
+            self._new_sheet()
+        self.worksheet.append([self.illegal.sub("", v) if isinstance(v, str) else v for v in values])
+        self.rows += 1
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+def export_rows(rows: Iterable, path: str, format: str = "csv", columns: Optional[Sequence[str]] = None,
+                progress: Optional[Callable[[int, float], None]] = None, progress_every: int = 5000,
+                sheet: str = "offres") -> Dict:
+    """
+    Écrire des lignes au fil de l'eau en CSV (module csv), JSON Lines, JSON ou XLSX.
+
+    `rows` est un itérable quelconque : curseur sqlite3 (lu pas à pas), générateur,
+    liste d'enregistrements ou de dictionnaires. Sans `columns`, les colonnes sont
+    celles de la première ligne (keys()) ou de cursor.description.
+    progress(lignes, duree_s) est appelé toutes les `progress_every` lignes.
+    Retourne {'lignes', 'duree_s', 'lignes_par_s', 'fichier'}.
+    """
+    if format not in ROW_FORMATS:
+        raise ValueError(f"Format d'export inconnu: {format}")
+    iterator = iter(rows)
+    first = next(iterator, None)
+    if columns is None:
+        if first is not None and hasattr(first, "keys"):
+            columns = list(first.keys())
+        elif getattr(rows, "description", None):
+            columns = [col[0] for col in rows.description]
+        else:
+            columns = []
+    tmp_path = path + ".tmp"
+
+    start = time.perf_counter()
+    total = 0
+    try:
+        if format == "xlsx":
+            f = None
+            writer = _XlsxWriter(tmp_path, columns, sheet)
+        else:
+            f = open(tmp_path, "w", newline="", encoding="utf-8")
+            writer = {"csv": _CsvWriter, "jsonl": _JsonLinesWriter, "json": _JsonArrayWriter}[format](f, columns)
+        try:
+            if first is not None:
+                writer.write(_values(first, columns))
+                total = 1
+                for row in iterator:
+                    writer.write(_values(row, columns))
+                    total += 1
+                    if progress and total % progress_every == 0:
+                        progress(total, time.perf_counter() - start)
+            if hasattr(writer, "close"):
+                writer.close()
+        finally:
+            if f is not None:
+                f.close()
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    duration = time.perf_counter() - start
+    if progress:
+        progress(total, duration)
+    return {
+        'lignes': total,
+        'duree_s': round(duration, 3),
+        'lignes_par_s': round(total / duration, 1) if duration > 0 else 0.0,
+        'fichier': path
+    }
+
+
+def _arrow_schema(pa, columns):
+    types = {
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "string": pa.string(),
+        "dict": pa.dictionary(pa.int32(), pa.string()),
+        "timestamp": pa.timestamp("s"),
+        "date": pa.date32(),
+    }
+    return pa.schema([(name, types[kind]) for name, _, kind in columns])
+
+
+def _record_batch(pa, schema, columns, rows):
+    """Construire un RecordBatch à partir d'un lot de lignes SQLite"""
+    values = list(zip(*rows))
+    arrays = []
+    for i, (name, _, kind) in enumerate(columns):
+        if kind == "dict":
+            arrays.append(pa.array(values[i], type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values[i], type=schema.field(name).type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def export_table(conn: sqlite3.Connection, table: str, path: str, format: str = "parquet",
+                 batch_size: int = 50000, compression: str = "zstd",
+                 progress: Optional[Callable[[int, float], None]] = None) -> Dict:
+    """
+    Exporter une table (clé de EXPORT_SPECS) vers `path` sans la charger entière.
+
+    Formats ligne à ligne (csv, jsonl, json, xlsx) : le curseur est parcouru pas à pas
+    et les dates restent au format texte de la base. Parquet / Arrow : les lignes sont
+    lues par fetchmany(batch_size), chaque lot devient un row group Parquet ou un
+    RecordBatch du flux Arrow IPC, avec dates typées.
+
+    progress(lignes, duree_s) est appelé pendant l'export.
+    Retourne {'lignes', 'duree_s', 'lignes_par_s', 'fichier'}.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export inconnu: {format}")
+    if table not in EXPORT_SPECS:
+        raise ValueError(f"Table non exportable: {table}")
+    source, columns = EXPORT_SPECS[table]
+
+    if format in ROW_FORMATS:
+        names = [name for name, _, _ in columns]
+        cur = conn.cursor()
+        cur.arraysize = batch_size
+        cur.execute(f"SELECT {', '.join(names)} FROM {source} ORDER BY id;")
+        return export_rows(cur, path, format, columns=names, progress=progress,
+                           progress_every=batch_size // 10 or 1, sheet=table)
+
+    pa, pq = _import_pyarrow()
+    schema = _arrow_schema(pa, columns)
+    select = ", ".join(f"{expr} AS {name}" for name, expr, _ in columns)
+    tmp_path = path + ".tmp"
+
+    start = time.perf_counter()
+    total = 0
+    cur = conn.cursor()
+    cur.execute(f"SELECT {select} FROM {source} ORDER BY id;")
+    try:
+        if format == "parquet":
+            writer = pq.ParquetWriter(tmp_path, schema, compression=compression)
+        else:
+            # Format flux : chaque lot peut avoir son propre dictionnaire
+            writer = pa.ipc.new_stream(tmp_path, schema)
+        try:
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                batch = _record_batch(pa, schema, columns, rows)
+                if format == "parquet":
+                    writer.write_table(pa.Table.from_batches([batch]))
+                else:
+                    writer.write_batch(batch)
+                total += len(rows)
+                if progress:
+                    progress(total, time.perf_counter() - start)
+        finally:
+            writer.close()
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    duration = time.perf_counter() - start
+    return {
+        'lignes': total,
+        'duree_s': round(duration, 3),
+        'lignes_par_s': round(total / duration, 1) if duration > 0 else 0.0,
+        'fichier': path
+    }
+
+
+def export_path(export_dir: str, table: str, format: str, include_timestamp: bool = True) -> str:
+    """Nom du fichier d'export : <table>[_YYYYmmdd_HHMMSS].<extension du format>"""
+    suffix = f"_{datetime.now().strftime('%Y%m%d_%H%M%S')}" if include_timestamp else ""
+    return os.path.join(export_dir, f"{table}{suffix}{EXPORT_FORMATS[format]}")
+
+
+def read_export(path: str):
+    """Relire un export dans un DataFrame pandas (Parquet ou flux Arrow)"""
+    pa, pq = _import_pyarrow()
+    if path.endswith(COLUMNAR_FORMATS["parquet"]):
+        return pq.read_table(path).to_pandas()
+    with pa.ipc.open_stream(path) as reader:
+        return reader.read_pandas()
+
+
+if __name__ == "__main__":
+    import sys
+
+    from database import DB_PATH, create_connection, create_tables
+    from update_database import migrate_candidatures_db
+
+    fmt = sys.argv[1] if len(sys.argv) > 1 else "parquet"
+    data_dir = os.path.dirname(DB_PATH)
+    conn = create_connection(DB_PATH)
+    create_tables(conn)
+    report = export_table(conn, "offres", export_path(data_dir, "offres", fmt), fmt)
+    print(f"offres : {report['lignes']} lignes en {report['duree_s']}s -> {report['fichier']}")
+
+    candidatures_db = os.path.join(data_dir, "candidatures.db")
+    if os.path.exists(candidatures_db):
+        conn = create_connection(candidatures_db)
+        migrate_candidatures_db(conn)
+        report = export_table(conn, "candidatures", export_path(data_dir, "candidatures", fmt), fmt)
+        print(f"candidatures : {report['lignes']} lignes en {report['duree_s']}s -> {report['fichier']}")
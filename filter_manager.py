@@ -4,22 +4,25 @@ Gestionnaire de filtres
 Filtrage et tri avancés des offres
 """
 
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Iterable
 from datetime import datetime, timedelta
 import re
 
+from export_db import export_rows
+from normalisation import parse_date, parse_remuneration
+
 class FilterManager:
     def __init__(self):
         self.active_filters = {}
         self.sort_options = {
             'date_desc': lambda x: x.get('date_ajout', ''),
             'date_asc': lambda x: x.get('date_ajout', ''),
-            'entreprise_asc': lambda x: x.get('entreprise', '').lower(),
-            'entreprise_desc': lambda x: x.get('entreprise', '').lower(),
-            'titre_asc': lambda x: x.get('titre', '').lower(),
-            'titre_desc': lambda x: x.get('titre', '').lower(),
-            'domaine_asc': lambda x: x.get('domaine', '').lower(),
-            'domaine_desc': lambda x: x.get('domaine', '').lower()
+            'entreprise_asc': lambda x: (x.get('entreprise') or '').lower(),
+            'entreprise_desc': lambda x: (x.get('entreprise') or '').lower(),
+            'titre_asc': lambda x: (x.get('titre') or '').lower(),
+            'titre_desc': lambda x: (x.get('titre') or '').lower(),
+            'domaine_asc': lambda x: (x.get('domaine') or '').lower(),
+            'domaine_desc': lambda x: (x.get('domaine') or '').lower()
         }
     
     def apply_filters(self, offres: List[Dict], filters: Dict[str, Any]) -> List[Dict]:
@@ -35,26 +38,26 @@ class FilterManager:
         # Filtre par domaine
         if filters.get('domaine') and filters['domaine'] != 'Tous':
             filtered_offres = [o for o in filtered_offres 
-                             if o.get('domaine', '').lower() == filters['domaine'].lower()]
+                             if (o.get('domaine') or '').lower() == filters['domaine'].lower()]
         
         # Filtre par ville
         if filters.get('ville'):
             ville = filters['ville'].lower()
             filtered_offres = [o for o in filtered_offres 
-                             if ville in o.get('ville', '').lower()]
+                             if ville in (o.get('ville') or '').lower()]
         
         # Filtre par type de contrat
         if filters.get('type_contrat'):
             type_contrat = filters['type_contrat'].lower()
             filtered_offres = [o for o in filtered_offres 
-                             if type_contrat in o.get('type_contrat', '').lower()]
+                             if type_contrat in (o.get('type_contrat') or '').lower()]
         
         # Filtre par rémunération
         if filters.get('remuneration_min'):
             try:
                 min_rem = float(filters['remuneration_min'])
                 filtered_offres = [o for o in filtered_offres 
-                                 if self._extract_remuneration(o.get('remuneration', '')) >= min_rem]
+                                 if self._remuneration_offre(o) >= min_rem]
             except (ValueError, TypeError):
                 pass
         
@@ -62,7 +65,7 @@ class FilterManager:
             try:
                 max_rem = float(filters['remuneration_max'])
                 filtered_offres = [o for o in filtered_offres 
-                                 if self._extract_remuneration(o.get('remuneration', '')) <= max_rem]
+                                 if self._remuneration_offre(o, maximum=True) <= max_rem]
             except (ValueError, TypeError):
                 pass
         
@@ -87,7 +90,7 @@ class FilterManager:
         if filters.get('source'):
             source = filters['source'].lower()
             filtered_offres = [o for o in filtered_offres 
-                             if source in o.get('source', '').lower()]
+                             if source in (o.get('source') or '').lower()]
         
         # Filtre par email disponible
         if filters.get('avec_email'):
@@ -105,38 +108,32 @@ class FilterManager:
         """Vérifier si une offre correspond à un mot-clé"""
         search_fields = ['titre', 'entreprise', 'description', 'mots_cles']
         for field in search_fields:
-            if keyword in offre.get(field, '').lower():
+            if keyword in (offre.get(field) or '').lower():
                 return True
         return False
     
+    def _remuneration_offre(self, offre: Dict, maximum: bool = False) -> float:
+        """
+        Rémunération mensuelle d'une offre, bas de la fourchette (ou haut si maximum) :
+        colonnes normalisées si présentes, sinon texte
+        """
+        if offre.get('remun_min') is not None or offre.get('remun_max') is not None:
+            bornes = (offre.get('remun_max'), offre.get('remun_min')) if maximum else \
+                (offre.get('remun_min'), offre.get('remun_max'))
+            return float(next(b for b in bornes if b is not None))
+        remun_min, remun_max = parse_remuneration(offre.get('remuneration', ''))
+        montant = (remun_max or remun_min) if maximum else remun_min
+        return montant or 0.0
+    
     def _extract_remuneration(self, remuneration_str: str) -> float:
-        """Extraire la rémunération numérique d'une chaîne"""
-        if not remuneration_str:
-            return 0.0
-        
-        # Rechercher des nombres dans la chaîne
-        numbers = re.findall(r'\d+(?:\.\d+)?', remuneration_str.replace(',', '.'))
-        if numbers:
-            return float(numbers[0])
-        return 0.0
+        """Extraire la rémunération mensuelle minimale d'une chaîne"""
+        remun_min, _ = parse_remuneration(remuneration_str)
+        return remun_min or 0.0
     
     def _parse_date(self, date_str: str) -> Optional[datetime]:
         """Parser une date depuis une chaîne"""
-        if not date_str:
-            return None
-        
-        try:
-            # Essayer différents formats
-            formats = ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y', '%m/%d/%Y']
-            for fmt in formats:
-                try:
-                    return datetime.strptime(date_str, fmt).date()
-                except ValueError:
-                    continue
-        except:
-            pass
-        
-        return None
+        date_obj = parse_date(date_str)
+        return date_obj.date() if date_obj else None
     
     def sort_offres(self, offres: List[Dict], sort_key: str, reverse: bool = False) -> List[Dict]:
         """Trier les offres"""
@@ -202,7 +199,7 @@ class FilterManager:
                 stats['avec_url'] += 1
             
             # Rémunération
-            rem = self._extract_remuneration(offre.get('remuneration', ''))
+            rem = self._remuneration_offre(offre)
             if rem > 0:
                 remunerations.append(rem)
             
@@ -304,23 +301,15 @@ class FilterManager:
             'domaine_desc': 'Domaine (Z-A)'
         }
     
-    def export_filtered_data(self, offres: List[Dict], filename: str, format: str = 'csv') -> bool:
-        """Exporter les données filtrées"""
+    def export_filtered_data(self, offres: Iterable, filename: str, format: str = 'csv',
+                             progress=None) -> bool:
+        """
+        Exporter les données filtrées (csv, jsonl, json ou xlsx) en flux :
+        `offres` peut être une liste, un générateur ou un curseur.
+        """
         try:
-            if format.lower() == 'csv':
-                import csv
-                with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                    if offres:
-                        fieldnames = offres[0].keys()
-                        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                        writer.writeheader()
-                        writer.writerows(offres)
-                return True
-            elif format.lower() == 'json':
-                import json
-                with open(filename, 'w', encoding='utf-8') as jsonfile:
-                    json.dump(offres, jsonfile, indent=2, ensure_ascii=False, default=str)
-                return True
+            export_rows(offres, filename, format.lower(), progress=progress)
+            return True
         except Exception as e:
             print(f"Erreur export: {e}")
             return False
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Réplique en mémoire des offres récentes
+Base :memory: attachée à une connexion sur offres.db, limitée aux N derniers
+jours, tenue à jour par le journal des modifications et interrogée avant le disque
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from change_log import changes_since, current_seq, latest_ops
+from database import COLONNES_LISTE, fetch_offres_page
+from database_manager import get_manager
+
+# Nom de la base :memory: attachée
+HOT = "hot"
+
+# Tables recréées dans la réplique, avec leurs index et triggers (hors journal changes)
+TABLES_REPLIQUEES = ("offres", "offres_fts", "facet_counts")
+
+_CREATE = re.compile(r"^(CREATE\s+(?:UNIQUE\s+)?(?:VIRTUAL\s+)?(?:TABLE|INDEX|TRIGGER)\s+)", re.IGNORECASE)
+
+
+def _hot_schema(conn: sqlite3.Connection) -> List[str]:
+    """Instructions CREATE des objets de TABLES_REPLIQUEES, réécrites pour la base hot"""
+    marks = ", ".join("?" * len(TABLES_REPLIQUEES))
+    rows = conn.execute(f"""
+        SELECT sql FROM main.sqlite_master
+        WHERE tbl_name IN ({marks}) AND sql IS NOT NULL AND name NOT LIKE '%\\_changes\\_%' ESCAPE '\\'
+        ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 ELSE 2 END, rowid;
+    """, TABLES_REPLIQUEES).fetchall()
+    # Le corps d'un trigger de hot ne voit que les tables de hot : FTS et facettes suivent la réplique
+    return [_CREATE.sub(rf"\1{HOT}.", sql, count=1) for (sql,) in rows]
+
+
+class HotTier:
+    """
+    Offres ajoutées depuis moins de `days` jours, avec leur index plein texte
+    et leurs compteurs de facettes, dans une base :memory: attachée sous le nom
+    hot à une connexion sur offres.db.
+
+    Seules les offres récentes sont copiées (INSERT ... SELECT entre les deux
+    bases) : la mémoire occupée est celle de la réplique, pas celle du disque.
+    La réplique contient exactement les offres dont date_ajout >= cutoff : une page
+    (triée par date_ajout, id décroissants) est lue dans hot puis, si la réplique
+    est épuisée, complétée par la même connexion depuis main à partir de la
+    dernière ligne lue. Tant qu'elle n'est pas chargée (ou si days <= 0), tout
+    est lu sur le disque.
+    """
+
+    def __init__(self, db_path: str, days: float = 30):
+        self.db_path = db_path
+        self.days = days
+        self.cutoff: Optional[str] = None
+        self.seq = 0
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.stats = {'lignes': 0, 'duree_s': 0.0, 'requetes_memoire': 0, 'requetes_disque': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.days > 0
+
+    @property
+    def ready(self) -> bool:
+        return self.conn is not None
+
+    def start(self):
+        """Charger la réplique dans un thread (l'interface lit le disque en attendant)"""
+        if self.enabled:
+            threading.Thread(target=self._load_worker, daemon=True).start()
+
+    def _load_worker(self):
+        try:
+            self.load()
+        except Exception as e:
+            print(f"Erreur chargement des offres récentes en mémoire: {e}")
+
+    def _open(self) -> sqlite3.Connection:
+        """Connexion propre à la réplique (la base :memory: attachée n'existe que pour elle)"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        get_manager().apply_pragmas(conn)
+        conn.execute(f"ATTACH DATABASE ':memory:' AS {HOT};")
+        return conn
+
+    def load(self) -> Dict:
+        """
+        Créer la réplique : schéma des offres, de l'index plein texte et des
+        facettes dans hot, puis copie des offres récentes ; les triggers de hot
+        remplissent l'index et les compteurs pendant la copie.
+        """
+        start = time.perf_counter()
+        # date_ajout vaut CURRENT_TIMESTAMP (UTC)
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=self.days)).strftime("%Y-%m-%d %H:%M:%S")
+        conn = self._open()
+        try:
+            conn.execute("BEGIN;")
+            for sql in _hot_schema(conn):
+                conn.execute(sql)
+            # Même transaction : le journal est lu sur l'instantané copié, les
+            # modifications postérieures seront rejouées par sync()
+            seq = current_seq(conn)
+            colonnes = ", ".join(row[1] for row in conn.execute(f"PRAGMA {HOT}.table_info(offres);"))
+            conn.execute(f"""
+                INSERT INTO {HOT}.offres ({colonnes})
+                SELECT {colonnes} FROM main.offres WHERE date_ajout >= ?;
+            """, (cutoff,))
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+
+        rows = conn.execute(f"SELECT COUNT(*) FROM {HOT}.offres;").fetchone()[0]
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+            self.conn, self.cutoff, self.seq = conn, cutoff, seq
+        self.stats.update(lignes=rows, duree_s=round(time.perf_counter() - start, 3))
+        print(f"Offres récentes en mémoire : {rows} offres depuis {cutoff} ({self.stats['duree_s']}s)")
+        return self.stats
+
+    def sync(self, disk_conn: sqlite3.Connection, limit: int = 5000) -> int:
+        """
+        Rejouer le journal des modifications du disque sur la réplique.
+        Retourne le nombre d'offres modifiées ; au-delà de `limit`, la réplique est rechargée.
+        """
+        if not self.ready:
+            return 0
+        changes, seq = changes_since(disk_conn, self.seq, table='offres', limit=limit)
+        if len(changes) == limit:
+            self.load()
+            return limit
+        ops = latest_ops(changes)
+        if not ops:
+            self.seq = seq
+            return 0
+
+        ids = [row_id for (_, row_id) in ops]
+        marks = ", ".join("?" * len(ids))
+        with self._lock:
+            conn = self.conn
+            colonnes = ", ".join(row[1] for row in conn.execute(f"PRAGMA {HOT}.table_info(offres);"))
+            try:
+                # DELETE puis INSERT (et non REPLACE) pour que les triggers FTS et facettes suivent
+                conn.execute(f"DELETE FROM {HOT}.offres WHERE id IN ({marks});", ids)
+                conn.execute(f"""
+                    INSERT INTO {HOT}.offres ({colonnes})
+                    SELECT {colonnes} FROM main.offres WHERE id IN ({marks}) AND date_ajout >= ?;
+                """, ids + [self.cutoff])
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+        self.seq = seq
+        return len(ops)
+
+    def fetch_offres_page(self, disk_conn: sqlite3.Connection, filters=None, after=None, size=100,
+                          colonnes=COLONNES_LISTE):
+        """
+        Même contrat que database.fetch_offres_page : la page est lue dans hot
+        et complétée depuis main quand elle atteint des offres plus anciennes.
+        """
+        with self._lock:
+            conn = self.conn
+            if conn is not None:
+                rows = []
+                if after is None or after[0] >= self.cutoff:
+                    rows, next_cursor = fetch_offres_page(conn, filters, after, size, colonnes, schema=HOT)
+                    self.stats['requetes_memoire'] += 1
+                    if len(rows) == size:
+                        return rows, next_cursor
+                    after = (rows[-1].date_ajout, rows[-1].id) if rows else after
+                disk_rows, next_cursor = fetch_offres_page(conn, filters, after, size - len(rows), colonnes)
+                self.stats['requetes_disque'] += 1
+                return rows + disk_rows, next_cursor
+        rows, next_cursor = fetch_offres_page(disk_conn, filters, after, size, colonnes)
+        self.stats['requetes_disque'] += 1
+        return rows, next_cursor
+
+    def close(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Archive des pages HTML téléchargées
+Stockage compressé adressé par contenu, plafonné en taille (éviction LRU),
+et nouvelle analyse des offres sans accès réseau
+"""
+
+import gzip
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from database_manager import get_connection
+
+try:
+    import zstandard
+except ImportError:
+    # Sans zstandard, les pages sont compressées en gzip (bibliothèque standard)
+    zstandard = None
+
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "html_archive")
+CODEC_EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ImportError("zstandard non installé. Installez avec: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def read_blob(path: str, codec: str) -> str:
+    """Lire et décompresser une page archivée"""
+    with open(path, "rb") as f:
+        return _decompress(f.read(), codec).decode("utf-8")
+
+
+class HtmlArchive:
+    """
+    Pages HTML brutes (listes et détails d'offres) conservées compressées.
+
+    Chaque contenu est stocké une fois sous son SHA-256 (objects/ab/abcd....zst) ;
+    l'index SQLite associe chaque téléchargement (url, date) à son contenu.
+    Au-delà de max_size_mb, les contenus les moins récemment utilisés sont
+    supprimés avec leurs téléchargements.
+    """
+
+    def __init__(self, root: str = ARCHIVE_DIR, max_size_mb: float = 500, codec: Optional[str] = None):
+        self.root = root
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.codec = codec or ("zstd" if zstandard is not None else "gzip")
+        if self.codec == "zstd" and zstandard is None:
+            raise ImportError("zstandard non installé. Installez avec: pip install zstandard")
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self.index_path = os.path.join(root, "index.db")
+        self._create_index()
+
+    def _conn(self):
+        return get_connection(self.index_path)
+
+    def _create_index(self):
+        conn = self._conn()
+        conn.executescript("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            taille INTEGER NOT NULL,
+            taille_html INTEGER NOT NULL,
+            dernier_acces REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_blobs_dernier_acces ON blobs(dernier_acces);
+        CREATE TABLE IF NOT EXISTS pages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            type TEXT NOT NULL,
+            date_telechargement TEXT NOT NULL,
+            sha256 TEXT NOT NULL,
+            UNIQUE (url, date_telechargement)
+        );
+        CREATE INDEX IF NOT EXISTS idx_pages_sha256 ON pages(sha256);
+        CREATE INDEX IF NOT EXISTS idx_pages_type_date ON pages(type, date_telechargement);
+        """)
+        conn.commit()
+
+    def _blob_path(self, sha256: str, codec: str) -> str:
+        return os.path.join(self.root, "objects", sha256[:2], sha256 + CODEC_EXTENSIONS[codec])
+
+    def put(self, url: str, html: str, kind: str = "liste", fetched_at: Optional[datetime] = None) -> str:
+        """
+        Archiver une page téléchargée (kind : 'liste' ou 'detail').
+        Un contenu déjà présent n'est pas réécrit. Retourne son SHA-256.
+        """
+        data = html.encode("utf-8")
+        sha256 = hashlib.sha256(data).hexdigest()
+        fetched_at = (fetched_at or datetime.now()).strftime("%Y-%m-%d %H:%M:%S.%f")
+        conn = self._conn()
+        now = time.time()
+
+        row = conn.execute("SELECT codec FROM blobs WHERE sha256 = ?;", (sha256,)).fetchone()
+        if row is None or not os.path.exists(self._blob_path(sha256, row[0])):
+            compressed = _compress(data, self.codec)
+            path = self._blob_path(sha256, self.codec)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+            conn.execute("INSERT OR REPLACE INTO blobs(sha256, codec, taille, taille_html, dernier_acces) VALUES (?, ?, ?, ?, ?);",
+                         (sha256, self.codec, len(compressed), len(data), now))
+        else:
+            conn.execute("UPDATE blobs SET dernier_acces = ? WHERE sha256 = ?;", (now, sha256))
+        conn.execute("INSERT OR IGNORE INTO pages(url, type, date_telechargement, sha256) VALUES (?, ?, ?, ?);",
+                     (url, kind, fetched_at, sha256))
+        conn.commit()
+        if row is None:
+            self.evict()
+        return sha256
+
+    def get(self, sha256: str) -> Optional[str]:
+        """Contenu HTML d'une page archivée (None s'il a été évincé)"""
+        conn = self._conn()
+        row = conn.execute("SELECT codec FROM blobs WHERE sha256 = ?;", (sha256,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE blobs SET dernier_acces = ? WHERE sha256 = ?;", (time.time(), sha256))
+        conn.commit()
+        return read_blob(self._blob_path(sha256, row[0]), row[0])
+
+    def latest(self, url: str) -> Optional[str]:
+        """Dernière version archivée d'une URL"""
+        row = self._conn().execute("""
+            SELECT sha256 FROM pages WHERE url = ? ORDER BY date_telechargement DESC LIMIT 1;
+        """, (url,)).fetchone()
+        return self.get(row[0]) if row else None
+
+    def pages(self, kind: Optional[str] = None, since: Optional[str] = None) -> List[tuple]:
+        """Téléchargements archivés (url, date_telechargement, chemin, codec), du plus ancien au plus récent"""
+        sql = """
+            SELECT p.url, p.date_telechargement, b.sha256, b.codec FROM pages p
+            JOIN blobs b ON b.sha256 = p.sha256 WHERE 1=1
+        """
+        params = []
+        if kind:
+            sql += " AND p.type = ?"
+            params.append(kind)
+        if since:
+            sql += " AND p.date_telechargement >= ?"
+            params.append(since)
+        sql += " ORDER BY p.date_telechargement, p.id;"
+        return [(url, date, self._blob_path(sha256, codec), codec)
+                for url, date, sha256, codec in self._conn().execute(sql, params).fetchall()]
+
+    def size(self) -> int:
+        """Taille compressée totale de l'archive en octets"""
+        return self._conn().execute("SELECT COALESCE(SUM(taille), 0) FROM blobs;").fetchone()[0]
+
+    def evict(self, max_size: Optional[int] = None) -> int:
+        """
+        Supprimer les contenus les moins récemment utilisés jusqu'à repasser sous
+        90 % du plafond. Retourne le nombre d'octets libérés.
+        """
+        max_size = self.max_size if max_size is None else max_size
+        total = self.size()
+        if total <= max_size:
+            return 0
+        cible = total - int(max_size * 0.9)
+        conn = self._conn()
+        freed = 0
+        victimes = []
+        for sha256, codec, taille in conn.execute(
+                "SELECT sha256, codec, taille FROM blobs ORDER BY dernier_acces;"):
+            if freed >= cible:
+                break
+            victimes.append((sha256, codec))
+            freed += taille
+        conn.executemany("DELETE FROM pages WHERE sha256 = ?;", [(sha256,) for sha256, _ in victimes])
+        conn.executemany("DELETE FROM blobs WHERE sha256 = ?;", [(sha256,) for sha256, _ in victimes])
+        conn.commit()
+        for sha256, codec in victimes:
+            try:
+                os.remove(self._blob_path(sha256, codec))
+            except FileNotFoundError:
+                pass
+        print(f"Archive HTML : {len(victimes)} pages évincées ({freed // 1024} Ko libérés)")
+        return freed
+
+    def stats(self) -> Dict:
+        """Nombre de pages, de contenus et tailles (compressée / HTML) de l'archive"""
+        conn = self._conn()
+        pages = conn.execute("SELECT COUNT(*) FROM pages;").fetchone()[0]
+        blobs, taille, taille_html = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(taille), 0), COALESCE(SUM(taille_html), 0) FROM blobs;").fetchone()
+        return {'pages': pages, 'contenus': blobs, 'taille': taille, 'taille_html': taille_html,
+                'plafond': self.max_size}
+
+
+def _analyser_page(args) -> List[tuple]:
+    """Analyser une page de liste archivée (exécuté dans un processus du pool)"""
+    from scraper_offres import extract_offres_from_html
+
+    url, fetched_at, path, codec = args
+    try:
+        html = read_blob(path, codec)
+    except FileNotFoundError:
+        return []
+    reference = datetime.strptime(fetched_at, "%Y-%m-%d %H:%M:%S.%f")
+    return [tuple(offre) for offre in extract_offres_from_html(html, reference)]
+
+
+def reparse_archive(conn, archive: Optional[HtmlArchive] = None, since: Optional[str] = None,
+                    workers: Optional[int] = None, pages_per_batch: int = 200, source: str = "HelloWork") -> Dict:
+    """
+    Reconstruire les offres à partir des pages de liste archivées, sans réseau.
+
+    Les pages sont analysées en parallèle (ProcessPoolExecutor), de la plus ancienne
+    à la plus récente ; par lot de pages, les offres sont enregistrées par
+    upsert_offres_bulk (offres connues réécrites si leur contenu a changé).
+    Retourne {'pages', 'offres', 'nouvelles', 'modifiees', 'rejetees', 'duree_s'}.
+    """
+    from database import upsert_offres_bulk
+
+    archive = archive or HtmlArchive()
+    pages = archive.pages(kind="liste", since=since)
+    report = {'pages': len(pages), 'offres': 0, 'nouvelles': 0, 'modifiees': 0, 'rejetees': 0}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for i in range(0, len(pages), pages_per_batch):
+            lot = pages[i:i + pages_per_batch]
+            offres = {}
+            for resultat in executor.map(_analyser_page, lot, chunksize=8):
+                for offre in resultat:
+                    offres[offre[2]] = offre  # la version la plus récente de chaque URL l'emporte
+            offres = list(offres.values())
+            stats = upsert_offres_bulk(conn, offres, source=source)
+            report['offres'] += len(offres)
+            for cle in ('nouvelles', 'modifiees', 'rejetees'):
+                report[cle] += stats[cle]
+    report['duree_s'] = round(time.perf_counter() - start, 3)
+    print(f"Nouvelle analyse : {report['pages']} pages, {report['modifiees']} offres corrigées, "
+          f"{report['nouvelles']} nouvelles ({report['duree_s']}s)")
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    from database import DB_PATH, create_connection, create_tables
+
+    conn = create_connection(DB_PATH)
+    create_tables(conn)
+    reparse_archive(conn, since=sys.argv[1] if len(sys.argv) > 1 else None)
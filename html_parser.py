@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Analyse HTML des pages scrapées
+Moteurs interchangeables (selectolax, lxml, BeautifulSoup) derrière une même
+interface : listings(html) -> champs bruts des offres d'une page de liste,
+page(html) -> (texte, [(href, texte du lien)]) d'une page quelconque
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from config_manager import get_config
+
+# Offres d'une page de liste HelloWork
+LISTING_TAG = "li"
+LISTING_ATTR = "data-id-storage-target"
+LISTING_VALUE = "item"
+
+# Champs bruts d'une offre (texte nettoyé, None si absent), convertis par scraper_offres
+LISTING_FIELDS = ("href", "titre", "entreprise", "lieu", "contrat", "remuneration", "duree", "date")
+
+# Sélecteurs CSS relatifs : <a href> de l'offre, puis son <h3>, puis le reste du <li>
+CSS_LISTING = f'{LISTING_TAG}[{LISTING_ATTR}="{LISTING_VALUE}"]'
+CSS_ANCHOR = "a[href]"
+CSS_H3 = "h3"
+CSS_TITRE = 'p[class*="tw-typo-l"]'
+CSS_ENTREPRISE = 'p[class*="tw-typo-s"]'
+CSS_CHAMPS = {
+    "lieu": '[data-cy="localisationCard"]',
+    "contrat": '[data-cy="contractCard"]',
+    "remuneration": 'div[class="tw-readonly tw-tag-attractive-s tw-w-fit tw-border-0"]',
+    "duree": 'div[data-cy="contractTag"]',
+    "date": 'div[class="tw-typo-s tw-text-grey"]',
+}
+
+# Ordre de préférence quand scraping.parser vaut "auto"
+BACKENDS = ("selectolax", "lxml", "bs4")
+
+
+def _empty_fields() -> Dict[str, Optional[str]]:
+    return dict.fromkeys(LISTING_FIELDS)
+
+
+class SelectolaxParser:
+    """selectolax (moteur lexbor, C) : sélecteurs CSS natifs"""
+
+    name = "selectolax"
+
+    def __init__(self):
+        try:
+            from selectolax.lexbor import LexborHTMLParser
+        except ImportError:
+            raise ImportError("selectolax non installé. Installez avec: pip install selectolax")
+        self._parse = LexborHTMLParser
+
+    @staticmethod
+    def _text(node) -> Optional[str]:
+        return node.text(deep=True, separator="", strip=True) if node is not None else None
+
+    def listings(self, html: str) -> List[Dict[str, Optional[str]]]:
+        resultats = []
+        for li in self._parse(html).css(CSS_LISTING):
+            fields = _empty_fields()
+            anchor = li.css_first(CSS_ANCHOR)
+            if anchor is not None:
+                fields["href"] = anchor.attributes.get("href")
+                h3 = anchor.css_first(CSS_H3)
+                if h3 is not None:
+                    fields["titre"] = self._text(h3.css_first(CSS_TITRE))
+                    fields["entreprise"] = self._text(h3.css_first(CSS_ENTREPRISE))
+            for champ, selecteur in CSS_CHAMPS.items():
+                fields[champ] = self._text(li.css_first(selecteur))
+            resultats.append(fields)
+        return resultats
+
+    def page(self, html: str) -> Tuple[str, List[Tuple[str, str]]]:
+        tree = self._parse(html)
+        tree.strip_tags(["script", "style"])
+        links = [(a.attributes.get("href") or "", a.text(deep=True, separator="")) for a in tree.css(CSS_ANCHOR)]
+        return tree.text(deep=True, separator=""), links
+
+
+class LxmlParser:
+    """lxml (libxml2, C) : expressions XPath compilées une fois"""
+
+    name = "lxml"
+
+    def __init__(self):
+        try:
+            from lxml import etree, html as lxml_html
+        except ImportError:
+            raise ImportError("lxml non installé. Installez avec: pip install lxml")
+        self._etree = etree
+        self._html = lxml_html
+        self._parser = lxml_html.HTMLParser(encoding="utf-8")
+        self._listing = etree.XPath(f'//{LISTING_TAG}[@{LISTING_ATTR}="{LISTING_VALUE}"]')
+        self._anchor = etree.XPath("(.//a[@href])[1]")
+        self._h3 = etree.XPath("(.//h3)[1]")
+        self._titre = etree.XPath('(.//p[contains(@class, "tw-typo-l")])[1]')
+        self._entreprise = etree.XPath('(.//p[contains(@class, "tw-typo-s")])[1]')
+        self._champs = {
+            "lieu": etree.XPath('(.//*[@data-cy="localisationCard"])[1]'),
+            "contrat": etree.XPath('(.//*[@data-cy="contractCard"])[1]'),
+            "remuneration": etree.XPath('(.//div[@class="tw-readonly tw-tag-attractive-s tw-w-fit tw-border-0"])[1]'),
+            "duree": etree.XPath('(.//div[@data-cy="contractTag"])[1]'),
+            "date": etree.XPath('(.//div[@class="tw-typo-s tw-text-grey"])[1]'),
+        }
+        self._links = etree.XPath("//a[@href]")
+
+    def _doc(self, html: str):
+        # Octets + encodage explicite : accepte les pages avec déclaration d'encodage
+        return self._html.fromstring(html.encode("utf-8"), parser=self._parser)
+
+    @staticmethod
+    def _first(xpath, node):
+        found = xpath(node)
+        return found[0] if found else None
+
+    @staticmethod
+    def _text(node) -> Optional[str]:
+        return "".join(s.strip() for s in node.itertext()) if node is not None else None
+
+    def listings(self, html: str) -> List[Dict[str, Optional[str]]]:
+        resultats = []
+        for li in self._listing(self._doc(html)):
+            fields = _empty_fields()
+            anchor = self._first(self._anchor, li)
+            if anchor is not None:
+                fields["href"] = anchor.get("href")
+                # libxml2 (HTML 4) ferme le <h3> devant un <p> : titre et entreprise
+                # deviennent ses voisins, on les cherche donc dans le lien
+                if self._first(self._h3, anchor) is not None:
+                    fields["titre"] = self._text(self._first(self._titre, anchor))
+                    fields["entreprise"] = self._text(self._first(self._entreprise, anchor))
+            for champ, xpath in self._champs.items():
+                fields[champ] = self._text(self._first(xpath, li))
+            resultats.append(fields)
+        return resultats
+
+    def page(self, html: str) -> Tuple[str, List[Tuple[str, str]]]:
+        doc = self._doc(html)
+        self._etree.strip_elements(doc, "script", "style", with_tail=False)
+        return doc.text_content(), [(a.get("href") or "", a.text_content()) for a in self._links(doc)]
+
+
+class Bs4Parser:
+    """
+    BeautifulSoup (html.parser, Python pur) : moteur de repli. Seuls les <li>
+    des offres sont construits (SoupStrainer), pas le reste de la page.
+    """
+
+    name = "bs4"
+
+    def __init__(self):
+        try:
+            from bs4 import BeautifulSoup, SoupStrainer
+        except ImportError:
+            raise ImportError("beautifulsoup4 non installé. Installez avec: pip install beautifulsoup4")
+        self._soup = BeautifulSoup
+        self._strainer = SoupStrainer(LISTING_TAG, attrs={LISTING_ATTR: LISTING_VALUE})
+
+    def listings(self, html: str) -> List[Dict[str, Optional[str]]]:
+        soup = self._soup(html, "html.parser", parse_only=self._strainer)
+        return [soup_listing_fields(li) for li in soup.find_all(LISTING_TAG, attrs={LISTING_ATTR: LISTING_VALUE})]
+
+    def page(self, html: str) -> Tuple[str, List[Tuple[str, str]]]:
+        soup = self._soup(html, "html.parser")
+        return soup.get_text(), [(a["href"], a.get_text()) for a in soup.find_all("a", href=True)]
+
+
+def soup_listing_fields(listing) -> Dict[str, Optional[str]]:
+    """Champs bruts d'une offre à partir de son <li> BeautifulSoup"""
+    def text(tag):
+        return tag.get_text(strip=True) if tag else None
+
+    fields = _empty_fields()
+    anchor = listing.select_one(CSS_ANCHOR)
+    if anchor is not None:
+        fields["href"] = anchor["href"]
+        h3 = anchor.select_one(CSS_H3)
+        if h3 is not None:
+            fields["titre"] = text(h3.select_one(CSS_TITRE))
+            fields["entreprise"] = text(h3.select_one(CSS_ENTREPRISE))
+    for champ, selecteur in CSS_CHAMPS.items():
+        fields[champ] = text(listing.select_one(selecteur))
+    return fields
+
+
+PARSERS = {"selectolax": SelectolaxParser, "lxml": LxmlParser, "bs4": Bs4Parser}
+_instances: Dict[str, object] = {}
+
+
+def available_backends() -> List[str]:
+    """Moteurs installés, dans l'ordre de préférence"""
+    disponibles = []
+    for name in BACKENDS:
+        try:
+            get_parser(name)
+        except ImportError:
+            continue
+        disponibles.append(name)
+    return disponibles
+
+
+def get_parser(name: Optional[str] = None):
+    """
+    Moteur d'analyse `name` ("selectolax", "lxml", "bs4"), par défaut scraping.parser.
+    "auto" choisit le premier moteur installé de BACKENDS.
+    """
+    name = (name or get_config().get_str("scraping.parser", "auto")).lower()
+    if name == "auto":
+        for candidat in BACKENDS:
+            try:
+                return get_parser(candidat)
+            except ImportError:
+                continue
+        raise ImportError("beautifulsoup4 non installé. Installez avec: pip install beautifulsoup4")
+    if name not in PARSERS:
+        raise ValueError(f"Moteur d'analyse inconnu : {name} (choix : auto, {', '.join(BACKENDS)})")
+    if name not in _instances:
+        _instances[name] = PARSERS[name]()
+    return _instances[name]
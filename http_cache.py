@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Cache HTTP sur disque
+Réponses conservées avec leurs validateurs (ETag, Last-Modified), requêtes
+conditionnelles et détection des contenus identiques pour éviter de réanalyser
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Iterable, Optional
+
+import requests
+
+from database_manager import get_connection
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "http_cache")
+
+# Réponse servie par HttpCache.get ; unchanged : contenu identique au passage précédent,
+# from_cache : corps lu dans le cache, requete : une requête a été envoyée au serveur
+CachedResponse = namedtuple("CachedResponse", ["status_code", "text", "sha256", "unchanged", "from_cache", "requete"])
+
+STATS_KEYS = ("requetes", "hits", "misses", "non_modifiees", "identiques", "frais",
+              "octets_telecharges", "octets_economises")
+
+
+class HttpCache:
+    """
+    Dernière réponse 200 de chaque URL, compressée (gzip) dans index.db avec
+    son ETag, son Last-Modified et le SHA-256 du corps.
+
+    get() envoie If-None-Match / If-Modified-Since quand l'URL est connue :
+    sur 304, ou sur 200 avec un corps identique, la réponse est marquée
+    unchanged et l'appelant peut se dispenser de l'analyser.
+    Avec defer=True, une nouvelle réponse n'est conservée qu'à l'appel de
+    commit(), une fois son contenu traité : une page téléchargée mais jamais
+    enregistrée (arrêt, erreur) ne sera pas vue comme inchangée au passage suivant.
+    Les compteurs (hits, misses, octets économisés...) sont remis à zéro par start_run().
+    """
+
+    def __init__(self, root: str = CACHE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.index_path = os.path.join(root, "index.db")
+        self._lock = threading.Lock()
+        self.stats = dict.fromkeys(STATS_KEYS, 0)
+        self._en_attente: Dict[str, tuple] = {}
+        self._create_index()
+
+    def _conn(self):
+        return get_connection(self.index_path)
+
+    def _create_index(self):
+        conn = self._conn()
+        conn.executescript("""
+        CREATE TABLE IF NOT EXISTS reponses (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            sha256 TEXT NOT NULL,
+            taille INTEGER NOT NULL,
+            corps BLOB NOT NULL,
+            date_telechargement REAL NOT NULL
+        ) WITHOUT ROWID;
+        """)
+        conn.commit()
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def start_run(self) -> Dict:
+        """Remettre les compteurs à zéro et oublier les réponses non confirmées ; retourne les compteurs précédents"""
+        with self._lock:
+            previous, self.stats = self.stats, dict.fromkeys(STATS_KEYS, 0)
+            self._en_attente.clear()
+        return previous
+
+    def lookup(self, url: str) -> Optional[tuple]:
+        """(etag, last_modified, sha256, taille, date_telechargement) de la réponse conservée"""
+        return self._conn().execute("""
+            SELECT etag, last_modified, sha256, taille, date_telechargement FROM reponses WHERE url = ?;
+        """, (url,)).fetchone()
+
+    def _body(self, url: str) -> str:
+        row = self._conn().execute("SELECT corps FROM reponses WHERE url = ?;", (url,)).fetchone()
+        return gzip.decompress(row[0]).decode("utf-8")
+
+    def _store(self, rows):
+        conn = self._conn()
+        conn.executemany("""
+            INSERT OR REPLACE INTO reponses(url, etag, last_modified, sha256, taille, corps, date_telechargement)
+            VALUES (?, ?, ?, ?, ?, ?, ?);
+        """, rows)
+        conn.commit()
+
+    def commit(self, urls: Optional[Iterable[str]] = None) -> int:
+        """Conserver les réponses reçues avec defer=True (celles de urls, ou toutes) ; retourne leur nombre"""
+        with self._lock:
+            urls = list(self._en_attente) if urls is None else [url for url in urls if url in self._en_attente]
+            rows = [self._en_attente.pop(url) for url in urls]
+        if rows:
+            self._store(rows)
+        return len(rows)
+
+    def _touch(self, url: str, resp: requests.Response, now: float):
+        """Réponse revalidée : nouveaux validateurs éventuels et date de téléchargement"""
+        conn = self._conn()
+        conn.execute("""
+            UPDATE reponses SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified),
+                                date_telechargement = ?
+            WHERE url = ?;
+        """, (resp.headers.get("ETag"), resp.headers.get("Last-Modified"), now, url))
+        conn.commit()
+
+    def get(self, session: requests.Session, url: str, timeout: float = 15.0,
+            max_age: float = 0, read_body: bool = True, defer: bool = False) -> CachedResponse:
+        """
+        Télécharger url via session, conditionnellement si elle est déjà en cache.
+
+        - max_age > 0 : une réponse conservée depuis moins de max_age secondes est
+          servie sans requête ;
+        - read_body=False : sur une réponse inchangée, le corps n'est pas relu
+          (text vaut None), l'appelant ne l'analysant pas ;
+        - defer=True : une nouvelle réponse n'est conservée qu'à l'appel de commit(url).
+        Les exceptions de requests sont propagées ; seules les réponses 200 sont conservées.
+        """
+        entry = self.lookup(url)
+        now = time.time()
+        if entry is not None and max_age > 0 and now - entry[4] < max_age:
+            self._count(hits=1, frais=1, octets_economises=entry[3])
+            return CachedResponse(200, self._body(url) if read_body else None, entry[2], True, True, False)
+
+        headers = {}
+        if entry is not None:
+            if entry[0]:
+                headers["If-None-Match"] = entry[0]
+            if entry[1]:
+                headers["If-Modified-Since"] = entry[1]
+        resp = session.get(url, headers=headers, timeout=timeout)
+        self._count(requetes=1, octets_telecharges=len(resp.content))
+
+        if resp.status_code == 304 and entry is not None:
+            self._touch(url, resp, now)
+            self._count(hits=1, non_modifiees=1, octets_economises=entry[3])
+            return CachedResponse(200, self._body(url) if read_body else None, entry[2], True, True, True)
+        if resp.status_code != 200:
+            self._count(misses=1)
+            return CachedResponse(resp.status_code, resp.text, None, False, False, True)
+
+        sha256 = hashlib.sha256(resp.content).hexdigest()
+        if entry is not None and entry[2] == sha256:
+            # Serveur sans validateurs : le corps est retéléchargé mais pas réanalysé
+            self._touch(url, resp, now)
+            self._count(hits=1, identiques=1)
+            return CachedResponse(200, resp.text, sha256, True, False, True)
+        text = resp.text
+        row = (url, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), sha256,
+               len(resp.content), gzip.compress(text.encode("utf-8"), compresslevel=6), now)
+        if defer:
+            with self._lock:
+                self._en_attente[url] = row
+        else:
+            self._store([row])
+        self._count(misses=1)
+        return CachedResponse(200, text, sha256, False, False, True)
+
+    def purge(self, older_than_days: float = 30) -> int:
+        """Supprimer les réponses non revalidées depuis older_than_days jours"""
+        conn = self._conn()
+        cur = conn.execute("DELETE FROM reponses WHERE date_telechargement < ?;",
+                           (time.time() - older_than_days * 86400,))
+        conn.commit()
+        return cur.rowcount
+
+    def summary(self) -> str:
+        """Bilan lisible des compteurs du passage en cours"""
+        s = self.stats
+        return (f"Cache HTTP : {s['hits']} hits ({s['non_modifiees']} 304, {s['identiques']} identiques, "
+                f"{s['frais']} sans requête), {s['misses']} misses, "
+                f"{s['octets_economises'] // 1024} Ko économisés")
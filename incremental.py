@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Scraping incrémental
+URL connues chargées une fois en mémoire (empreintes 64 bits) et repère
+de date de publication par recherche enregistrée
+"""
+
+import sqlite3
+import time
+from typing import Iterable, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from deduplication import canonical_url, url_key
+
+# Paramètre de pagination retiré de la clé d'une recherche
+PAGE_PARAM = "p"
+
+
+def search_key(url_base: str) -> str:
+    """Clé d'une recherche enregistrée : URL canonique sans numéro de page"""
+    parts = urlsplit(canonical_url(url_base) or "")
+    params = [(k, v) for k, v in parse_qsl(parts.query) if k != PAGE_PARAM]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(params), ""))
+
+
+class KnownUrls:
+    """
+    Empreintes des URL canoniques des offres en base, actives et archivées,
+    dans un ensemble d'entiers : test d'appartenance en O(1), sans requête.
+    """
+
+    def __init__(self, keys: Iterable[int] = ()):
+        self._keys: Set[int] = set(keys)
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> "KnownUrls":
+        start = time.perf_counter()
+        keys = set()
+        for (url,) in conn.execute("SELECT COALESCE(url_canonique, url) FROM offres;"):
+            keys.add(url_key(url))
+        for sql in ("SELECT url FROM sources_offres;", "SELECT url FROM offres_archive;"):
+            try:
+                keys.update(url_key(url) for (url,) in conn.execute(sql))
+            except sqlite3.OperationalError:
+                pass  # Base antérieure à la migration v5
+        keys.discard(None)
+        known = cls(keys)
+        print(f"URL connues en mémoire : {len(known)} ({time.perf_counter() - start:.2f}s)")
+        return known
+
+    def __contains__(self, url: str) -> bool:
+        return url_key(url) in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, url: str):
+        key = url_key(url)
+        if key is not None:
+            self._keys.add(key)
+
+
+class IncrementalScrape:
+    """
+    État d'un scraping incrémental d'une recherche.
+
+    Une offre est déjà vue si et seulement si son URL est connue : une offre
+    ancienne jamais enregistrée (passage précédent limité en pages, ou interrompu)
+    est encore récupérée. Le repère (date de publication la plus récente
+    enregistrée pour la recherche) sert au suivi des passages, pas à l'arrêt ;
+    il n'avance qu'avec save(), à appeler une fois les offres enregistrées.
+    """
+
+    def __init__(self, url_base: str, known: KnownUrls, watermark: Optional[str] = None, source: str = "HelloWork"):
+        self.recherche = search_key(url_base)
+        self.known = known
+        self.watermark = watermark
+        self.source = source
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection, url_base: str, source: str = "HelloWork") -> "IncrementalScrape":
+        return cls(url_base, KnownUrls.load(conn), fetch_watermark(conn, search_key(url_base)), source)
+
+    def is_seen(self, offre) -> bool:
+        return offre.url in self.known
+
+    def save(self, conn: sqlite3.Connection, offres) -> Optional[str]:
+        """Ajouter les offres enregistrées aux URL connues et avancer le repère"""
+        dates = [offre.date_publication for offre in offres if offre.date_publication]
+        for offre in offres:
+            self.known.add(offre.url)
+        if dates:
+            self.watermark = max(dates + ([self.watermark] if self.watermark else []))
+        save_watermark(conn, self.recherche, self.source, self.watermark, len(offres))
+        return self.watermark
+
+
+def fetch_watermark(conn: sqlite3.Connection, recherche: str) -> Optional[str]:
+    try:
+        row = conn.execute("SELECT date_publication_max FROM scrape_watermarks WHERE recherche = ?;",
+                           (recherche,)).fetchone()
+    except sqlite3.OperationalError:
+        return None  # Base antérieure à la migration v12
+    return row[0] if row else None
+
+
+def save_watermark(conn: sqlite3.Connection, recherche: str, source: str, date_max: Optional[str], vues: int):
+    conn.execute("""
+        INSERT INTO scrape_watermarks(recherche, source, date_publication_max, offres_vues)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(recherche) DO UPDATE SET
+            date_publication_max = excluded.date_publication_max,
+            offres_vues = excluded.offres_vues,
+            date_maj = CURRENT_TIMESTAMP;
+    """, (recherche, source, date_max, vues))
+    conn.commit()
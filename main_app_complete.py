@@ -11,10 +11,17 @@ import os
 import threading
 import webbrowser
 from datetime import datetime
-import json
 
 # Import des modules
-from database import create_connection, create_tables
+from database import create_connection, create_tables, fetch_offre_by_id, fetch_facets, count_offres
+from backup_manager import BackupManager
+from database_manager import get_manager
+from config_manager import get_config
+from retention_manager import RetentionManager
+from normalisation import backfill_normalised_columns, backfill_pending
+from change_log import changes_since, current_seq, latest_ops, prune_changes
+from export_db import EXPORT_FORMATS, export_path, export_table
+from hot_tier import HotTier
 from candidature_manager import CandidatureManager
 from candidature_tracker import CandidatureTracker
 from email_manager import EmailManager
@@ -30,11 +37,35 @@ class CompleteApp:
         
         # Configuration
         self.db_path = os.path.join(os.path.dirname(__file__), "data", "offres.db")
-        self.config = self.load_config()
+        self.config = get_config()
+        
+        # Mise à jour du schéma (index, recherche plein texte...)
+        create_tables(create_connection(self.db_path))
+        
+        # Pagination des offres (curseur sur date_ajout, id)
+        self.page_size = self.config.get_int('filters.page_size', 200)
+        self.page_filters = {}
+        self.next_cursor = None
+        self.page_pending = False
+        
+        # Rafraîchissement incrémental : position dans le journal des modifications
+        self.change_seq = 0
+        self.candidature_seq = 0
+        
+        # Offres récentes en mémoire (database.hot_tier_days, 0 pour désactiver)
+        self.hot_tier = HotTier(self.db_path, days=self.config.get_float('database.hot_tier_days', 30))
+        self.hot_tier.start()
+        
+        # Sauvegarde des bases en arrière-plan si l'intervalle configuré est écoulé
+        threading.Thread(target=BackupManager().run_if_due, daemon=True).start()
+        
+        # Normalisation des offres existantes (une seule fois après la migration du schéma)
+        if backfill_pending(create_connection(self.db_path)):
+            threading.Thread(target=self._backfill_worker, daemon=True).start()
         
         # Managers
         self.candidature_manager = CandidatureManager()
-        self.candidature_tracker = CandidatureTracker()
+        self.candidature_tracker = CandidatureTracker(offres_db_path=self.db_path)
         self.email_manager = EmailManager()
         self.charts_manager = ChartsManager()
         self.filter_manager = FilterManager()
@@ -42,23 +73,8 @@ class CompleteApp:
         # Interface
         self.setup_ui()
         self.load_offres()
+        self.schedule_refresh()
         
-    def load_config(self):
-        """Charger la configuration"""
-        config_path = os.path.join(os.path.dirname(__file__), "config.json")
-        default_config = {
-            "scraping": {"delay_min": 1, "delay_max": 3, "max_pages": 5},
-            "ui": {"theme": "light", "window_size": "1400x900"}
-        }
-        
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    return json.load(f)
-            except:
-                return default_config
-        return default_config
-    
     def setup_ui(self):
         """Créer l'interface utilisateur"""
         # Style moderne
@@ -118,16 +134,17 @@ class CompleteApp:
         
         ttk.Label(filter_frame, text="Domaine:").grid(row=0, column=2, sticky=tk.W, padx=(20,0))
         self.domain_var = tk.StringVar()
-        domain_combo = ttk.Combobox(filter_frame, textvariable=self.domain_var, width=15)
-        domain_combo['values'] = ['Tous', 'Informatique', 'Marketing', 'Commerce', 'Finance', 'Autre']
-        domain_combo.grid(row=0, column=3, padx=5)
-        domain_combo.bind('<<ComboboxSelected>>', self.filter_offres)
+        self.domain_combo = ttk.Combobox(filter_frame, textvariable=self.domain_var, width=15)
+        self.domain_combo['values'] = ['Tous']
+        self.domain_combo.grid(row=0, column=3, padx=5)
+        self.domain_combo.bind('<<ComboboxSelected>>', self.filter_offres)
         
         # Boutons d'action
         action_frame = ttk.Frame(filter_frame)
         action_frame.grid(row=1, column=0, columnspan=4, pady=10)
         
         ttk.Button(action_frame, text="🔄 Actualiser", command=self.load_offres).pack(side=tk.LEFT, padx=5)
+        ttk.Button(action_frame, text="⬇️ Plus d'offres", command=self.load_more_offres).pack(side=tk.LEFT, padx=5)
         ttk.Button(action_frame, text="📊 Statistiques", command=self.show_stats).pack(side=tk.LEFT, padx=5)
         ttk.Button(action_frame, text="🌐 Ouvrir URL", command=self.open_url).pack(side=tk.LEFT, padx=5)
         ttk.Button(action_frame, text="📧 Rechercher Email", command=self.search_emails_for_offre).pack(side=tk.LEFT, padx=5)
@@ -149,7 +166,8 @@ class CompleteApp:
         # Scrollbars
         v_scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
         h_scrollbar = ttk.Scrollbar(table_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.tree.configure(yscrollcommand=lambda first, last: self.on_tree_scroll(v_scrollbar, first, last),
+                            xscrollcommand=h_scrollbar.set)
         
         # Placement
         self.tree.grid(row=0, column=0, sticky='nsew')
@@ -174,13 +192,14 @@ class CompleteApp:
         ttk.Button(control_frame, text="➕ Nouvelle Candidature", command=self.add_candidature).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_frame, text="🔄 Actualiser", command=self.load_candidatures).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_frame, text="📊 Statistiques", command=self.show_candidature_stats).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="🔗 Voir Offre", command=self.open_candidature_offre).pack(side=tk.LEFT, padx=5)
         
         # Table des candidatures
         table_frame = ttk.Frame(frame)
         table_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         # Treeview
-        columns = ('ID', 'Entreprise', 'Poste', 'Date', 'Statut', 'Type')
+        columns = ('ID', 'Entreprise', 'Poste', 'Ville', 'Date', 'Statut', 'Type', 'Sources')
         self.candidatures_tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=15)
         
         # Configuration des colonnes
@@ -238,11 +257,11 @@ class CompleteApp:
         general_config.pack(fill=tk.X, padx=5, pady=5)
         
         ttk.Label(general_config, text="Taille fenêtre:").grid(row=0, column=0, sticky=tk.W)
-        self.window_size_var = tk.StringVar(value="1400x900")
+        self.window_size_var = tk.StringVar(value=self.config.get_str("ui.window_size", "1400x900"))
         ttk.Entry(general_config, textvariable=self.window_size_var, width=15).grid(row=0, column=1, padx=5)
         
         ttk.Label(general_config, text="Thème:").grid(row=0, column=2, sticky=tk.W, padx=(20,0))
-        self.theme_var = tk.StringVar(value="light")
+        self.theme_var = tk.StringVar(value=self.config.get_str("ui.theme", "light"))
         theme_combo = ttk.Combobox(general_config, textvariable=self.theme_var, width=10)
         theme_combo['values'] = ['light', 'dark']
         theme_combo.grid(row=0, column=3, padx=5)
@@ -255,37 +274,118 @@ class CompleteApp:
         ttk.Button(button_frame, text="🔄 Réinitialiser", command=self.reset_config).pack(side=tk.LEFT, padx=5)
     
     def load_offres(self):
-        """Charger les offres depuis la base de données"""
+        """Charger la première page des offres depuis la base de données"""
         try:
-            conn = create_connection(self.db_path)
-            if conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT id, entreprise, titre, ville, domaine, type_contrat, date_ajout
-                    FROM offres 
-                    ORDER BY date_ajout DESC
-                    LIMIT 1000
-                """)
-                
-                # Vider le tree
-                for item in self.tree.get_children():
-                    self.tree.delete(item)
-                
-                # Ajouter les données
-                for row in cursor.fetchall():
-                    self.tree.insert('', 'end', values=row)
-                
-                conn.close()
-                self.update_statistics()
-                self.status_bar.config(text=f"Chargé: {len(self.tree.get_children())} offres")
+            self.show_offres_page({}, reset=True)
+            self.update_statistics()
+            self.status_bar.config(text=self.page_status("Chargé"))
                 
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors du chargement: {e}")
     
+    def load_more_offres(self):
+        """Ajouter la page suivante d'offres à la liste"""
+        self.page_pending = False
+        if self.next_cursor is None:
+            self.status_bar.config(text=f"Toutes les offres sont affichées ({len(self.tree.get_children())})")
+            return
+        try:
+            self.show_offres_page(self.page_filters)
+            self.status_bar.config(text=self.page_status("Chargé"))
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Erreur lors du chargement: {e}")
+    
+    def show_offres_page(self, filters, reset=False):
+        """Afficher une page d'offres : la première si reset, sinon celle qui suit le curseur"""
+        conn = create_connection(self.db_path)
+        if not conn:
+            return
+        if reset:
+            self.page_filters = filters
+            self.next_cursor = None
+            self.tree.delete(*self.tree.get_children())
+            # Les modifications postérieures à ce chargement seront appliquées par apply_offre_changes
+            self.change_seq = current_seq(conn)
+            self.hot_tier.sync(conn)
+        
+        rows, self.next_cursor = self.hot_tier.fetch_offres_page(
+            conn, filters, after=None if reset else self.next_cursor, size=self.page_size
+        )
+        for row in rows:
+            if not self.tree.exists(str(row.id)):
+                self.tree.insert('', 'end', iid=str(row.id), values=row)
+    
+    def schedule_refresh(self):
+        """Programmer le prochain rafraîchissement si ui.auto_refresh est activé"""
+        ui_config = self.config.get('ui', {})
+        if ui_config.get('auto_refresh', False):
+            minutes = float(ui_config.get('refresh_interval_minutes', 30))
+            self.root.after(int(minutes * 60000), self.auto_refresh)
+    
+    def auto_refresh(self):
+        """Rafraîchissement périodique à partir du journal des modifications"""
+        try:
+            self.apply_offre_changes()
+            changes, self.candidature_seq = self.candidature_tracker.changes_since(self.candidature_seq)
+            if changes:
+                self.load_candidatures()
+        except Exception as e:
+            print(f"Erreur rafraîchissement: {e}")
+        finally:
+            self.schedule_refresh()
+    
+    def apply_offre_changes(self, limit=5000):
+        """
+        Appliquer à la liste les offres ajoutées, modifiées ou supprimées depuis le
+        dernier chargement, sans recharger les lignes inchangées.
+        """
+        conn = create_connection(self.db_path)
+        self.hot_tier.sync(conn)
+        changes, seq = changes_since(conn, self.change_seq, table='offres', limit=limit)
+        if len(changes) == limit:
+            # Trop de modifications d'un coup : un rechargement complet est plus simple
+            self.load_offres()
+            return
+        self.change_seq = seq
+        ops = latest_ops(changes)
+        if not ops:
+            return
+        
+        ids = [row_id for (_, row_id), op in ops.items() if op != 'D']
+        rows = self.hot_tier.fetch_offres_page(conn, dict(self.page_filters, ids=ids), size=len(ids))[0] if ids else []
+        visibles = {str(row.id): row for row in rows}
+        for (_, row_id), op in ops.items():
+            iid = str(row_id)
+            if self.tree.exists(iid) and iid not in visibles:
+                # Supprimée, ou ne correspond plus aux filtres actifs
+                self.tree.delete(iid)
+        for row in reversed(rows):
+            iid = str(row.id)
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=row)
+            elif ops[('offres', row.id)] == 'I':
+                self.tree.insert('', 0, iid=iid, values=row)
+        
+        self.update_statistics()
+        self.status_bar.config(text=self.page_status(f"Actualisé ({len(ops)} modifications)"))
+    
+    def page_status(self, prefix):
+        """Texte de la barre de statut pour la liste paginée"""
+        suite = " (faites défiler pour la suite)" if self.next_cursor is not None else ""
+        return f"{prefix}: {len(self.tree.get_children())} offres{suite}"
+    
+    def on_tree_scroll(self, scrollbar, first, last):
+        """Charger la page suivante quand la liste est défilée jusqu'en bas"""
+        scrollbar.set(first, last)
+        if float(last) >= 1.0 and float(first) > 0.0 and self.next_cursor is not None and not self.page_pending:
+            self.page_pending = True
+            self.root.after_idle(self.load_more_offres)
+    
     def load_candidatures(self):
         """Charger les candidatures"""
         try:
-            candidatures = self.candidature_tracker.get_all_candidatures()
+            self.candidature_seq = self.candidature_tracker.current_change_seq()
+            candidatures = self.candidature_tracker.get_candidatures_detaillees()
             
             # Vider le tree
             for item in self.candidatures_tree.get_children():
@@ -297,9 +397,11 @@ class CompleteApp:
                     candidature['id'],
                     candidature['entreprise'],
                     candidature['poste'],
+                    candidature.get('offre_ville') or '',
                     candidature['date_candidature'],
                     candidature['statut'],
-                    candidature['type_candidature']
+                    candidature['type_candidature'],
+                    candidature.get('sources') or ''
                 ))
             
             self.status_bar.config(text=f"Chargé: {len(candidatures)} candidatures")
@@ -309,47 +411,18 @@ class CompleteApp:
     
     def filter_offres(self, event=None):
         """Filtrer les offres selon les critères"""
-        search_term = self.search_var.get().lower()
-        domain_filter = self.domain_var.get()
-        
-        # Vider le tree
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        filters = {
+            'keyword': self.search_var.get(),
+            'domaine': self.domain_var.get()
+        }
         
         try:
-            conn = create_connection(self.db_path)
-            if conn:
-                cursor = conn.cursor()
-                
-                # Construire la requête
-                query = """
-                    SELECT id, entreprise, titre, ville, domaine, type_contrat, date_ajout
-                    FROM offres 
-                    WHERE 1=1
-                """
-                params = []
-                
-                if search_term:
-                    query += " AND (titre LIKE ? OR entreprise LIKE ? OR ville LIKE ?)"
-                    params.extend([f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'])
-                
-                if domain_filter and domain_filter != 'Tous':
-                    query += " AND domaine = ?"
-                    params.append(domain_filter)
-                
-                query += " ORDER BY date_ajout DESC LIMIT 1000"
-                
-                cursor.execute(query, params)
-                
-                for row in cursor.fetchall():
-                    self.tree.insert('', 'end', values=row)
-                
-                conn.close()
-                self.status_bar.config(text=f"Filtré: {len(self.tree.get_children())} offres")
+            self.show_offres_page(filters, reset=True)
+            self.status_bar.config(text=self.page_status("Filtré"))
                 
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors du filtrage: {e}")
-    
+
     def on_offre_double_click(self, event):
         """Action lors du double-clic sur une offre"""
         selection = self.tree.selection()
@@ -366,19 +439,33 @@ class CompleteApp:
             candidature_id = item['values'][0]
             self.show_candidature_details(candidature_id)
     
+    def open_candidature_offre(self):
+        """Ouvrir l'offre liée à la candidature sélectionnée"""
+        selection = self.candidatures_tree.selection()
+        if not selection:
+            messagebox.showwarning("Attention", "Veuillez sélectionner une candidature")
+            return
+        
+        candidature_id = self.candidatures_tree.item(selection[0])['values'][0]
+        candidature = self.candidature_tracker.get_candidature_detaillee(candidature_id)
+        url = candidature.get('offre_url') if candidature else None
+        if url:
+            webbrowser.open(url)
+            self.status_bar.config(text=f"Ouverture: {url}")
+        else:
+            messagebox.showwarning("Attention", "URL non disponible")
+    
     def show_offre_details(self, offre_id):
         """Afficher les détails d'une offre"""
         try:
             conn = create_connection(self.db_path)
             if conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM offres WHERE id = ?", (offre_id,))
-                offre = cursor.fetchone()
+                offre = fetch_offre_by_id(conn, offre_id)
                 
                 if offre:
                     # Créer une fenêtre de détails
                     details_window = tk.Toplevel(self.root)
-                    details_window.title(f"Détails - {offre[2]}")
+                    details_window.title(f"Détails - {offre.titre}")
                     details_window.geometry("600x400")
                     
                     # Afficher les détails
@@ -386,25 +473,24 @@ class CompleteApp:
                     text_widget.pack(fill=tk.BOTH, expand=True)
                     
                     details = f"""
-Entreprise: {offre[1]}
-Titre: {offre[2]}
-URL: {offre[3]}
-Email: {offre[4]}
-Ville: {offre[5]}
-Département: {offre[6]}
-Domaine: {offre[7]}
-Type de contrat: {offre[8]}
-Rémunération: {offre[9]}
-Date publication: {offre[10]}
-Durée: {offre[11]}
-Mots-clés: {offre[12]}
-Date ajout: {offre[13]}
+Entreprise: {offre.entreprise}
+Titre: {offre.titre}
+URL: {offre.url}
+Email: {offre.email}
+Ville: {offre.ville}
+Département: {offre.departement}
+Domaine: {offre.domaine}
+Type de contrat: {offre.type_contrat}
+Rémunération: {offre.remuneration}
+Date publication: {offre.date_publication}
+Durée: {offre.duree}
+Mots-clés: {offre.mots_cles}
+Date ajout: {offre.date_ajout}
                     """
                     
                     text_widget.insert(tk.END, details)
                     text_widget.config(state=tk.DISABLED)
                 
-                conn.close()
                 
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de l'affichage: {e}")
@@ -412,7 +498,7 @@ Date ajout: {offre[13]}
     def show_candidature_details(self, candidature_id):
         """Afficher les détails d'une candidature"""
         try:
-            candidature = self.candidature_tracker.get_candidature(candidature_id)
+            candidature = self.candidature_tracker.get_candidature_detaillee(candidature_id)
             if candidature:
                 # Créer une fenêtre de détails
                 details_window = tk.Toplevel(self.root)
@@ -434,6 +520,13 @@ Type: {candidature['type_candidature']}
 Mode envoi: {candidature['mode_envoi']}
 Date relance: {candidature['date_relance']}
 Notes: {candidature['notes']}
+
+Offre liée:
+Ville: {candidature.get('offre_ville') or '-'}
+Domaine: {candidature.get('offre_domaine') or '-'}
+Type de contrat: {candidature.get('offre_type_contrat') or '-'}
+Rémunération: {candidature.get('offre_remuneration') or '-'}
+Sources: {candidature.get('sources') or '-'}
                 """
                 
                 text_widget.insert(tk.END, details)
@@ -455,17 +548,14 @@ Notes: {candidature['notes']}
             
             conn = create_connection(self.db_path)
             if conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT url FROM offres WHERE id = ?", (offre_id,))
-                url = cursor.fetchone()
+                offre = fetch_offre_by_id(conn, offre_id)
                 
-                if url and url[0]:
-                    webbrowser.open(url[0])
-                    self.status_bar.config(text=f"Ouverture: {url[0]}")
+                if offre and offre.url:
+                    webbrowser.open(offre.url)
+                    self.status_bar.config(text=f"Ouverture: {offre.url}")
                 else:
                     messagebox.showwarning("Attention", "URL non disponible")
                 
-                conn.close()
                 
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de l'ouverture: {e}")
@@ -483,26 +573,16 @@ Notes: {candidature['notes']}
             
             conn = create_connection(self.db_path)
             if conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM offres WHERE id = ?", (offre_id,))
-                offre = cursor.fetchone()
+                offre = fetch_offre_by_id(conn, offre_id)
                 
                 if offre:
-                    offre_data = {
-                        'entreprise': offre[1],
-                        'url': offre[3]
-                    }
-                    
                     # Rechercher les emails
-                    results = self.email_manager.search_emails_for_entreprise(
-                        offre_data['entreprise'], 
-                        offre_data['url']
-                    )
+                    results = self.email_manager.search_emails_for_entreprise(offre.entreprise, offre.url)
                     
                     if results['emails']:
                         # Afficher les résultats
                         email_window = tk.Toplevel(self.root)
-                        email_window.title(f"Emails trouvés - {offre_data['entreprise']}")
+                        email_window.title(f"Emails trouvés - {offre.entreprise}")
                         email_window.geometry("500x300")
                         
                         text_widget = tk.Text(email_window, wrap=tk.WORD, padx=10, pady=10)
@@ -522,7 +602,6 @@ Notes: {candidature['notes']}
                     else:
                         messagebox.showinfo("Info", "Aucun email trouvé pour cette entreprise")
                 
-                conn.close()
                 
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de la recherche d'emails: {e}")
@@ -540,18 +619,16 @@ Notes: {candidature['notes']}
             
             conn = create_connection(self.db_path)
             if conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM offres WHERE id = ?", (offre_id,))
-                offre = cursor.fetchone()
+                offre = fetch_offre_by_id(conn, offre_id)
                 
                 if offre:
                     # Créer une candidature
                     candidature_data = {
                         'offre_id': offre_id,
-                        'entreprise': offre[1],
-                        'poste': offre[2],
-                        'url': offre[3],
-                        'email_contact': offre[4],
+                        'entreprise': offre.entreprise,
+                        'poste': offre.titre,
+                        'url': offre.url,
+                        'email_contact': offre.email,
                         'date_candidature': datetime.now().date(),
                         'statut': 'Envoyée',
                         'type_candidature': 'Spontanée',
@@ -567,7 +644,6 @@ Notes: {candidature['notes']}
                     else:
                         messagebox.showerror("Erreur", "Erreur lors de la création de la candidature")
                 
-                conn.close()
                 
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de la création de la candidature: {e}")
@@ -588,11 +664,8 @@ Notes: {candidature['notes']}
         try:
             # Statistiques des offres
             conn = create_connection(self.db_path)
-            if conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM offres")
-                total_offres = cursor.fetchone()[0]
-                conn.close()
+            total_offres = count_offres(conn)
+            self.update_domain_choices(conn)
             
             # Statistiques des candidatures
             candidature_stats = self.candidature_tracker.get_statistics()
@@ -604,6 +677,10 @@ Notes: {candidature['notes']}
         except Exception as e:
             print(f"Erreur statistiques: {e}")
     
+    def update_domain_choices(self, conn):
+        """Proposer dans le filtre les domaines présents en base (compteurs de facettes)"""
+        self.domain_combo['values'] = ['Tous'] + [domaine for domaine, _ in fetch_facets(conn, 'domaine')]
+    
     def show_stats(self):
         """Afficher les statistiques détaillées"""
         self.update_statistics()
@@ -632,6 +709,11 @@ Par statut:
             for statut, count in stats['statuts'].items():
                 stats_text += f"• {statut}: {count}\n"
             
+            if stats.get('par_domaine'):
+                stats_text += "\nPar domaine:\n"
+                for domaine, count in stats['par_domaine'].items():
+                    stats_text += f"• {domaine}: {count}\n"
+            
             if stats['par_mois']:
                 stats_text += "\nPar mois:\n"
                 for mois, count in stats['par_mois'].items():
@@ -649,42 +731,58 @@ Par statut:
             # Récupérer les données
             conn = create_connection(self.db_path)
             if conn:
-                cursor = conn.cursor()
-                
                 # Graphique par domaine
-                cursor.execute("SELECT domaine, COUNT(*) FROM offres GROUP BY domaine ORDER BY COUNT(*) DESC LIMIT 10")
-                domaines = dict(cursor.fetchall())
+                domaines = dict(fetch_facets(conn, 'domaine', 10))
                 
                 if domaines:
                     fig = self.charts_manager.create_domain_chart(domaines)
                     fig.show()
                 
-                conn.close()
                 
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de l'affichage des graphiques: {e}")
     
     def export_stats(self):
-        """Exporter les statistiques"""
+        """Exporter les offres (et candidatures) au format export.default_format"""
+        export_config = self.config.get('export', {})
+        fmt = export_config.get('default_format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            messagebox.showerror("Erreur", f"Format d'export inconnu: {fmt}")
+            return
+        self.status_bar.config(text=f"Export {fmt} en cours...")
+        threading.Thread(target=self._export_worker,
+                         args=(fmt, export_config.get('include_timestamp', True)), daemon=True).start()
+    
+    def _export_worker(self, fmt, include_timestamp):
+        """Exporter les tables en flux sans bloquer l'interface"""
+        def progress(lignes, elapsed):
+            self.root.after(0, lambda: self.status_bar.config(
+                text=f"Export {fmt}: {lignes} lignes ({lignes / elapsed if elapsed else 0:.0f} lignes/s)"))
+        
         try:
+            export_dir = os.getcwd()
             conn = create_connection(self.db_path)
-            if conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM offres")
-                offres = cursor.fetchall()
-                
-                # Export simple en CSV
-                filename = f"export_offres_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write("ID,Entreprise,Titre,URL,Email,Ville,Domaine,Type,Rémunération,Date\n")
-                    for offre in offres:
-                        f.write(f"{offre[0]},{offre[1]},{offre[2]},{offre[3]},{offre[4]},{offre[5]},{offre[7]},{offre[8]},{offre[9]},{offre[10]}\n")
-                
-                messagebox.showinfo("Export", f"Données exportées vers {filename}")
-                conn.close()
-                
+            report = export_table(conn, "offres", export_path(export_dir, "offres", fmt, include_timestamp),
+                                  fmt, progress=progress)
+            files = [report['fichier']]
+            candidatures_db = self.candidature_tracker.db_path
+            if os.path.exists(candidatures_db):
+                files.append(export_table(create_connection(candidatures_db), "candidatures",
+                                          export_path(export_dir, "candidatures", fmt, include_timestamp), fmt,
+                                          progress=progress)['fichier'])
+            message = "Données exportées vers :\n" + "\n".join(files)
+            self.root.after(0, lambda: messagebox.showinfo("Export", message))
+            self.root.after(0, lambda: self.status_bar.config(
+                text=f"Export {fmt}: {report['lignes']} offres en {report['duree_s']}s"))
+        except ImportError as e:
+            # pyarrow / openpyxl absent : avertir et proposer le format CSV
+            message = f"{e}\nOu choisissez \"csv\" dans export.default_format."
+            self.root.after(0, lambda: messagebox.showwarning("Attention", message))
         except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur lors de l'export: {e}")
+            message = f"Erreur lors de l'export: {e}"
+            self.root.after(0, lambda: messagebox.showerror("Erreur", message))
+        finally:
+            get_manager().close_thread_connections()
     
     def export_data(self):
         """Exporter les données"""
@@ -695,44 +793,68 @@ Par statut:
         messagebox.showinfo("Info", "Utilisez le bouton 'Rechercher Email' sur une offre sélectionnée")
     
     def clean_database(self):
-        """Nettoyer la base de données"""
+        """Nettoyer la base de données (archivage par lots en arrière-plan)"""
         if messagebox.askyesno("Confirmation", "Voulez-vous nettoyer la base de données ?"):
-            try:
-                conn = create_connection(self.db_path)
-                if conn:
-                    cursor = conn.cursor()
-                    cursor.execute("DELETE FROM offres WHERE date_ajout < date('now', '-30 days')")
-                    deleted = cursor.rowcount
-                    conn.commit()
-                    conn.close()
-                    
-                    messagebox.showinfo("Nettoyage", f"{deleted} offres anciennes supprimées")
-                    self.load_offres()
-                    
-            except Exception as e:
-                messagebox.showerror("Erreur", f"Erreur lors du nettoyage: {e}")
+            self.status_bar.config(text="Nettoyage en cours...")
+            threading.Thread(target=self._clean_database_worker, daemon=True).start()
     
-    def save_config(self):
-        """Sauvegarder la configuration"""
-        self.config['ui']['window_size'] = self.window_size_var.get()
-        self.config['ui']['theme'] = self.theme_var.get()
+    def _clean_database_worker(self):
+        """Archiver les offres de plus de 30 jours sans bloquer l'interface"""
+        def progress(archived, elapsed):
+            self.root.after(0, lambda: self.status_bar.config(
+                text=f"Nettoyage: {archived} offres archivées ({elapsed:.1f}s)"))
         
-        config_path = os.path.join(os.path.dirname(__file__), "config.json")
         try:
-            with open(config_path, 'w') as f:
-                json.dump(self.config, f, indent=2)
+            conn = create_connection(self.db_path)
+            candidatures_db = os.path.join(os.path.dirname(self.db_path), "candidatures.db")
+            report = RetentionManager(conn, candidatures_db=candidatures_db).archive_expired(
+                "date_ajout", "-30 days", progress=progress)
+            prune_changes(conn, self.config.get_float('database.changes_keep_days', 7))
+            self.root.after(0, lambda: self._on_clean_database_done(report))
+        except Exception as e:
+            message = f"Erreur lors du nettoyage: {e}"
+            self.root.after(0, lambda: messagebox.showerror("Erreur", message))
+        finally:
+            get_manager().close_thread_connections()
+    
+    def _backfill_worker(self):
+        """Calculer les colonnes normalisées des offres déjà en base"""
+        try:
+            backfill_normalised_columns(create_connection(self.db_path))
+        except Exception as e:
+            print(f"Erreur normalisation des offres: {e}")
+        finally:
+            get_manager().close_thread_connections()
+    
+    def _on_clean_database_done(self, report):
+        """Afficher le bilan du nettoyage et recharger la liste"""
+        messagebox.showinfo(
+            "Nettoyage",
+            f"{report['archivees']} offres anciennes archivées "
+            f"({report['offres_par_s']} offres/s, {report['pages_liberees']} pages libérées)"
+        )
+        self.load_offres()
+    
+    def save_config(self):
+        """Sauvegarder la configuration (config.json)"""
+        try:
+            self.config.save_user_config({'ui': {
+                'window_size': self.window_size_var.get(),
+                'theme': self.theme_var.get()
+            }})
             messagebox.showinfo("Configuration", "Configuration sauvegardée!")
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur sauvegarde: {e}")
     
     def reset_config(self):
-        """Réinitialiser la configuration"""
-        self.config = {
-            "scraping": {"delay_min": 1, "delay_max": 3, "max_pages": 5},
-            "ui": {"theme": "light", "window_size": "1400x900"}
-        }
-        self.window_size_var.set("1400x900")
-        self.theme_var.set("light")
+        """Réinitialiser la configuration (valeurs de config_default.json)"""
+        try:
+            self.config.save_user_config({}, replace_sections=('ui',))
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Erreur sauvegarde: {e}")
+            return
+        self.window_size_var.set(self.config.get_str('ui.window_size', '1400x900'))
+        self.theme_var.set(self.config.get_str('ui.theme', 'light'))
         messagebox.showinfo("Configuration", "Configuration réinitialisée")
     
     def run(self):
@@ -10,11 +10,17 @@ import sqlite3
 import os
 import threading
 import webbrowser
-from datetime import datetime
-import json
 
 # Import des modules existants
-from database import create_connection, create_tables
+from database import create_connection, create_tables, fetch_offre_by_id, fetch_facets, count_offres, insert_offre, OFFRE_COLUMNS
+from backup_manager import BackupManager
+from database_manager import get_manager
+from config_manager import get_config
+from retention_manager import RetentionManager
+from normalisation import backfill_normalised_columns, backfill_pending
+from change_log import changes_since, current_seq, latest_ops, prune_changes
+from export_db import EXPORT_FORMATS, export_path, export_table
+from hot_tier import HotTier
 
 class SimpleApp:
     def __init__(self):
@@ -25,28 +31,36 @@ class SimpleApp:
         
         # Configuration
         self.db_path = os.path.join(os.path.dirname(__file__), "data", "offres.db")
-        self.config = self.load_config()
+        self.config = get_config()
+        
+        # Mise à jour du schéma (index, recherche plein texte...)
+        create_tables(create_connection(self.db_path))
+        
+        # Pagination des offres (curseur sur date_ajout, id)
+        self.page_size = self.config.get_int('filters.page_size', 200)
+        self.page_filters = {}
+        self.next_cursor = None
+        self.page_pending = False
+        
+        # Rafraîchissement incrémental : position dans le journal des modifications
+        self.change_seq = 0
+        
+        # Offres récentes en mémoire (database.hot_tier_days, 0 pour désactiver)
+        self.hot_tier = HotTier(self.db_path, days=self.config.get_float('database.hot_tier_days', 30))
+        self.hot_tier.start()
+        
+        # Sauvegarde des bases en arrière-plan si l'intervalle configuré est écoulé
+        threading.Thread(target=BackupManager().run_if_due, daemon=True).start()
+        
+        # Normalisation des offres existantes (une seule fois après la migration du schéma)
+        if backfill_pending(create_connection(self.db_path)):
+            threading.Thread(target=self._backfill_worker, daemon=True).start()
         
         # Interface
         self.setup_ui()
         self.load_offres()
+        self.schedule_refresh()
         
-    def load_config(self):
-        """Charger la configuration"""
-        config_path = os.path.join(os.path.dirname(__file__), "config.json")
-        default_config = {
-            "scraping": {"delay_min": 1, "delay_max": 3, "max_pages": 5},
-            "ui": {"theme": "light", "window_size": "1200x800"}
-        }
-        
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    return json.load(f)
-            except:
-                return default_config
-        return default_config
-    
     def setup_ui(self):
         """Créer l'interface utilisateur"""
         # Style moderne
@@ -105,16 +119,17 @@ class SimpleApp:
         
         ttk.Label(filter_frame, text="Domaine:").grid(row=0, column=2, sticky=tk.W, padx=(20,0))
         self.domain_var = tk.StringVar()
-        domain_combo = ttk.Combobox(filter_frame, textvariable=self.domain_var, width=15)
-        domain_combo['values'] = ['Tous', 'Informatique', 'Marketing', 'Commerce', 'Finance', 'Autre']
-        domain_combo.grid(row=0, column=3, padx=5)
-        domain_combo.bind('<<ComboboxSelected>>', self.filter_offres)
+        self.domain_combo = ttk.Combobox(filter_frame, textvariable=self.domain_var, width=15)
+        self.domain_combo['values'] = ['Tous']
+        self.domain_combo.grid(row=0, column=3, padx=5)
+        self.domain_combo.bind('<<ComboboxSelected>>', self.filter_offres)
         
         # Boutons d'action
         action_frame = ttk.Frame(filter_frame)
         action_frame.grid(row=1, column=0, columnspan=4, pady=10)
         
         ttk.Button(action_frame, text="🔄 Actualiser", command=self.load_offres).pack(side=tk.LEFT, padx=5)
+        ttk.Button(action_frame, text="⬇️ Plus d'offres", command=self.load_more_offres).pack(side=tk.LEFT, padx=5)
         ttk.Button(action_frame, text="📊 Statistiques", command=self.show_stats).pack(side=tk.LEFT, padx=5)
         ttk.Button(action_frame, text="🌐 Ouvrir URL", command=self.open_url).pack(side=tk.LEFT, padx=5)
         ttk.Button(action_frame, text="➕ Ajouter", command=self.add_manual_offre).pack(side=tk.LEFT, padx=5)
@@ -135,7 +150,8 @@ class SimpleApp:
         # Scrollbars
         v_scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
         h_scrollbar = ttk.Scrollbar(table_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.tree.configure(yscrollcommand=lambda first, last: self.on_tree_scroll(v_scrollbar, first, last),
+                            xscrollcommand=h_scrollbar.set)
         
         # Placement
         self.tree.grid(row=0, column=0, sticky='nsew')
@@ -188,11 +204,11 @@ class SimpleApp:
         general_config.pack(fill=tk.X, padx=5, pady=5)
         
         ttk.Label(general_config, text="Taille fenêtre:").grid(row=0, column=0, sticky=tk.W)
-        self.window_size_var = tk.StringVar(value="1200x800")
+        self.window_size_var = tk.StringVar(value=self.config.get_str("ui.window_size", "1200x800"))
         ttk.Entry(general_config, textvariable=self.window_size_var, width=15).grid(row=0, column=1, padx=5)
         
         ttk.Label(general_config, text="Thème:").grid(row=0, column=2, sticky=tk.W, padx=(20,0))
-        self.theme_var = tk.StringVar(value="light")
+        self.theme_var = tk.StringVar(value=self.config.get_str("ui.theme", "light"))
         theme_combo = ttk.Combobox(general_config, textvariable=self.theme_var, width=10)
         theme_combo['values'] = ['light', 'dark']
         theme_combo.grid(row=0, column=3, padx=5)
@@ -205,76 +221,124 @@ class SimpleApp:
         ttk.Button(button_frame, text="🔄 Réinitialiser", command=self.reset_config).pack(side=tk.LEFT, padx=5)
     
     def load_offres(self):
-        """Charger les offres depuis la base de données"""
+        """Charger la première page des offres depuis la base de données"""
         try:
-            conn = create_connection(self.db_path)
-            if conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT id, entreprise, titre, ville, domaine, type_contrat, date_ajout
-                    FROM offres 
-                    ORDER BY date_ajout DESC
-                    LIMIT 1000
-                """)
-                
-                # Vider le tree
-                for item in self.tree.get_children():
-                    self.tree.delete(item)
-                
-                # Ajouter les données
-                for row in cursor.fetchall():
-                    self.tree.insert('', 'end', values=row)
-                
-                conn.close()
-                self.update_statistics()
-                self.status_bar.config(text=f"Chargé: {len(self.tree.get_children())} offres")
+            self.show_offres_page({}, reset=True)
+            self.update_statistics()
+            self.status_bar.config(text=self.page_status("Chargé"))
                 
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors du chargement: {e}")
     
+    def load_more_offres(self):
+        """Ajouter la page suivante d'offres à la liste"""
+        self.page_pending = False
+        if self.next_cursor is None:
+            self.status_bar.config(text=f"Toutes les offres sont affichées ({len(self.tree.get_children())})")
+            return
+        try:
+            self.show_offres_page(self.page_filters)
+            self.status_bar.config(text=self.page_status("Chargé"))
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Erreur lors du chargement: {e}")
+    
+    def show_offres_page(self, filters, reset=False):
+        """Afficher une page d'offres : la première si reset, sinon celle qui suit le curseur"""
+        conn = create_connection(self.db_path)
+        if not conn:
+            return
+        if reset:
+            self.page_filters = filters
+            self.next_cursor = None
+            self.tree.delete(*self.tree.get_children())
+            # Les modifications postérieures à ce chargement seront appliquées par apply_offre_changes
+            self.change_seq = current_seq(conn)
+            self.hot_tier.sync(conn)
+        
+        rows, self.next_cursor = self.hot_tier.fetch_offres_page(
+            conn, filters, after=None if reset else self.next_cursor, size=self.page_size
+        )
+        for row in rows:
+            if not self.tree.exists(str(row.id)):
+                self.tree.insert('', 'end', iid=str(row.id), values=row)
+    
+    def schedule_refresh(self):
+        """Programmer le prochain rafraîchissement si ui.auto_refresh est activé"""
+        ui_config = self.config.get('ui', {})
+        if ui_config.get('auto_refresh', False):
+            minutes = float(ui_config.get('refresh_interval_minutes', 30))
+            self.root.after(int(minutes * 60000), self.auto_refresh)
+    
+    def auto_refresh(self):
+        """Rafraîchissement périodique à partir du journal des modifications"""
+        try:
+            self.apply_offre_changes()
+        except Exception as e:
+            print(f"Erreur rafraîchissement: {e}")
+        finally:
+            self.schedule_refresh()
+    
+    def apply_offre_changes(self, limit=5000):
+        """
+        Appliquer à la liste les offres ajoutées, modifiées ou supprimées depuis le
+        dernier chargement, sans recharger les lignes inchangées.
+        """
+        conn = create_connection(self.db_path)
+        self.hot_tier.sync(conn)
+        changes, seq = changes_since(conn, self.change_seq, table='offres', limit=limit)
+        if len(changes) == limit:
+            # Trop de modifications d'un coup : un rechargement complet est plus simple
+            self.load_offres()
+            return
+        self.change_seq = seq
+        ops = latest_ops(changes)
+        if not ops:
+            return
+        
+        ids = [row_id for (_, row_id), op in ops.items() if op != 'D']
+        rows = self.hot_tier.fetch_offres_page(conn, dict(self.page_filters, ids=ids), size=len(ids))[0] if ids else []
+        visibles = {str(row.id): row for row in rows}
+        for (_, row_id), op in ops.items():
+            iid = str(row_id)
+            if self.tree.exists(iid) and iid not in visibles:
+                # Supprimée, ou ne correspond plus aux filtres actifs
+                self.tree.delete(iid)
+        for row in reversed(rows):
+            iid = str(row.id)
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=row)
+            elif ops[('offres', row.id)] == 'I':
+                self.tree.insert('', 0, iid=iid, values=row)
+        
+        self.update_statistics()
+        self.status_bar.config(text=self.page_status(f"Actualisé ({len(ops)} modifications)"))
+    
+    def page_status(self, prefix):
+        """Texte de la barre de statut pour la liste paginée"""
+        suite = " (faites défiler pour la suite)" if self.next_cursor is not None else ""
+        return f"{prefix}: {len(self.tree.get_children())} offres{suite}"
+    
+    def on_tree_scroll(self, scrollbar, first, last):
+        """Charger la page suivante quand la liste est défilée jusqu'en bas"""
+        scrollbar.set(first, last)
+        if float(last) >= 1.0 and float(first) > 0.0 and self.next_cursor is not None and not self.page_pending:
+            self.page_pending = True
+            self.root.after_idle(self.load_more_offres)
+    
     def filter_offres(self, event=None):
         """Filtrer les offres selon les critères"""
-        search_term = self.search_var.get().lower()
-        domain_filter = self.domain_var.get()
-        
-        # Vider le tree
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        filters = {
+            'keyword': self.search_var.get(),
+            'domaine': self.domain_var.get()
+        }
         
         try:
-            conn = create_connection(self.db_path)
-            if conn:
-                cursor = conn.cursor()
-                
-                # Construire la requête
-                query = """
-                    SELECT id, entreprise, titre, ville, domaine, type_contrat, date_ajout
-                    FROM offres 
-                    WHERE 1=1
-                """
-                params = []
-                
-                if search_term:
-                    query += " AND (titre LIKE ? OR entreprise LIKE ? OR ville LIKE ?)"
-                    params.extend([f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'])
-                
-                if domain_filter and domain_filter != 'Tous':
-                    query += " AND domaine = ?"
-                    params.append(domain_filter)
-                
-                query += " ORDER BY date_ajout DESC LIMIT 1000"
-                
-                cursor.execute(query, params)
-                
-                for row in cursor.fetchall():
-                    self.tree.insert('', 'end', values=row)
-                
-                conn.close()
-                self.status_bar.config(text=f"Filtré: {len(self.tree.get_children())} offres")
+            self.show_offres_page(filters, reset=True)
+            self.status_bar.config(text=self.page_status("Filtré"))
                 
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors du filtrage: {e}")
-    
+
     def on_offre_double_click(self, event):
         """Action lors du double-clic sur une offre"""
         selection = self.tree.selection()
@@ -288,14 +352,12 @@ class SimpleApp:
         try:
             conn = create_connection(self.db_path)
             if conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM offres WHERE id = ?", (offre_id,))
-                offre = cursor.fetchone()
+                offre = fetch_offre_by_id(conn, offre_id)
                 
                 if offre:
                     # Créer une fenêtre de détails
                     details_window = tk.Toplevel(self.root)
-                    details_window.title(f"Détails - {offre[2]}")
+                    details_window.title(f"Détails - {offre.titre}")
                     details_window.geometry("600x400")
                     
                     # Afficher les détails
@@ -303,25 +365,24 @@ class SimpleApp:
                     text_widget.pack(fill=tk.BOTH, expand=True)
                     
                     details = f"""
-Entreprise: {offre[1]}
-Titre: {offre[2]}
-URL: {offre[3]}
-Email: {offre[4]}
-Ville: {offre[5]}
-Département: {offre[6]}
-Domaine: {offre[7]}
-Type de contrat: {offre[8]}
-Rémunération: {offre[9]}
-Date publication: {offre[10]}
-Durée: {offre[11]}
-Mots-clés: {offre[12]}
-Date ajout: {offre[13]}
+Entreprise: {offre.entreprise}
+Titre: {offre.titre}
+URL: {offre.url}
+Email: {offre.email}
+Ville: {offre.ville}
+Département: {offre.departement}
+Domaine: {offre.domaine}
+Type de contrat: {offre.type_contrat}
+Rémunération: {offre.remuneration}
+Date publication: {offre.date_publication}
+Durée: {offre.duree}
+Mots-clés: {offre.mots_cles}
+Date ajout: {offre.date_ajout}
                     """
                     
                     text_widget.insert(tk.END, details)
                     text_widget.config(state=tk.DISABLED)
                 
-                conn.close()
                 
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de l'affichage: {e}")
@@ -339,17 +400,14 @@ Date ajout: {offre[13]}
             
             conn = create_connection(self.db_path)
             if conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT url FROM offres WHERE id = ?", (offre_id,))
-                url = cursor.fetchone()
+                offre = fetch_offre_by_id(conn, offre_id)
                 
-                if url and url[0]:
-                    webbrowser.open(url[0])
-                    self.status_bar.config(text=f"Ouverture: {url[0]}")
+                if offre and offre.url:
+                    webbrowser.open(offre.url)
+                    self.status_bar.config(text=f"Ouverture: {offre.url}")
                 else:
                     messagebox.showwarning("Attention", "URL non disponible")
                 
-                conn.close()
                 
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de l'ouverture: {e}")
@@ -361,26 +419,9 @@ Date ajout: {offre[13]}
             try:
                 conn = create_connection(self.db_path)
                 if conn:
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        INSERT INTO offres (entreprise, titre, url, email, ville, departement, domaine, type_contrat, remuneration, date_publication, duree, mots_cles)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        dialog.result['entreprise'],
-                        dialog.result['titre'],
-                        dialog.result['url'],
-                        dialog.result['email'],
-                        dialog.result['ville'],
-                        dialog.result['departement'],
-                        dialog.result['domaine'],
-                        dialog.result['type_contrat'],
-                        dialog.result['remuneration'],
-                        dialog.result['date_publication'],
-                        dialog.result['duree'],
-                        dialog.result['mots_cles']
-                    ))
-                    conn.commit()
-                    conn.close()
+                    if insert_offre(conn, tuple(dialog.result[col] for col in OFFRE_COLUMNS)) is None:
+                        messagebox.showwarning("Attention", "Offre non ajoutée (entreprise, titre et URL http requis)")
+                        return
                     
                     messagebox.showinfo("Succès", "Offre ajoutée avec succès!")
                     self.load_offres()
@@ -389,40 +430,25 @@ Date ajout: {offre[13]}
                 messagebox.showerror("Erreur", f"Erreur lors de l'ajout: {e}")
     
     def update_statistics(self):
-        """Mettre à jour les statistiques"""
+        """Mettre à jour les statistiques (lues dans les compteurs de facettes)"""
         try:
             conn = create_connection(self.db_path)
             if conn:
-                cursor = conn.cursor()
+                self.stats_labels['total'].config(text=str(count_offres(conn)))
                 
-                # Total
-                cursor.execute("SELECT COUNT(*) FROM offres")
-                total = cursor.fetchone()[0]
-                self.stats_labels['total'].config(text=str(total))
+                for key, facet in (('domaines', 'domaine'), ('villes', 'ville'), ('types', 'type_contrat')):
+                    texte = ", ".join([f"{valeur}: {n}" for valeur, n in fetch_facets(conn, facet, 5)])
+                    self.stats_labels[key].config(text=texte[:50] + "..." if len(texte) > 50 else texte)
                 
-                # Par domaine
-                cursor.execute("SELECT domaine, COUNT(*) FROM offres GROUP BY domaine ORDER BY COUNT(*) DESC LIMIT 5")
-                domaines = cursor.fetchall()
-                domaines_text = ", ".join([f"{d[0]}: {d[1]}" for d in domaines])
-                self.stats_labels['domaines'].config(text=domaines_text[:50] + "..." if len(domaines_text) > 50 else domaines_text)
-                
-                # Par ville
-                cursor.execute("SELECT ville, COUNT(*) FROM offres WHERE ville IS NOT NULL GROUP BY ville ORDER BY COUNT(*) DESC LIMIT 5")
-                villes = cursor.fetchall()
-                villes_text = ", ".join([f"{v[0]}: {v[1]}" for v in villes])
-                self.stats_labels['villes'].config(text=villes_text[:50] + "..." if len(villes_text) > 50 else villes_text)
-                
-                # Par type
-                cursor.execute("SELECT type_contrat, COUNT(*) FROM offres WHERE type_contrat IS NOT NULL GROUP BY type_contrat ORDER BY COUNT(*) DESC LIMIT 5")
-                types = cursor.fetchall()
-                types_text = ", ".join([f"{t[0]}: {t[1]}" for t in types])
-                self.stats_labels['types'].config(text=types_text[:50] + "..." if len(types_text) > 50 else types_text)
-                
-                conn.close()
+                self.update_domain_choices(conn)
                 
         except Exception as e:
             print(f"Erreur statistiques: {e}")
     
+    def update_domain_choices(self, conn):
+        """Proposer dans le filtre les domaines présents en base (compteurs de facettes)"""
+        self.domain_combo['values'] = ['Tous'] + [domaine for domaine, _ in fetch_facets(conn, 'domaine')]
+    
     def show_stats(self):
         """Afficher les statistiques détaillées"""
         self.update_statistics()
@@ -438,11 +464,8 @@ Date ajout: {offre[13]}
             
             conn = create_connection(self.db_path)
             if conn:
-                cursor = conn.cursor()
-                
                 # Graphique par domaine
-                cursor.execute("SELECT domaine, COUNT(*) FROM offres GROUP BY domaine ORDER BY COUNT(*) DESC LIMIT 10")
-                domaines = cursor.fetchall()
+                domaines = fetch_facets(conn, 'domaine', 10)
                 
                 if domaines:
                     fig, ax = plt.subplots(figsize=(10, 6))
@@ -455,7 +478,6 @@ Date ajout: {offre[13]}
                     plt.tight_layout()
                     plt.show()
                 
-                conn.close()
                 
         except ImportError:
             messagebox.showwarning("Attention", "Matplotlib non installé. Installez avec: pip install matplotlib")
@@ -463,70 +485,109 @@ Date ajout: {offre[13]}
             messagebox.showerror("Erreur", f"Erreur lors de l'affichage des graphiques: {e}")
     
     def export_stats(self):
-        """Exporter les statistiques"""
+        """Exporter les offres (et candidatures) au format export.default_format"""
+        export_config = self.config.get('export', {})
+        fmt = export_config.get('default_format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            messagebox.showerror("Erreur", f"Format d'export inconnu: {fmt}")
+            return
+        self.status_bar.config(text=f"Export {fmt} en cours...")
+        threading.Thread(target=self._export_worker,
+                         args=(fmt, export_config.get('include_timestamp', True)), daemon=True).start()
+    
+    def _export_worker(self, fmt, include_timestamp):
+        """Exporter les tables en flux sans bloquer l'interface"""
+        def progress(lignes, elapsed):
+            self.root.after(0, lambda: self.status_bar.config(
+                text=f"Export {fmt}: {lignes} lignes ({lignes / elapsed if elapsed else 0:.0f} lignes/s)"))
+        
         try:
+            export_dir = os.getcwd()
             conn = create_connection(self.db_path)
-            if conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM offres")
-                offres = cursor.fetchall()
-                
-                # Export simple en CSV
-                filename = f"export_offres_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write("ID,Entreprise,Titre,URL,Email,Ville,Domaine,Type,Rémunération,Date\n")
-                    for offre in offres:
-                        f.write(f"{offre[0]},{offre[1]},{offre[2]},{offre[3]},{offre[4]},{offre[5]},{offre[7]},{offre[8]},{offre[9]},{offre[10]}\n")
-                
-                messagebox.showinfo("Export", f"Données exportées vers {filename}")
-                conn.close()
-                
+            report = export_table(conn, "offres", export_path(export_dir, "offres", fmt, include_timestamp),
+                                  fmt, progress=progress)
+            files = [report['fichier']]
+            message = "Données exportées vers :\n" + "\n".join(files)
+            self.root.after(0, lambda: messagebox.showinfo("Export", message))
+            self.root.after(0, lambda: self.status_bar.config(
+                text=f"Export {fmt}: {report['lignes']} offres en {report['duree_s']}s"))
+        except ImportError as e:
+            # pyarrow / openpyxl absent : avertir et proposer le format CSV
+            message = f"{e}\nOu choisissez \"csv\" dans export.default_format."
+            self.root.after(0, lambda: messagebox.showwarning("Attention", message))
         except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur lors de l'export: {e}")
+            message = f"Erreur lors de l'export: {e}"
+            self.root.after(0, lambda: messagebox.showerror("Erreur", message))
+        finally:
+            get_manager().close_thread_connections()
     
     def export_data(self):
         """Exporter les données"""
         self.export_stats()
     
     def clean_database(self):
-        """Nettoyer la base de données"""
+        """Nettoyer la base de données (archivage par lots en arrière-plan)"""
         if messagebox.askyesno("Confirmation", "Voulez-vous nettoyer la base de données ?"):
-            try:
-                conn = create_connection(self.db_path)
-                if conn:
-                    cursor = conn.cursor()
-                    cursor.execute("DELETE FROM offres WHERE date_ajout < date('now', '-30 days')")
-                    deleted = cursor.rowcount
-                    conn.commit()
-                    conn.close()
-                    
-                    messagebox.showinfo("Nettoyage", f"{deleted} offres anciennes supprimées")
-                    self.load_offres()
-                    
-            except Exception as e:
-                messagebox.showerror("Erreur", f"Erreur lors du nettoyage: {e}")
+            self.status_bar.config(text="Nettoyage en cours...")
+            threading.Thread(target=self._clean_database_worker, daemon=True).start()
     
-    def save_config(self):
-        """Sauvegarder la configuration"""
-        self.config['ui']['window_size'] = self.window_size_var.get()
-        self.config['ui']['theme'] = self.theme_var.get()
+    def _clean_database_worker(self):
+        """Archiver les offres de plus de 30 jours sans bloquer l'interface"""
+        def progress(archived, elapsed):
+            self.root.after(0, lambda: self.status_bar.config(
+                text=f"Nettoyage: {archived} offres archivées ({elapsed:.1f}s)"))
         
-        config_path = os.path.join(os.path.dirname(__file__), "config.json")
         try:
-            with open(config_path, 'w') as f:
-                json.dump(self.config, f, indent=2)
+            conn = create_connection(self.db_path)
+            candidatures_db = os.path.join(os.path.dirname(self.db_path), "candidatures.db")
+            report = RetentionManager(conn, candidatures_db=candidatures_db).archive_expired(
+                "date_ajout", "-30 days", progress=progress)
+            prune_changes(conn, self.config.get_float('database.changes_keep_days', 7))
+            self.root.after(0, lambda: self._on_clean_database_done(report))
+        except Exception as e:
+            message = f"Erreur lors du nettoyage: {e}"
+            self.root.after(0, lambda: messagebox.showerror("Erreur", message))
+        finally:
+            get_manager().close_thread_connections()
+    
+    def _backfill_worker(self):
+        """Calculer les colonnes normalisées des offres déjà en base"""
+        try:
+            backfill_normalised_columns(create_connection(self.db_path))
+        except Exception as e:
+            print(f"Erreur normalisation des offres: {e}")
+        finally:
+            get_manager().close_thread_connections()
+    
+    def _on_clean_database_done(self, report):
+        """Afficher le bilan du nettoyage et recharger la liste"""
+        messagebox.showinfo(
+            "Nettoyage",
+            f"{report['archivees']} offres anciennes archivées "
+            f"({report['offres_par_s']} offres/s, {report['pages_liberees']} pages libérées)"
+        )
+        self.load_offres()
+    
+    def save_config(self):
+        """Sauvegarder la configuration (config.json)"""
+        try:
+            self.config.save_user_config({'ui': {
+                'window_size': self.window_size_var.get(),
+                'theme': self.theme_var.get()
+            }})
             messagebox.showinfo("Configuration", "Configuration sauvegardée!")
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur sauvegarde: {e}")
     
     def reset_config(self):
-        """Réinitialiser la configuration"""
-        self.config = {
-            "scraping": {"delay_min": 1, "delay_max": 3, "max_pages": 5},
-            "ui": {"theme": "light", "window_size": "1200x800"}
-        }
-        self.window_size_var.set("1200x800")
-        self.theme_var.set("light")
+        """Réinitialiser la configuration (valeurs de config_default.json)"""
+        try:
+            self.config.save_user_config({}, replace_sections=('ui',))
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Erreur sauvegarde: {e}")
+            return
+        self.window_size_var.set(self.config.get_str('ui.window_size', '1200x800'))
+        self.theme_var.set(self.config.get_str('ui.theme', 'light'))
         messagebox.showinfo("Configuration", "Configuration réinitialisée")
     
     def run(self):
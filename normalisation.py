@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Normalisation des champs texte des offres
+Rémunération mensuelle, durée en mois et dates en timestamp, calculées à l'insertion
+"""
+
+import calendar
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+# Coefficients de conversion vers un montant mensuel (base 35h/semaine)
+REMUNERATION_PAR_MOIS = {
+    "heure": 151.67,
+    "jour": 21.67,
+    "semaine": 4.33,
+    "mois": 1.0,
+    "an": 1 / 12
+}
+
+# Coefficients de conversion d'une durée vers des mois
+DUREE_EN_MOIS = {
+    "mois": 1.0,
+    "semaine": 12 / 52,
+    "jour": 1 / 30,
+    "heure": 1 / (30 * 24)
+}
+
+DATE_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%d/%m/%Y', '%m/%d/%Y')
+
+# "1 868", "1 868,50", "832", "11.65" (espaces fines et insécables acceptés comme séparateurs de milliers)
+_NOMBRE = re.compile(r"\d{1,3}(?:[ \u00a0\u202f]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?")
+_UNITE_REMUNERATION = re.compile(r"(/\s*h\b|\b(?:heure|jour|semaine|mois|an|année|annuel)s?\b)", re.IGNORECASE)
+_DUREE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(mois|semaine|jour|heure)", re.IGNORECASE)
+
+MOIS = ("janvier", "février", "mars", "avril", "mai", "juin", "juillet",
+        "août", "septembre", "octobre", "novembre", "décembre")
+
+# "Début : 01/09/2025", "à partir du 1er septembre 2025", "Date de début : septembre 2025"
+_DEBUT = re.compile(r"(?:d[ée]but|d[ée]marrage|[àa] partir d[eu]|d[èe]s (?:le )?|prise de poste)", re.IGNORECASE)
+_DATE_NUMERIQUE = re.compile(r"(\d{1,2})[/.-](\d{1,2})[/.-](\d{2,4})")
+_DATE_TEXTE = re.compile(r"(?:(\d{1,2})(?:er)?\s+)?(" + "|".join(MOIS) + r"|fevrier|aout|decembre)\s+(\d{4})", re.IGNORECASE)
+
+
+def _to_float(nombre: str) -> float:
+    return float(re.sub(r"[ \u00a0\u202f]", "", nombre).replace(",", "."))
+
+
+def parse_remuneration(texte: Optional[str]) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Convertir une rémunération libre en fourchette mensuelle (min, max) en euros.
+    "832 - 1 868 € / mois" -> (832.0, 1868.0) ; "35 k€ / an" -> (2916.67, 2916.67).
+    Retourne (None, None) si aucun montant n'est trouvé.
+    """
+    if not texte or not isinstance(texte, str):
+        return None, None
+    montants = [_to_float(n) for n in _NOMBRE.findall(texte)]
+    if not montants:
+        return None, None
+    if re.search(r"\d\s*k\s*€|\bk€", texte, re.IGNORECASE):
+        montants = [m * 1000 for m in montants]
+
+    unite = "mois"
+    match = _UNITE_REMUNERATION.search(texte)
+    if match:
+        mot = match.group(1).lower()
+        if mot.startswith("/"):
+            unite = "heure"
+        elif mot.startswith("ann"):
+            unite = "an"
+        else:
+            unite = mot if mot in REMUNERATION_PAR_MOIS else mot[:-1]
+    coefficient = REMUNERATION_PAR_MOIS[unite]
+    mini, maxi = min(montants[:2]), max(montants[:2])
+    return round(mini * coefficient, 2), round(maxi * coefficient, 2)
+
+
+def parse_duree(duree) -> Tuple[Optional[str], Optional[float]]:
+    """
+    Normaliser une durée : (6, "mois"), "6 mois" ou 6 (mois).
+    Retourne (texte à stocker dans `duree`, durée en mois).
+    """
+    if duree is None or duree == "":
+        return None, None
+    if isinstance(duree, (tuple, list)) and len(duree) == 2:
+        valeur, unite = duree
+        texte = f"{valeur} {unite}"
+    elif isinstance(duree, (int, float)):
+        return str(duree), float(duree)
+    else:
+        texte = str(duree)
+
+    match = _DUREE.search(texte)
+    if not match:
+        return texte, None
+    valeur = _to_float(match.group(1))
+    unite = match.group(2).lower()
+    return texte, round(valeur * DUREE_EN_MOIS[unite], 2)
+
+
+def parse_date(texte) -> Optional[datetime]:
+    """Parser une date dans l'un des formats rencontrés dans la base"""
+    if not texte:
+        return None
+    if isinstance(texte, datetime):
+        return texte
+    texte = str(texte).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(texte, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_date_debut(texte: Optional[str]) -> Optional[str]:
+    """
+    Date de début de contrat mentionnée dans une description, au format YYYY-MM-DD
+    ("Début : 01/09/2025", "à partir du 1er septembre 2025", "dès septembre 2025").
+    Seule la date qui suit une mention de début dans les 40 caractères est retenue.
+    """
+    if not texte:
+        return None
+    for mention in _DEBUT.finditer(texte):
+        extrait = texte[mention.end():mention.end() + 40]
+        match = _DATE_NUMERIQUE.search(extrait)
+        if match:
+            jour, mois, annee = (int(g) for g in match.groups())
+            annee += 2000 if annee < 100 else 0
+        else:
+            match = _DATE_TEXTE.search(extrait)
+            if not match:
+                continue
+            nom = match.group(2).lower().replace("fevrier", "février").replace("aout", "août").replace("decembre", "décembre")
+            jour, mois, annee = int(match.group(1) or 1), MOIS.index(nom) + 1, int(match.group(3))
+        try:
+            return datetime(annee, mois, jour).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def add_months(date: Optional[str], mois: Optional[float]) -> Optional[str]:
+    """Date (YYYY-MM-DD) décalée de `mois` mois, pour la fin d'un contrat de durée connue"""
+    debut = parse_date(date)
+    if debut is None or not mois:
+        return None
+    total = debut.month - 1 + int(mois)
+    annee, mois_fin = debut.year + total // 12, total % 12 + 1
+    jour = min(debut.day, calendar.monthrange(annee, mois_fin)[1])
+    fin = datetime(annee, mois_fin, jour) + timedelta(days=round((mois - int(mois)) * 30))
+    return fin.strftime("%Y-%m-%d")
+
+
+def to_epoch(texte) -> Optional[int]:
+    """
+    Convertir une date en timestamp Unix. Les dates sans fuseau sont lues comme
+    UTC, comme strftime('%s', ...) de SQLite, pour rester comparables à date_ajout.
+    """
+    date = parse_date(texte)
+    return calendar.timegm(date.timetuple()) if date else None
+
+
+def backfill_normalised_columns(conn: sqlite3.Connection, batch_size: int = 5000) -> int:
+    """
+    Calculer remun_min/remun_max, duree_mois et les timestamps des offres existantes.
+    Parcourt la table par lots d'identifiants (une transaction par lot).
+    Retourne le nombre de lignes mises à jour.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        rows = conn.execute("""
+            SELECT id, remuneration, duree, date_publication, date_ajout FROM offres
+            WHERE id > ? ORDER BY id LIMIT ?;
+        """, (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        values = []
+        for offre_id, remuneration, duree, date_publication, date_ajout in rows:
+            remun_min, remun_max = parse_remuneration(remuneration)
+            _, duree_mois = parse_duree(duree)
+            values.append((remun_min, remun_max, duree_mois,
+                           to_epoch(date_publication), to_epoch(date_ajout), offre_id))
+        conn.executemany("""
+            UPDATE offres SET remun_min = ?, remun_max = ?, duree_mois = ?,
+                              date_publication_ts = ?, date_ajout_ts = ?
+            WHERE id = ?;
+        """, values)
+        conn.commit()
+        updated += len(values)
+        last_id = rows[-1][0]
+    conn.execute("UPDATE configuration SET valeur = '1' WHERE parametre = 'backfill_normalisation';")
+    conn.commit()
+    return updated
+
+
+def backfill_pending(conn: sqlite3.Connection) -> bool:
+    """Indique si les offres existantes attendent encore la normalisation"""
+    row = conn.execute("SELECT valeur FROM configuration WHERE parametre = 'backfill_normalisation';").fetchone()
+    return row is not None and row[0] != '1'
+
+
+if __name__ == "__main__":
+    from database import DB_PATH, create_connection, create_tables
+
+    conn = create_connection(DB_PATH)
+    create_tables(conn)
+    print(f"{backfill_normalised_columns(conn)} offres normalisées.")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Enregistrements des offres et candidatures
+Tuples nommés compacts produits directement par sqlite3 (row_factory)
+"""
+
+import sqlite3
+from collections import namedtuple
+from typing import Callable, Dict, Iterable, Tuple
+
+# Colonnes renseignées à l'insertion d'une offre (ordre des tuples produits par les scrapers)
+OFFRE_COLUMNS = (
+    "entreprise", "titre", "url", "email", "ville", "departement", "domaine",
+    "type_contrat", "remuneration", "date_publication", "duree", "mots_cles"
+)
+
+# Colonnes d'une offre enregistrée, dans l'ordre des SELECT explicites de database.py
+OFFRE_FIELDS = ("id",) + OFFRE_COLUMNS + ("description", "date_ajout")
+
+
+class Record:
+    """
+    Accès commun aux enregistrements : attribut (offre.url), index (offre[3]),
+    clé (offre['url']) et .get(), comme les dictionnaires attendus par les filtres.
+
+    Les classes concrètes sont des namedtuple sans __dict__ (__slots__ vide) :
+    une ligne coûte un tuple, sans dictionnaire par ligne comme sqlite3.Row -> dict.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key in self._fields:
+                return getattr(self, key)
+            raise KeyError(key)
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._fields else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields
+
+    def as_dict(self) -> Dict:
+        return dict(zip(self._fields, self))
+
+
+_RECORD_TYPES: Dict[Tuple[str, Tuple[str, ...]], type] = {}
+
+
+def record_type(name: str, fields: Iterable[str]) -> type:
+    """Obtenir (et garder en cache) la classe d'enregistrement `name` pour ces colonnes"""
+    key = (name, tuple(fields))
+    cls = _RECORD_TYPES.get(key)
+    if cls is None:
+        base = namedtuple(name, key[1], rename=True)
+        cls = type(name, (Record, base), {"__slots__": ()})
+        _RECORD_TYPES[key] = cls
+    return cls
+
+
+def record_factory(name: str = "Record") -> Callable[[sqlite3.Cursor, tuple], Record]:
+    """
+    Créer une row_factory sqlite3 qui construit des enregistrements `name`.
+    La classe est résolue une fois par requête (cursor.description), pas par ligne.
+    """
+    # (description, classe) remplacés d'un bloc : la fabrique peut servir à plusieurs threads
+    cache = [(None, None)]
+
+    def factory(cursor: sqlite3.Cursor, row: tuple) -> Record:
+        description, cls = cache[0]
+        if cursor.description is not description:
+            description = cursor.description
+            cls = record_type(name, (col[0] for col in description))
+            cache[0] = (description, cls)
+        return cls._make(row)
+
+    return factory
+
+
+# Fabriques utilisées par database.py, candidature_tracker.py et les exports
+offre_factory = record_factory("Offre")
+candidature_factory = record_factory("Candidature")
+
+# Offre à insérer (tuple de OFFRE_COLUMNS) construite par les scrapers
+NouvelleOffre = record_type("NouvelleOffre", OFFRE_COLUMNS)
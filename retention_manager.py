@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Gestionnaire de rétention
+Archivage par lots des offres expirées et récupération d'espace incrémentale
+"""
+
+import os
+import sqlite3
+import time
+from typing import Callable, Dict, Optional
+
+from database_manager import get_manager
+
+# Colonnes copiées de offres vers offres_archive
+ARCHIVE_COLUMNS = (
+    "id, entreprise, titre, url, email, ville, departement, domaine, type_contrat, "
+    "remuneration, date_publication, duree, mots_cles, description, date_ajout"
+)
+
+# Colonnes de date sur lesquelles une expiration peut porter
+DATE_COLUMNS = ("date_publication", "date_ajout")
+
+
+class RetentionManager:
+    """
+    Déplace les offres expirées vers offres_archive par lots bornés.
+
+    Chaque lot (chunk_size offres) est une transaction courte : l'interface et
+    les scrapers peuvent lire et écrire entre deux lots. Les sources de l'offre
+    sont archivées avec elle ; les offres ayant une candidature sont conservées
+    (table candidatures de offres.db et, si candidatures_db est fourni, celle
+    de candidatures.db attachée à la connexion).
+    """
+
+    def __init__(self, conn: sqlite3.Connection, chunk_size: int = 5000, pause: float = 0.01,
+                 candidatures_db: Optional[str] = None):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.candidatures_db = candidatures_db
+
+    def archive_expired(self, column: str = "date_publication", age: str = "-3 months",
+                        progress: Optional[Callable[[int, float], None]] = None) -> Dict:
+        """
+        Archiver les offres dont `column` est antérieure à DATE('now', age).
+
+        progress(archivees, duree_s) est appelé après chaque lot.
+        Retourne {'archivees', 'lots', 'duree_s', 'offres_par_s', 'pages_liberees'}.
+        """
+        if column not in DATE_COLUMNS:
+            raise ValueError(f"Colonne de date inconnue: {column}")
+
+        start = time.perf_counter()
+        archived = 0
+        chunks = 0
+        # Candidatures suivies dans candidatures.db : jointure sur la base attachée
+        suivi = ""
+        if self.candidatures_db and os.path.exists(self.candidatures_db):
+            get_manager().attach(self.conn, self.candidatures_db, "candidatures_db")
+            suivi = "AND NOT EXISTS (SELECT 1 FROM candidatures_db.candidatures k WHERE k.offre_id = offres.id)"
+        select_sql = f"""
+        SELECT id FROM offres
+        WHERE {column} < DATE('now', ?)
+          AND NOT EXISTS (SELECT 1 FROM main.candidatures c WHERE c.offre_id = offres.id)
+          {suivi}
+        LIMIT ?;
+        """
+
+        if self.conn.in_transaction:
+            self.conn.commit()
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS retention_ids (id INTEGER PRIMARY KEY);")
+
+        while True:
+            ids = self.conn.execute(select_sql, (age, self.chunk_size)).fetchall()
+            if not ids:
+                break
+            try:
+                self.conn.execute("BEGIN IMMEDIATE;")
+                self.conn.execute("DELETE FROM temp.retention_ids;")
+                self.conn.executemany("INSERT INTO temp.retention_ids(id) VALUES (?);", ids)
+                self.conn.execute(f"""
+                INSERT OR REPLACE INTO offres_archive ({ARCHIVE_COLUMNS})
+                SELECT {ARCHIVE_COLUMNS} FROM offres WHERE id IN (SELECT id FROM temp.retention_ids);
+                """)
+                self.conn.execute("""
+                INSERT OR REPLACE INTO sources_offres_archive (id, offre_id, source, url)
+                SELECT id, offre_id, source, url FROM sources_offres
+                WHERE offre_id IN (SELECT id FROM temp.retention_ids);
+                """)
+                self.conn.execute("DELETE FROM sources_offres WHERE offre_id IN (SELECT id FROM temp.retention_ids);")
+                self.conn.execute("DELETE FROM offres WHERE id IN (SELECT id FROM temp.retention_ids);")
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+
+            archived += len(ids)
+            chunks += 1
+            if progress:
+                progress(archived, time.perf_counter() - start)
+            if len(ids) < self.chunk_size:
+                break
+            time.sleep(self.pause)
+
+        freed = self.reclaim_space() if archived else 0
+        duration = time.perf_counter() - start
+        report = {
+            'archivees': archived,
+            'lots': chunks,
+            'duree_s': round(duration, 3),
+            'offres_par_s': round(archived / duration, 1) if duration > 0 else 0.0,
+            'pages_liberees': freed
+        }
+        print(f"Rétention : {archived} offres archivées en {chunks} lots "
+              f"({report['offres_par_s']} offres/s, {freed} pages libérées)")
+        return report
+
+    def convert_to_incremental_vacuum(self) -> bool:
+        """
+        Passer une base existante en auto_vacuum=INCREMENTAL (opération de maintenance).
+        Le changement de mode impose un VACUUM complet : tout le fichier est réécrit
+        sous verrou exclusif, à lancer quand ni l'interface ni un scraping n'utilisent
+        la base. Les bases créées par update_database sont déjà en mode incrémental.
+        Retourne True si la base était déjà (ou est maintenant) en mode incrémental.
+        """
+        if self.conn.execute("PRAGMA auto_vacuum;").fetchone()[0] == 2:
+            return True
+        if self.conn.in_transaction:
+            self.conn.commit()
+        try:
+            self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+            self.conn.execute("VACUUM;")
+        except sqlite3.Error as e:
+            print(f"Impossible de passer en auto_vacuum incrémental: {e}")
+            return False
+        return self.conn.execute("PRAGMA auto_vacuum;").fetchone()[0] == 2
+
+    def reclaim_space(self, pages_per_step: int = 1000) -> int:
+        """
+        Rendre les pages libres au système par petites étapes ; retourne le nombre de pages libérées.
+        Hors mode incrémental, rien n'est rendu : les pages libres restent dans la
+        freelist et sont réutilisées par les insertions suivantes.
+        """
+        if self.conn.execute("PRAGMA auto_vacuum;").fetchone()[0] != 2:
+            return 0
+        pages_before = self.conn.execute("PRAGMA page_count;").fetchone()[0]
+        while self.conn.execute("PRAGMA freelist_count;").fetchone()[0] > 0:
+            self.conn.execute(f"PRAGMA incremental_vacuum({int(pages_per_step)});").fetchall()
+            if self.conn.in_transaction:
+                self.conn.commit()
+            time.sleep(self.pause)
+        return pages_before - self.conn.execute("PRAGMA page_count;").fetchone()[0]
+
+
+if __name__ == "__main__":
+    # Maintenance ponctuelle : conversion d'une base existante en auto_vacuum incrémental
+    from database import DB_PATH, create_connection
+
+    manager = RetentionManager(create_connection(DB_PATH))
+    print("auto_vacuum incrémental" if manager.convert_to_incremental_vacuum() else "Conversion impossible")
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Gestionnaire de scraping
+Pipeline producteur/consommateur : téléchargement (threads), analyse (processus)
+et écriture (un seul thread) reliés par des files bornées
+"""
+
+import multiprocessing
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config_manager import get_config
+from database import DB_PATH, create_connection, record_scrape_run, upsert_offres_bulk
+from database_manager import get_manager
+from incremental import IncrementalScrape
+from records import NouvelleOffre
+
+# Fin de flux transmise d'une étape à la suivante
+_FIN = None
+
+# Compteurs de upsert_offres_bulk cumulés sur un passage
+STATS_ECRITURE = ('nouvelles', 'modifiees', 'inchangees', 'doublons', 'rejetees')
+
+
+def create_session(pool_size: int, user_agent: str) -> requests.Session:
+    """Session HTTP réutilisant ses connexions (pool_size connexions keep-alive par hôte)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = user_agent
+    return session
+
+
+def _analyser_page(args) -> List[tuple]:
+    """Analyser une page de résultats (exécuté dans un processus du pool)"""
+    from scraper_offres import extract_offres_from_html
+
+    html, fetched_at = args
+    return [tuple(offre) for offre in extract_offres_from_html(html, fetched_at)]
+
+
+class StageMetrics:
+    """Éléments traités, temps de travail et profondeur de la file d'entrée d'une étape"""
+
+    def __init__(self, file: Optional[queue.Queue] = None):
+        self.file = file
+        self.traites = 0
+        self.occupe_s = 0.0
+        self.file_max = 0
+        self._lock = threading.Lock()
+
+    def ajouter(self, n: int, duree: float):
+        with self._lock:
+            self.traites += n
+            self.occupe_s += duree
+
+    def observer_file(self):
+        if self.file is not None:
+            taille = self.file.qsize()
+            with self._lock:
+                self.file_max = max(self.file_max, taille)
+
+    def snapshot(self, duree_s: float) -> Dict:
+        return {
+            'traites': self.traites,
+            'par_s': round(self.traites / duree_s, 1) if duree_s > 0 else 0.0,
+            'occupe_s': round(self.occupe_s, 3),
+            'file': self.file.qsize() if self.file is not None else 0,
+            'file_max': self.file_max,
+        }
+
+
+class ScrapePipeline:
+    """
+    Scraping d'une recherche HelloWork en trois étapes concurrentes :
+
+    - `fetchers` threads téléchargent les pages (chacun attend un délai aléatoire
+      entre deux requêtes) et déposent le HTML dans une file bornée ;
+    - un répartiteur confie l'analyse à un ProcessPoolExecutor (au plus deux pages
+      par processus en cours) et dépose les offres, dans l'ordre des pages, dans
+      une seconde file bornée ;
+    - un seul thread écrit : les offres sont enregistrées par upsert_offres_bulk
+      par lots de `write_batch` ; le cache HTTP ne conserve les validateurs
+      d'une page qu'une fois ses offres enregistrées.
+
+    Une file pleine bloque l'étape qui l'alimente (contre-pression) : le réseau
+    ne prend pas plus de `queue_size` pages d'avance sur l'analyse, ni l'analyse
+    sur l'écriture. L'écrivain examine les pages dans l'ordre et arrête le
+    pipeline comme scrape_hellowork : code HTTP différent de 200, page inchangée
+    (cache HTTP), page sans offre ou page dont toutes les offres sont déjà vues.
+
+    metrics() donne, pour chaque étape, éléments traités, débit, temps de
+    travail et profondeur (courante et maximale) de sa file d'entrée.
+    Les paramètres absents viennent de la section scraping de la configuration ;
+    url_base peut pointer vers un serveur local (voir check_pipeline.py).
+    """
+
+    def __init__(self, url_base: str, max_pages: int, fetchers: Optional[int] = None,
+                 parse_workers: Optional[int] = None, queue_size: Optional[int] = None,
+                 write_batch: Optional[int] = None, session: Optional[requests.Session] = None,
+                 cache=None, archive=None, db_path: str = DB_PATH, source: str = "HelloWork",
+                 delay_min: Optional[float] = None, delay_max: Optional[float] = None):
+        config = get_config()
+        self.url_base = url_base
+        self.max_pages = max_pages
+        self.fetchers = max(1, fetchers or config.get_int("scraping.concurrency", 4))
+        self.parse_workers = max(1, parse_workers or config.get_int("scraping.parse_workers", 2))
+        self.write_batch = write_batch or config.get_int("scraping.write_batch", 500)
+        self.delay_min = config.get_float("scraping.delay_min", 1) if delay_min is None else delay_min
+        self.delay_max = config.get_float("scraping.delay_max", 3) if delay_max is None else delay_max
+        self.timeout = config.get_float("scraping.timeout_s", 15)
+        self.session = session
+        self.cache = cache
+        self.archive = archive
+        self.db_path = db_path
+        self.source = source
+
+        queue_size = queue_size or config.get_int("scraping.queue_size", 16)
+        self.pages_html: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.pages_offres: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._metrics = {'fetch': StageMetrics(), 'parse': StageMetrics(self.pages_html),
+                         'write': StageMetrics(self.pages_offres)}
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._next_page = 1
+        self._derniere_page = max_pages
+        self._fetchers_actifs = self.fetchers
+        self._start = None
+        self._duree = 0.0
+        self.stats = dict.fromkeys(STATS_ECRITURE, 0)
+        self.stats.update(pages=0, offres=0)
+        self.errors: List[str] = []
+
+    # Téléchargement
+
+    def _prendre_page(self) -> Optional[int]:
+        with self._lock:
+            if self._stop.is_set() or self._next_page > self._derniere_page:
+                return None
+            page_num = self._next_page
+            self._next_page += 1
+            return page_num
+
+    def _limiter(self, page_num: int):
+        """Plus aucune page au-delà de page_num (erreur, page vide ou inchangée)"""
+        with self._lock:
+            self._derniere_page = min(self._derniere_page, page_num)
+
+    def _url(self, page_num: int) -> str:
+        return f"{self.url_base}&p={page_num}"
+
+    def _fetch(self, session: requests.Session, page_num: int):
+        url = self._url(page_num)
+        try:
+            if self.cache is not None:
+                # Validateurs conservés par l'écrivain, une fois les offres de la page enregistrées
+                resp = self.cache.get(session, url, timeout=self.timeout, read_body=False, defer=True)
+                if resp.status_code == 200 and resp.unchanged:
+                    return 304, None, None
+            else:
+                resp = session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"Erreur réseau sur {url}: {e}")
+            return None, None, None
+        fetched_at = datetime.now()
+        if resp.status_code != 200:
+            return resp.status_code, None, None
+        if self.archive is not None:
+            self.archive.put(url, resp.text, kind="liste", fetched_at=fetched_at)
+        return 200, resp.text, fetched_at
+
+    def _fetcher(self, session: requests.Session):
+        metrics = self._metrics['fetch']
+        try:
+            premiere = True
+            while True:
+                if not premiere:
+                    time.sleep(random.uniform(self.delay_min, self.delay_max))
+                premiere = False
+                page_num = self._prendre_page()
+                if page_num is None:
+                    break
+                debut = time.perf_counter()
+                status, html, fetched_at = self._fetch(session, page_num)
+                metrics.ajouter(1, time.perf_counter() - debut)
+                if status != 200:
+                    self._limiter(page_num)
+                # Bloque si l'analyse a déjà queue_size pages en attente
+                self.pages_html.put((page_num, status, html, fetched_at))
+                self._metrics['parse'].observer_file()
+        except Exception as e:
+            self.errors.append(f"téléchargement : {e}")
+            self._stop.set()
+        finally:
+            # Connexions du cache HTTP et de l'archive ouvertes par ce thread
+            get_manager().close_thread_connections()
+            with self._lock:
+                self._fetchers_actifs -= 1
+                dernier = self._fetchers_actifs == 0
+            if dernier:
+                self.pages_html.put(_FIN)
+
+    # Analyse
+
+    def _publier(self, item):
+        self.pages_offres.put(item)
+        self._metrics['write'].observer_file()
+
+    def _repartiteur(self, executor: ProcessPoolExecutor):
+        """Confier les pages au pool de processus et transmettre les résultats dans l'ordre d'arrivée"""
+        metrics = self._metrics['parse']
+        en_cours = []
+        fin_recue = False
+        try:
+            while True:
+                item = self.pages_html.get()
+                if item is _FIN:
+                    fin_recue = True
+                    break
+                page_num, status, html, fetched_at = item
+                if html is None or self._stop.is_set():
+                    en_cours.append((page_num, status, None, time.perf_counter()))
+                else:
+                    future = executor.submit(_analyser_page, (html, fetched_at))
+                    en_cours.append((page_num, status, future, time.perf_counter()))
+                # Au plus deux pages par processus en cours d'analyse
+                while len(en_cours) >= 2 * self.parse_workers:
+                    self._terminer(en_cours.pop(0), metrics)
+            while en_cours:
+                self._terminer(en_cours.pop(0), metrics)
+        except Exception as e:
+            self.errors.append(f"analyse : {e}")
+            self._stop.set()
+            # Vider la file pour débloquer les téléchargements en cours
+            while not fin_recue:
+                fin_recue = self.pages_html.get() is _FIN
+        finally:
+            self._publier(_FIN)
+
+    def _terminer(self, item, metrics: StageMetrics):
+        page_num, status, future, soumis = item
+        offres = []
+        if future is not None:
+            try:
+                offres = future.result()
+            except Exception as e:
+                print(f"Erreur analyse de la page {page_num}: {e}")
+            metrics.ajouter(1, time.perf_counter() - soumis)
+        # Bloque si l'écriture a déjà queue_size pages en attente
+        self._publier((page_num, status, offres))
+
+    # Écriture
+
+    def _ecrire(self, conn, lot: List[tuple], pages: List[int]):
+        """Enregistrer un lot, puis confirmer au cache HTTP les pages dont il contient les offres"""
+        if not lot:
+            return
+        debut = time.perf_counter()
+        stats = upsert_offres_bulk(conn, lot, source=self.source)
+        for cle in STATS_ECRITURE:
+            self.stats[cle] += stats[cle]
+        if self.cache is not None:
+            self.cache.commit(self._url(page_num) for page_num in pages)
+        self._metrics['write'].ajouter(len(lot), time.perf_counter() - debut)
+
+    def _arreter(self, page_num: int, raison: str):
+        if not self._stop.is_set():
+            print(f"Arrêt : {raison} à la page {page_num}.")
+            self._stop.set()
+            self._limiter(page_num)
+
+    def _writer(self, incremental: IncrementalScrape, retenues: List[NouvelleOffre]):
+        conn = create_connection(self.db_path)
+        attente: Dict[int, tuple] = {}
+        prochaine = 1
+        fin_recue = False
+        lot: List[tuple] = []
+        pages_lot: List[int] = []
+        try:
+            while True:
+                item = self.pages_offres.get()
+                if item is _FIN:
+                    fin_recue = True
+                    break
+                attente[item[0]] = item
+                # Pages examinées dans l'ordre : l'arrêt porte sur la première page sans nouveauté
+                while prochaine in attente:
+                    page_num, status, offres = attente.pop(prochaine)
+                    prochaine += 1
+                    if self._stop.is_set():
+                        continue  # Pages demandées avant l'arrêt : ignorées
+                    if status is None:
+                        self._arreter(page_num, "erreur réseau")
+                    elif status == 304:
+                        self._arreter(page_num, "page inchangée depuis le dernier passage")
+                    elif status != 200:
+                        self._arreter(page_num, f"code {status}")
+                    elif not offres:
+                        self._arreter(page_num, "aucune offre trouvée")
+                    else:
+                        offres = [NouvelleOffre(*offre) for offre in offres]
+                        print(f"Page {page_num} : {len(offres)} offres récupérées.")
+                        self.stats['pages'] += 1
+                        retenues.extend(offres)
+                        lot.extend(offres)
+                        pages_lot.append(page_num)
+                        if all(incremental.is_seen(offre) for offre in offres):
+                            self._arreter(page_num, "aucune nouvelle offre")
+                        if len(lot) >= self.write_batch:
+                            self._ecrire(conn, lot, pages_lot)
+                            lot, pages_lot = [], []
+            self._ecrire(conn, lot, pages_lot)
+        except Exception as e:
+            self.errors.append(f"écriture : {e}")
+            self._stop.set()
+            # Vider la file pour ne pas bloquer les étapes précédentes
+            while not fin_recue:
+                fin_recue = self.pages_offres.get() is _FIN
+        finally:
+            get_manager().close_thread_connections()
+
+    # Exécution
+
+    def run(self, incremental: Optional[IncrementalScrape] = None) -> Dict:
+        """
+        Scraper, analyser et enregistrer les pages 1..max_pages.
+        Le bilan est enregistré dans scrape_runs et le repère de la recherche avancé.
+        Retourne self.stats complété de 'duree_s' et 'etapes' (metrics()).
+        """
+        conn = create_connection(self.db_path)
+        debut_run = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        incremental = incremental or IncrementalScrape.load(conn, self.url_base, self.source)
+        own_session = self.session is None
+        session = self.session or create_session(
+            self.fetchers, get_config().get_str("scraping.user_agent", "Mozilla/5.0"))
+        if self.cache is not None:
+            self.cache.start_run()
+
+        retenues: List[NouvelleOffre] = []
+        self._start = time.perf_counter()
+        try:
+            # "spawn" : les processus d'analyse ne sont pas des copies (fork) d'un processus multithreadé
+            with ProcessPoolExecutor(max_workers=self.parse_workers,
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                threads = [threading.Thread(target=self._fetcher, args=(session,), name=f"fetch-{i}", daemon=True)
+                           for i in range(self.fetchers)]
+                threads.append(threading.Thread(target=self._repartiteur, args=(executor,), name="parse", daemon=True))
+                writer = threading.Thread(target=self._writer, args=(incremental, retenues), name="write", daemon=True)
+                threads.append(writer)
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            self._duree = time.perf_counter() - self._start
+            if own_session:
+                session.close()
+
+        self.stats['offres'] = len(retenues)
+        if not self.errors:
+            record_scrape_run(conn, self.source, debut_run, self.stats)
+            incremental.save(conn, retenues)
+        else:
+            print(f"Erreurs du pipeline : {'; '.join(self.errors)}")
+
+        report = dict(self.stats, duree_s=round(self._duree, 3), etapes=self.metrics())
+        if self.cache is not None:
+            report['cache'] = dict(self.cache.stats)
+        self.print_metrics()
+        return report
+
+    def metrics(self) -> Dict:
+        """Métriques par étape (fetch, parse, write), consultables pendant l'exécution"""
+        duree = (time.perf_counter() - self._start) if self._start and not self._duree else self._duree
+        return {nom: m.snapshot(duree) for nom, m in self._metrics.items()}
+
+    def print_metrics(self):
+        print(f"Pipeline : {self.stats['pages']} pages, {self.stats['offres']} offres "
+              f"({self.stats['nouvelles']} nouvelles, {self.stats['modifiees']} modifiées) en {self._duree:.2f}s")
+        for nom, m in self.metrics().items():
+            print(f"  {nom:<6} {m['traites']:>6} traités  {m['par_s']:>8} /s  occupé {m['occupe_s']}s  "
+                  f"file {m['file']} (max {m['file_max']})")
+
+
+if __name__ == "__main__":
+    import sys
+
+    from database import create_tables
+    from html_archive import HtmlArchive
+    from http_cache import HttpCache
+
+    create_tables(create_connection(DB_PATH))
+    url = sys.argv[1]
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else get_config().get_int("scraping.max_pages", 50)
+    ScrapePipeline(url, pages, cache=HttpCache(), archive=HtmlArchive()).run()
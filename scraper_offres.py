@@ -1,23 +1,33 @@
 import requests
-from bs4 import BeautifulSoup
 import re
 from datetime import datetime, timedelta
 import os
+import random
+import time
 
 # Importer les fonctions de gestion de la base depuis database.py
-from database import create_connection, DB_PATH, insert_offre, fetch_offre_by_url
+from database import create_connection, create_tables, DB_PATH, upsert_offres_bulk, record_scrape_run
+from records import NouvelleOffre
+from html_archive import HtmlArchive
+from http_cache import HttpCache
+from incremental import IncrementalScrape
+from enrichment import enrich_offres
+from config_manager import get_config
+from html_parser import get_parser, soup_listing_fields
+from scraper_manager import ScrapePipeline
 
 #################################################
 # Fonction auxiliaire : Standardiser la date
 #################################################
 
-def standardiser_date_publication(texte):
+def standardiser_date_publication(texte, reference=None):
     """
     Convertit une chaîne relative (ex: "il y a 15 minutes", "il y a 2 heures",
     "il y a 3 jours", "il y a 1 mois") en une date/heure absolue au format "YYYY-MM-DD HH:MM:SS".
-    Si le format n'est pas reconnu, retourne la date actuelle.
+    Les durées sont comptées depuis `reference` (date de téléchargement de la page,
+    maintenant par défaut). Si le format n'est pas reconnu, retourne cette date.
     """
-    now = datetime.now()
+    now = reference or datetime.now()
     texte = texte.lower()
     
     match = re.search(r"il y a (\d+)\s+minute", texte)
@@ -41,130 +51,141 @@ def standardiser_date_publication(texte):
 # Extraction des offres depuis une page HelloWork
 #################################################
 
-def extract_offres_from_page(soup):
+def offre_from_fields(fields, reference=None):
     """
-    Extrait les offres d'une page HelloWork.
+    Construit une offre (NouvelleOffre) à partir des champs bruts d'une annonce
+    (voir html_parser.LISTING_FIELDS), quel que soit le moteur d'analyse.
     """
-    liste_offres = []
+    relative_url = fields["href"]
+    offre_url = "https://www.hellowork.com" + relative_url if relative_url and relative_url.startswith("/fr-fr") else relative_url
     
-    listings = soup.find_all("li", attrs={"data-id-storage-target": "item"})
+    titre = fields["titre"] or "Titre inconnu"
+    entreprise = fields["entreprise"] or "Entreprise inconnue"
     
-    for listing in listings:
-        try:
-            a_tag = listing.find("a", href=True)
-            relative_url = a_tag["href"] if a_tag else None
-            offre_url = "https://www.hellowork.com" + relative_url if relative_url and relative_url.startswith("/fr-fr") else relative_url
-            
-            h3_tag = a_tag.find("h3") if a_tag else None
-            if h3_tag:
-                titre_tag = h3_tag.find("p", class_=lambda x: x and "tw-typo-l" in x)
-                entreprise_tag = h3_tag.find("p", class_=lambda x: x and "tw-typo-s" in x)
-                titre = titre_tag.get_text(strip=True) if titre_tag else "Titre inconnu"
-                entreprise = entreprise_tag.get_text(strip=True) if entreprise_tag else "Entreprise inconnue"
-            else:
-                titre = "Titre inconnu"
-                entreprise = "Entreprise inconnue"
-
-            # Localisation : récupération du texte et séparation en ville et département
-
-            # Séparer ville et département proprement
-            loc_tag = listing.find(attrs={"data-cy": "localisationCard"})
-            lieu = loc_tag.get_text(strip=True) if loc_tag else "Inconnu"
-
-            # Séparer ville et département proprement
-            ville, departement = "Inconnu", "Inconnu"
-            match = re.search(r"^(.*) - (\d{2,3})$", lieu)  # Exemple : "Paris - 75"
-            if match:
-                ville, departement = match.groups()
-            elif lieu.isdigit():  # Cas où seule le département est présent
-                departement = lieu
-            else:
-                ville = lieu  # Si pas de tiret, on suppose que c'est uniquement une ville
-
-            print(f"Ville: {ville}, Département: {departement}")  # Debug
-                
-            # Extraction du type de contrat
-            contrat_tag = listing.find(attrs={"data-cy": "contractCard"})
-            type_contrat = contrat_tag.get_text(strip=True) if contrat_tag else "Type inconnu"
-            
-
-            # Récupération de la rémunération
-            remuneration_tag = listing.find("div", class_="tw-readonly tw-tag-attractive-s tw-w-fit tw-border-0")
-            remuneration = remuneration_tag.get_text(strip=True) if remuneration_tag else None
-
-
-            # Récupération de la durée (valeur et unité)
-            duration_tag = listing.find("div", attrs={"data-cy": "contractTag"})
-            duree_valeur = None
-            duree_unite = None
-            duree = None
-            
-            if duration_tag:
-                text = duration_tag.get_text(strip=True)
-                match = re.search(r"(\d+)\s*(mois|semaine|semaines|jour|jours|heure|heures)", text, re.IGNORECASE)
-                if match:
-                    valeur = int(match.group(1))
-                    unite = match.group(2).lower()
-                    duree = (valeur, unite)  # Stocker en tuple (valeur, unité)
-        
-            # Extraction et conversion de la date de publication
-            date_tag = listing.find("div", class_="tw-typo-s tw-text-grey")
-            texte_date = date_tag.get_text(strip=True) if date_tag else "il y a 0 heure"
-            date_publication = standardiser_date_publication(texte_date)
-
-
-            # Ajout automatique de la date d’ajout (date actuelle)
-            date_ajout = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # Localisation : récupération du texte et séparation en ville et département
+    lieu = fields["lieu"] if fields["lieu"] is not None else "Inconnu"
+    
+    # Séparer ville et département proprement
+    ville, departement = "Inconnu", "Inconnu"
+    match = re.search(r"^(.*) - (\d{2,3})$", lieu)  # Exemple : "Paris - 75"
+    if match:
+        ville, departement = match.groups()
+    elif lieu.isdigit():  # Cas où seule le département est présent
+        departement = lieu
+    else:
+        ville = lieu  # Si pas de tiret, on suppose que c'est uniquement une ville
+    
+    # Extraction du type de contrat
+    type_contrat = fields["contrat"] if fields["contrat"] is not None else "Type inconnu"
+    
+    # Récupération de la rémunération
+    remuneration = fields["remuneration"]
+    
+    # Récupération de la durée (valeur et unité)
+    duree = None
+    if fields["duree"] is not None:
+        match = re.search(r"(\d+)\s*(mois|semaine|semaines|jour|jours|heure|heures)", fields["duree"], re.IGNORECASE)
+        if match:
+            valeur = int(match.group(1))
+            unite = match.group(2).lower()
+            duree = (valeur, unite)  # Stocker en tuple (valeur, unité)
+    
+    # Extraction et conversion de la date de publication
+    texte_date = fields["date"] if fields["date"] is not None else "il y a 0 heure"
+    date_publication = standardiser_date_publication(texte_date, reference)
+    
+    # Email non extrait ici, domaine par défaut, mots-clés générés
+    mots_cles = f"{entreprise},{titre},{ville},{type_contrat}"
+    
+    # Construction de l'offre (tuple nommé dans l'ordre de OFFRE_COLUMNS)
+    return NouvelleOffre(
+        entreprise=entreprise, titre=titre, url=offre_url, email=None, ville=ville,
+        departement=departement, domaine="Inconnu", type_contrat=type_contrat,
+        remuneration=remuneration, date_publication=date_publication, duree=duree, mots_cles=mots_cles
+    )
 
-            # Email non extrait ici
-            email = None
-            
-            # Domaine par défaut
-            domaine = "Inconnu"
-            
-            # Mots-clés générés
-            mots_cles = f"{entreprise},{titre},{ville},{type_contrat}"
-            
-            # Construction du tuple final
-            offre_tuple = (
-                entreprise, titre, offre_url, email, ville, departement, domaine, 
-                type_contrat, remuneration, date_publication, duree, mots_cles
-            )
-            
-            liste_offres.append(offre_tuple)
+def _offres_from_listings(listings, reference=None):
+    liste_offres = []
+    for fields in listings:
+        try:
+            liste_offres.append(offre_from_fields(fields, reference))
         except Exception as e:
             print("Erreur lors de l'extraction d'une offre:", e)
-    
     return liste_offres
 
+def extract_offres_from_html(html, reference=None, parser=None):
+    """
+    Extrait les offres d'une page HelloWork (HTML brut) avec le moteur `parser`
+    (html_parser.get_parser() par défaut : selectolax, lxml ou BeautifulSoup).
+    `reference` : date de téléchargement de la page (analyse d'une page archivée).
+    """
+    parser = parser or get_parser()
+    return _offres_from_listings(parser.listings(html), reference)
+
+def extract_offres_from_page(soup, reference=None):
+    """
+    Extrait les offres d'une page HelloWork déjà analysée par BeautifulSoup.
+    `reference` : date de téléchargement de la page (analyse d'une page archivée).
+    """
+    listings = soup.find_all("li", attrs={"data-id-storage-target": "item"})
+    return _offres_from_listings([soup_listing_fields(listing) for listing in listings], reference)
+
 #################################################
 # Scraping avec Pagination
 #################################################
 
-def scrape_hellowork(url_base, max_pages):
+def scrape_hellowork(url_base, max_pages, archive=None, cache=None, incremental=None):
     """
     Scrape les offres depuis HelloWork en gérant la pagination.
     
     Paramètres :
       - url_base : URL de base avec les filtres souhaités (ex: "https://www.hellowork.com/fr-fr/emploi/recherche.html?st=date&c=Stage&d=all")
       - max_pages : nombre maximum de pages à scraper (défini par l'administrateur).
+      - archive : HtmlArchive optionnelle où chaque page téléchargée est conservée
+        (nouvelle analyse possible sans réseau, voir html_archive.py).
+      - cache : HttpCache optionnel ; requêtes conditionnelles, et arrêt sans
+        analyse sur une page identique au passage précédent. Les nouvelles pages
+        ne sont conservées dans le cache qu'à l'enregistrement de leurs offres
+        (insert_offres_en_base avec le même cache).
+      - incremental : IncrementalScrape de la recherche (URL connues en mémoire et
+        repère de date) ; chargé depuis la base s'il n'est pas fourni.
     
     Retourne : Liste de toutes les offres récupérées.
     """
-    headers = {"User-Agent": "Mozilla/5.0"}
+    config = get_config()
+    headers = {"User-Agent": config.get_str("scraping.user_agent", "Mozilla/5.0")}
     all_offres = []
+    if incremental is None:
+        incremental = IncrementalScrape.load(create_connection(DB_PATH), url_base)
+    session = requests.Session()
+    session.headers.update(headers)
+    if cache is not None:
+        cache.start_run()
     
     for page_num in range(1, max_pages + 1):
+        if page_num > 1:
+            # Délai entre deux pages (scraping.delay_min / delay_max, relus à chaque page)
+            time.sleep(random.uniform(config.get_float("scraping.delay_min", 1), config.get_float("scraping.delay_max", 3)))
         url_pagination = f"{url_base}&p={page_num}"
         print(f"Scraping page {page_num}: {url_pagination}")
-        resp = requests.get(url_pagination, headers=headers)
+        if cache is not None:
+            resp = cache.get(session, url_pagination, timeout=config.get_float("scraping.timeout_s", 15),
+                             read_body=False, defer=True)
+        else:
+            resp = session.get(url_pagination)
         
         if resp.status_code != 200:
             print(f"Arrêt : la page {page_num} renvoie le code {resp.status_code}.")
             break
         
-        soup = BeautifulSoup(resp.text, "html.parser")
-        offres_page = extract_offres_from_page(soup)
+        if cache is not None and resp.unchanged:
+            print(f"Page {page_num} inchangée depuis le dernier passage. Arrêt du scraping.")
+            break
+        
+        if archive is not None:
+            archive.put(url_pagination, resp.text, kind="liste")
+        
+        offres_page = extract_offres_from_html(resp.text)
         
         if not offres_page:
             print(f"Arrêt : aucune offre trouvée à la page {page_num}.")
@@ -173,36 +194,39 @@ def scrape_hellowork(url_base, max_pages):
         print(f"Page {page_num} : {len(offres_page)} offres récupérées.")
         all_offres.extend(offres_page)
         
-        # Option : arrêter si aucune nouvelle offre n'est trouvée sur une page
-        new_count = 0
-        for off in offres_page:
-            # Vérifier si l'offre existe déjà
-            if not fetch_offre_by_url(create_connection(DB_PATH), off[2]):
-                new_count += 1
+        # Arrêter à la première page dont toutes les offres sont déjà vues (test en mémoire)
+        new_count = sum(1 for off in offres_page if not incremental.is_seen(off))
         if new_count == 0:
             print(f"Aucune nouvelle offre trouvée à la page {page_num}. Arrêt du scraping.")
             break
     
     print(f"Total offres récupérées : {len(all_offres)}")
+    if cache is not None:
+        print(cache.summary())
     return all_offres
 
 #################################################
 # Insertion dans la Base de Données
 #################################################
 
-def insert_offres_en_base(conn, offres):
+def insert_offres_en_base(conn, offres, debut=None, incremental=None, cache=None):
     """
-    Insère les offres dans la base de données en évitant les doublons (basé sur l'URL).
-    Retourne le nombre d'offres nouvellement insérées.
+    Insère les nouvelles offres et met à jour celles dont le contenu a changé
+    (rémunération, contrat, date...), en une seule transaction ; le bilan est
+    enregistré dans scrape_runs et le repère de la recherche (incremental) avancé.
+    Les pages téléchargées par scrape_hellowork via `cache` y sont alors conservées.
+    Retourne le dictionnaire de upsert_offres_bulk ('nouvelles', 'modifiees', 'inchangees'...).
     """
-    count_new = 0
-    for off in offres:
-        existing = fetch_offre_by_url(conn, off[2])  # off[2] correspond à l'URL
-        if not existing:
-            print("Debug offre_tuple :", offre_tuple)
-            insert_offre(conn, off)
-            count_new += 1
-    return count_new
+    debut = debut or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    stats = upsert_offres_bulk(conn, offres, source="HelloWork")
+    record_scrape_run(conn, "HelloWork", debut, stats)
+    if incremental is not None:
+        incremental.save(conn, offres)
+    if cache is not None:
+        cache.commit()
+    if stats['rejetees']:
+        print(f"{stats['rejetees']} offres rejetées (champs manquants ou invalides).")
+    return stats
 
 #################################################
 # Fonction Main
@@ -212,27 +236,32 @@ def main():
     # Demander à l'administrateur l'URL de base avec filtres
     url_base = input("Entrez l'URL de recherche HelloWork avec vos filtres (ex: https://www.hellowork.com/fr-fr/emploi/recherche.html?st=date&c=Stage&d=all): ").strip()
     
-    # Demander le nombre de pages à scraper
+    # Demander le nombre de pages à scraper (scraping.max_pages par défaut)
+    defaut = get_config().get_int("scraping.max_pages", 50)
     try:
-        max_pages = int(input("Entrez le nombre maximum de pages à scraper : "))
+        max_pages = int(input(f"Entrez le nombre maximum de pages à scraper [{defaut}] : ") or defaut)
     except ValueError:
-        print("Nombre de pages invalide, utilisation de 50 par défaut.")
-        max_pages = 50
+        print(f"Nombre de pages invalide, utilisation de {defaut} par défaut.")
+        max_pages = defaut
     
     # Connexion à la base de données
     conn = create_connection(DB_PATH)
     if not conn:
         print("Impossible de se connecter à la base de données.")
         return
+    create_tables(conn)
     
-    # Scraper les offres depuis HelloWork
-    offres = scrape_hellowork(url_base, max_pages)
-    
-    # Insérer les offres récupérées dans la base de données
-    nb_new = insert_offres_en_base(conn, offres)
-    print(f"{nb_new} nouvelles offres insérées dans la base.")
+    # Scraper les offres depuis HelloWork : téléchargement, analyse (processus) et écriture
+    # en parallèle (pages conservées dans l'archive HTML, requêtes conditionnelles via le cache HTTP) ;
+    # le bilan est enregistré dans scrape_runs et le repère de la recherche avancé
+    archive, cache = HtmlArchive(), HttpCache()
+    stats = ScrapePipeline(url_base, max_pages, cache=cache, archive=archive).run()
+    print(f"{stats['nouvelles']} nouvelles offres insérées, {stats['modifiees']} mises à jour, "
+          f"{stats['inchangees']} inchangées.")
     
-    conn.close()
+    # Pages de détail des offres pas encore enrichies (description, email, dates, domaine)
+    if get_config().get_bool("enrichment.enabled", True):
+        enrich_offres(conn, cache=cache, archive=archive)
 
 if __name__ == "__main__":
     main()
@@ -5,6 +5,10 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import pandas as pd
 import time
+from datetime import datetime
+
+from database import create_connection, create_tables, DB_PATH, insert_offres_bulk, record_scrape_run
+from records import NouvelleOffre
 
 # 📌 Configuration du WebDriver
 CHROMEDRIVER_PATH = "/opt/homebrew/bin/chromedriver"  
@@ -155,4 +159,21 @@ df = pd.DataFrame(all_jobs, columns=['Entreprise', 'Titre', 'Lien', 'Ville', 'D
 df.to_csv("indeed_offres.csv", index=False, encoding="utf-8")
 
 print(f"\n✅ {len(all_jobs)} offres ont été enregistrées.")
+
+# 🗄️ Insertion en base en un seul lot (doublons ignorés sur l'URL) ; la date de
+# publication est celle du scraping, donc pas de mise à jour des offres connues
+date_scraping = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+offres_db = [
+    NouvelleOffre(entreprise=company, titre=title, url=job_url, email=None, ville=location,
+                  departement=departement, domaine=domaine, type_contrat=type_contrat,
+                  remuneration=None, date_publication=date_scraping, duree=None,
+                  mots_cles=f"{company},{title},{location},{type_contrat}")
+    for company, title, job_url, location, departement, domaine, type_contrat in all_jobs
+]
+conn = create_connection(DB_PATH)
+if conn:
+    create_tables(conn)
+    stats = insert_offres_bulk(conn, offres_db, source="Indeed")
+    record_scrape_run(conn, "Indeed", date_scraping, stats)
+    print(f"🗄️ {stats['nouvelles']} nouvelles offres en base ({stats['doublons']} doublons, {stats['rejetees']} rejetées).")
 driver.quit()
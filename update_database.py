@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+Migrations versionnées des bases SQLite
+La version du schéma de chaque base est stockée dans PRAGMA user_version
+"""
+
+import os
+import sqlite3
+from typing import Callable, List, Tuple
+
+from deduplication import CONTENT_HASH_COLUMNS, canonical_url, content_hash, offre_fingerprint
+
+Migration = Tuple[int, str, Callable[[sqlite3.Connection], None]]
+
+# Colonnes des offres dont les effectifs sont tenus à jour dans facet_counts
+FACET_COLUMNS = ("domaine", "ville", "type_contrat")
+# Ligne de facet_counts qui porte le nombre total d'offres
+FACET_TOTAL = "_total"
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    """Lister les colonnes d'une table"""
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table});")]
+
+
+def _create_change_log(conn, tables):
+    # Journal des modifications en ajout seul : (seq, table, ligne, opération)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        op TEXT NOT NULL CHECK (op IN ('I', 'U', 'D')),
+        ts INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+    );
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_changes_ts ON changes(ts);")
+    for table in tables:
+        for suffixe, evenement, op, ligne in (("ai", "INSERT", "I", "new"),
+                                              ("au", "UPDATE", "U", "new"),
+                                              ("ad", "DELETE", "D", "old")):
+            conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_changes_{suffixe} AFTER {evenement} ON {table} BEGIN
+                INSERT INTO changes(table_name, row_id, op) VALUES ('{table}', {ligne}.id, '{op}');
+            END;
+            """)
+
+
+#################################################
+# Base des offres (data/offres.db)
+#################################################
+
+def _offres_v1_schema_initial(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS offres (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        entreprise TEXT NOT NULL,
+        titre TEXT NOT NULL,
+        url TEXT NOT NULL UNIQUE,
+        email TEXT,
+        ville TEXT,
+        departement TEXT,
+        domaine TEXT,
+        type_contrat TEXT,
+        remuneration TEXT,
+        date_publication DATE,
+        duree INTEGER,
+        mots_cles TEXT,
+        date_ajout TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+
+    # Sources multiples d'une même offre (plusieurs plateformes)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sources_offres (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        offre_id INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        url TEXT NOT NULL,
+        FOREIGN KEY (offre_id) REFERENCES offres (id)
+    );
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS candidatures (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        offre_id INTEGER NOT NULL,
+        email_envoye TEXT NOT NULL,
+        statut TEXT,
+        date_envoi TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        remarques TEXT,
+        FOREIGN KEY (offre_id) REFERENCES offres (id)
+    );
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS configuration (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        parametre TEXT UNIQUE NOT NULL,
+        valeur TEXT NOT NULL
+    );
+    """)
+
+
+def _offres_v2_colonnes_manquantes(conn):
+    # Les premières bases avaient une colonne "lieu" et pas de ville/département/rémunération
+    colonnes = _table_columns(conn, "offres")
+    for nom, type_sql in (("ville", "TEXT"), ("departement", "TEXT"), ("remuneration", "TEXT"),
+                          ("duree", "INTEGER"), ("mots_cles", "TEXT")):
+        if nom not in colonnes:
+            conn.execute(f"ALTER TABLE offres ADD COLUMN {nom} {type_sql};")
+    if "lieu" in colonnes:
+        conn.execute("UPDATE offres SET ville = lieu WHERE ville IS NULL AND lieu IS NOT NULL;")
+
+
+def _offres_v3_index(conn):
+    # Liste des offres (ORDER BY date_ajout DESC), filtrée ou non par domaine
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_offres_date_ajout ON offres(date_ajout DESC, id DESC);")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_offres_domaine_date ON offres(domaine, date_ajout DESC);")
+    # Statistiques par ville / type de contrat (les requêtes excluent les NULL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_offres_ville ON offres(ville) WHERE ville IS NOT NULL;")
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_offres_type_contrat ON offres(type_contrat)
+    WHERE type_contrat IS NOT NULL;
+    """)
+    # Suppression des anciennes offres
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_offres_date_publication ON offres(date_publication);")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sources_offres_offre ON sources_offres(offre_id);")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidatures_offre ON candidatures(offre_id);")
+
+
+def _offres_v4_recherche_plein_texte(conn):
+    if "description" not in _table_columns(conn, "offres"):
+        conn.execute("ALTER TABLE offres ADD COLUMN description TEXT;")
+    # Index FTS5 adossé à la table offres (contenu externe) ; remove_diacritics
+    # replie les accents ("generaliste" trouve "Généraliste")
+    try:
+        conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS offres_fts USING fts5(
+            titre, entreprise, ville, mots_cles, description,
+            content='offres', content_rowid='id',
+            tokenize="unicode61 remove_diacritics 2",
+            prefix='2 3'
+        );
+        """)
+    except sqlite3.OperationalError as e:
+        # SQLite compilé sans FTS5 : la recherche retombe sur LIKE (voir database.py)
+        print(f"FTS5 indisponible, recherche plein texte désactivée: {e}")
+        return
+
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS offres_fts_ai AFTER INSERT ON offres BEGIN
+        INSERT INTO offres_fts(rowid, titre, entreprise, ville, mots_cles, description)
+        VALUES (new.id, new.titre, new.entreprise, new.ville, new.mots_cles, new.description);
+    END;
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS offres_fts_ad AFTER DELETE ON offres BEGIN
+        INSERT INTO offres_fts(offres_fts, rowid, titre, entreprise, ville, mots_cles, description)
+        VALUES ('delete', old.id, old.titre, old.entreprise, old.ville, old.mots_cles, old.description);
+    END;
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS offres_fts_au
+    AFTER UPDATE OF titre, entreprise, ville, mots_cles, description ON offres BEGIN
+        INSERT INTO offres_fts(offres_fts, rowid, titre, entreprise, ville, mots_cles, description)
+        VALUES ('delete', old.id, old.titre, old.entreprise, old.ville, old.mots_cles, old.description);
+        INSERT INTO offres_fts(rowid, titre, entreprise, ville, mots_cles, description)
+        VALUES (new.id, new.titre, new.entreprise, new.ville, new.mots_cles, new.description);
+    END;
+    """)
+    conn.execute("INSERT INTO offres_fts(offres_fts) VALUES ('rebuild');")
+
+
+def _offres_v5_archives(conn):
+    # Offres expirées déplacées par retention_manager (colonnes saisies uniquement)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS offres_archive (
+        id INTEGER PRIMARY KEY,
+        entreprise TEXT NOT NULL,
+        titre TEXT NOT NULL,
+        url TEXT NOT NULL,
+        email TEXT,
+        ville TEXT,
+        departement TEXT,
+        domaine TEXT,
+        type_contrat TEXT,
+        remuneration TEXT,
+        date_publication DATE,
+        duree INTEGER,
+        mots_cles TEXT,
+        description TEXT,
+        date_ajout TIMESTAMP,
+        date_archivage TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sources_offres_archive (
+        id INTEGER PRIMARY KEY,
+        offre_id INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        url TEXT NOT NULL
+    );
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sources_offres_archive_offre ON sources_offres_archive(offre_id);")
+
+
+def _offres_v6_colonnes_normalisees(conn):
+    # Valeurs numériques dérivées des champs texte (voir normalisation.py)
+    colonnes = _table_columns(conn, "offres")
+    for nom, type_sql in (("remun_min", "REAL"), ("remun_max", "REAL"), ("duree_mois", "REAL"),
+                          ("date_publication_ts", "INTEGER"), ("date_ajout_ts", "INTEGER")):
+        if nom not in colonnes:
+            conn.execute(f"ALTER TABLE offres ADD COLUMN {nom} {type_sql};")
+
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_offres_remuneration ON offres(remun_min, remun_max)
+    WHERE remun_min IS NOT NULL;
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_offres_date_publication_ts ON offres(date_publication_ts);")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_offres_date_ajout_ts ON offres(date_ajout_ts);")
+
+    # Les insertions hors insert_offres_bulk reçoivent au moins le timestamp d'ajout
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS offres_date_ajout_ts AFTER INSERT ON offres
+    WHEN new.date_ajout_ts IS NULL BEGIN
+        UPDATE offres SET date_ajout_ts = CAST(strftime('%s', new.date_ajout) AS INTEGER)
+        WHERE id = new.id;
+    END;
+    """)
+    # Les lignes existantes sont converties par normalisation.backfill_normalised_columns
+    conn.execute("""
+    INSERT INTO configuration(parametre, valeur) VALUES ('backfill_normalisation', '0')
+    ON CONFLICT(parametre) DO UPDATE SET valeur = excluded.valeur;
+    """)
+
+
+def _offres_v7_compteurs_facettes(conn):
+    # Effectifs par valeur de domaine/ville/type_contrat, maintenus par triggers :
+    # les statistiques lisent quelques lignes au lieu de parcourir toute la table
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS facet_counts (
+        facet TEXT NOT NULL,
+        valeur TEXT NOT NULL,
+        n INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (facet, valeur)
+    ) WITHOUT ROWID;
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_facet_counts_n ON facet_counts(facet, n DESC);")
+
+    increment = "\n".join(f"""
+        INSERT INTO facet_counts(facet, valeur, n) SELECT '{col}', new.{col}, 1 WHERE new.{col} IS NOT NULL
+        ON CONFLICT(facet, valeur) DO UPDATE SET n = n + 1;""" for col in FACET_COLUMNS)
+    decrement = "\n".join(f"""
+        UPDATE facet_counts SET n = n - 1 WHERE facet = '{col}' AND valeur = old.{col};""" for col in FACET_COLUMNS)
+    purge = f"DELETE FROM facet_counts WHERE n <= 0 AND facet <> '{FACET_TOTAL}';"
+
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS offres_facets_ai AFTER INSERT ON offres BEGIN
+        INSERT INTO facet_counts(facet, valeur, n) VALUES ('{FACET_TOTAL}', '', 1)
+        ON CONFLICT(facet, valeur) DO UPDATE SET n = n + 1;{increment}
+    END;
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS offres_facets_ad AFTER DELETE ON offres BEGIN
+        UPDATE facet_counts SET n = n - 1 WHERE facet = '{FACET_TOTAL}' AND valeur = '';{decrement}
+        {purge}
+    END;
+    """)
+    for col in FACET_COLUMNS:
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS offres_facets_au_{col} AFTER UPDATE OF {col} ON offres
+        WHEN old.{col} IS NOT new.{col} BEGIN
+            UPDATE facet_counts SET n = n - 1 WHERE facet = '{col}' AND valeur = old.{col};
+            INSERT INTO facet_counts(facet, valeur, n) SELECT '{col}', new.{col}, 1 WHERE new.{col} IS NOT NULL
+            ON CONFLICT(facet, valeur) DO UPDATE SET n = n + 1;
+            {purge}
+        END;
+        """)
+
+    # Comptage initial des offres existantes
+    conn.execute("DELETE FROM facet_counts;")
+    conn.execute(f"INSERT INTO facet_counts(facet, valeur, n) SELECT '{FACET_TOTAL}', '', COUNT(*) FROM offres;")
+    for col in FACET_COLUMNS:
+        conn.execute(f"""
+        INSERT INTO facet_counts(facet, valeur, n)
+        SELECT '{col}', {col}, COUNT(*) FROM offres WHERE {col} IS NOT NULL GROUP BY {col};
+        """)
+
+
+def _offres_v8_deduplication(conn):
+    # URL canonique et empreinte (entreprise, titre, ville) : doublons détectés à l'insertion
+    colonnes = _table_columns(conn, "offres")
+    for nom, type_sql in (("url_canonique", "TEXT"), ("fingerprint", "INTEGER")):
+        if nom not in colonnes:
+            conn.execute(f"ALTER TABLE offres ADD COLUMN {nom} {type_sql};")
+
+    rows = conn.execute("SELECT id, url, entreprise, titre, ville FROM offres;").fetchall()
+    conn.executemany(
+        "UPDATE offres SET url_canonique = ?, fingerprint = ? WHERE id = ?;",
+        [(canonical_url(url), offre_fingerprint(entreprise, titre, ville), offre_id)
+         for offre_id, url, entreprise, titre, ville in rows]
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_offres_url_canonique ON offres(url_canonique);")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_offres_fingerprint ON offres(fingerprint);")
+
+    # Une même URL n'est rattachée qu'une fois à une offre
+    conn.execute("""
+    DELETE FROM sources_offres WHERE id NOT IN (
+        SELECT MIN(id) FROM sources_offres GROUP BY offre_id, url
+    );
+    """)
+    conn.execute("DROP INDEX IF EXISTS idx_sources_offres_offre;")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sources_offres_offre_url ON sources_offres(offre_id, url);")
+
+
+def _offres_v9_journal_modifications(conn):
+    _create_change_log(conn, ("offres", "candidatures"))
+
+
+def _offres_v10_version_configuration(conn):
+    # Compteur incrémenté à chaque écriture dans configuration : le cache de
+    # config_manager.py ne relit la table que lorsqu'il change
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS configuration_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    );
+    """)
+    conn.execute("INSERT OR IGNORE INTO configuration_version(id, version) VALUES (1, 0);")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS configuration_version_{event.lower()} AFTER {event} ON configuration
+        BEGIN
+            UPDATE configuration_version SET version = version + 1 WHERE id = 1;
+        END;
+        """)
+
+
+def _offres_v11_empreinte_contenu(conn):
+    if "content_hash" not in _table_columns(conn, "offres"):
+        conn.execute("ALTER TABLE offres ADD COLUMN content_hash INTEGER;")
+    rows = conn.execute(f"SELECT id, {', '.join(CONTENT_HASH_COLUMNS)} FROM offres;").fetchall()
+    conn.executemany("UPDATE offres SET content_hash = ? WHERE id = ?;",
+                     [(content_hash(row[1:]), row[0]) for row in rows])
+
+    # Bilan de chaque scraping (offres nouvelles, modifiées, inchangées)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS scrape_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source TEXT,
+        debut TIMESTAMP NOT NULL,
+        fin TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        nouvelles INTEGER NOT NULL DEFAULT 0,
+        modifiees INTEGER NOT NULL DEFAULT 0,
+        inchangees INTEGER NOT NULL DEFAULT 0,
+        doublons INTEGER NOT NULL DEFAULT 0,
+        rejetees INTEGER NOT NULL DEFAULT 0
+    );
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scrape_runs_source_debut ON scrape_runs(source, debut);")
+
+
+def _offres_v12_reperes_scraping(conn):
+    # Repère de chaque recherche enregistrée : date de publication la plus récente vue
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS scrape_watermarks (
+        recherche TEXT PRIMARY KEY,
+        source TEXT,
+        date_publication_max TEXT,
+        offres_vues INTEGER NOT NULL DEFAULT 0,
+        date_maj TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+
+
+def _offres_v13_enrichissement(conn):
+    # Champs lus sur la page de détail de l'offre (enrichment.py) ; date_enrichissement
+    # vide = offre à enrichir, essais comptés pour abandonner les pages en erreur
+    colonnes = _table_columns(conn, "offres")
+    for nom, type_sql in (("date_debut", "TEXT"), ("date_fin", "TEXT"), ("date_enrichissement", "TIMESTAMP"),
+                          ("enrichissement_essais", "INTEGER NOT NULL DEFAULT 0")):
+        if nom not in colonnes:
+            conn.execute(f"ALTER TABLE offres ADD COLUMN {nom} {type_sql};")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_offres_a_enrichir ON offres(id) WHERE date_enrichissement IS NULL;")
+
+
+OFFRES_MIGRATIONS: List[Migration] = [
+    (1, "Schéma initial des offres", _offres_v1_schema_initial),
+    (2, "Colonnes ajoutées aux anciennes bases", _offres_v2_colonnes_manquantes),
+    (3, "Index des requêtes de liste, filtres et statistiques", _offres_v3_index),
+    (4, "Recherche plein texte FTS5 sur les offres", _offres_v4_recherche_plein_texte),
+    (5, "Tables d'archive des offres expirées", _offres_v5_archives),
+    (6, "Rémunération, durée et dates normalisées", _offres_v6_colonnes_normalisees),
+    (7, "Compteurs de facettes maintenus par triggers", _offres_v7_compteurs_facettes),
+    (8, "Déduplication par URL canonique et empreinte", _offres_v8_deduplication),
+    (9, "Journal des modifications (changes)", _offres_v9_journal_modifications),
+    (10, "Version de la configuration pour le cache", _offres_v10_version_configuration),
+    (11, "Empreinte de contenu et bilan des scrapings", _offres_v11_empreinte_contenu),
+    (12, "Repères des scrapings incrémentaux", _offres_v12_reperes_scraping),
+    (13, "Enrichissement par la page de détail des offres", _offres_v13_enrichissement),
+]
+
+
+#################################################
+# Base des candidatures (data/candidatures.db)
+#################################################
+
+def _candidatures_v1_schema_initial(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS candidatures (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        offre_id INTEGER,
+        entreprise TEXT NOT NULL,
+        poste TEXT NOT NULL,
+        url TEXT,
+        email_contact TEXT,
+        date_candidature DATE NOT NULL,
+        statut TEXT DEFAULT 'Envoyée',
+        type_candidature TEXT DEFAULT 'Spontanée',
+        mode_envoi TEXT,
+        date_relance DATE,
+        notes TEXT,
+        date_creation TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        date_modification TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS relances (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        candidature_id INTEGER NOT NULL,
+        date_relance DATE NOT NULL,
+        type_relance TEXT,
+        reponse TEXT,
+        FOREIGN KEY (candidature_id) REFERENCES candidatures (id)
+    );
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS entretiens (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        candidature_id INTEGER NOT NULL,
+        date_entretien DATETIME,
+        type_entretien TEXT,
+        resultat TEXT,
+        notes TEXT,
+        FOREIGN KEY (candidature_id) REFERENCES candidatures (id)
+    );
+    """)
+
+
+def _candidatures_v2_index(conn):
+    # Listes triées par date, filtrées ou non par statut
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidatures_date ON candidatures(date_candidature DESC);")
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_candidatures_statut_date
+    ON candidatures(statut, date_candidature DESC);
+    """)
+    # Candidatures à relancer : seules celles encore "Envoyée" sont indexées
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_candidatures_a_relancer ON candidatures(date_candidature)
+    WHERE statut = 'Envoyée';
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_relances_candidature ON relances(candidature_id);")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_entretiens_candidature ON entretiens(candidature_id);")
+
+
+def _candidatures_v3_lien_offres(conn):
+    # Jointure avec offres.db attachée (candidature_tracker.CANDIDATURES_DETAIL_VIEW)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_candidatures_offre ON candidatures(offre_id)
+    WHERE offre_id IS NOT NULL;
+    """)
+
+
+def _candidatures_v4_journal_modifications(conn):
+    _create_change_log(conn, ("candidatures",))
+
+
+CANDIDATURES_MIGRATIONS: List[Migration] = [
+    (1, "Schéma initial des candidatures", _candidatures_v1_schema_initial),
+    (2, "Index des listes, statuts et relances", _candidatures_v2_index),
+    (3, "Index de jointure avec les offres", _candidatures_v3_lien_offres),
+    (4, "Journal des modifications (changes)", _candidatures_v4_journal_modifications),
+]
+
+
+#################################################
+# Exécution des migrations
+#################################################
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Lire la version du schéma (PRAGMA user_version)"""
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, migrations: List[Migration]) -> int:
+    """
+    Appliquer les migrations dont la version dépasse PRAGMA user_version.
+
+    Chaque migration s'exécute dans sa propre transaction avec la mise à jour
+    de user_version : une erreur laisse la base à la dernière version réussie.
+    ANALYZE est lancé si au moins une migration a été appliquée.
+    Retourne la version finale du schéma.
+    """
+    if conn.in_transaction:
+        conn.commit()
+
+    version = get_schema_version(conn)
+    applied = 0
+    for target, description, step in sorted(migrations, key=lambda m: m[0]):
+        if target <= version:
+            continue
+        try:
+            conn.execute("BEGIN;")
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {int(target)};")
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Erreur migration v{target} ({description}): {e}")
+            raise
+        print(f"Migration v{target} appliquée : {description}")
+        version = target
+        applied += 1
+
+    if applied:
+        conn.execute("ANALYZE;")
+        conn.commit()
+    return version
+
+
+def _auto_vacuum_incremental(conn: sqlite3.Connection):
+    """
+    Base neuve (aucune table) : passer en auto_vacuum=INCREMENTAL avant la v1.
+    Le VACUUM qui fixe le mode est immédiat sur un fichier vide ; une base
+    existante garde son mode (voir RetentionManager.convert_to_incremental_vacuum).
+    """
+    if get_schema_version(conn) or conn.execute("SELECT COUNT(*) FROM sqlite_master;").fetchone()[0]:
+        return
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+    conn.execute("VACUUM;")
+
+
+def migrate_offres_db(conn: sqlite3.Connection) -> int:
+    """Mettre à jour le schéma de la base des offres"""
+    _auto_vacuum_incremental(conn)
+    return migrate(conn, OFFRES_MIGRATIONS)
+
+
+def migrate_candidatures_db(conn: sqlite3.Connection) -> int:
+    """Mettre à jour le schéma de la base des candidatures"""
+    return migrate(conn, CANDIDATURES_MIGRATIONS)
+
+
+if __name__ == "__main__":
+    from database_manager import get_connection, get_manager
+
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    os.makedirs(data_dir, exist_ok=True)
+
+    for filename, runner in (("offres.db", migrate_offres_db), ("candidatures.db", migrate_candidatures_db)):
+        path = os.path.join(data_dir, filename)
+        print(f"{filename} : schéma v{runner(get_connection(path))}")
+
+    get_manager().close_all()